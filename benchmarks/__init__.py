@@ -0,0 +1 @@
+# 初期化用ファイル。特に処理は不要
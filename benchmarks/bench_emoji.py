@@ -0,0 +1,85 @@
+"""
+絵文字変換のベンチマーク
+以前の EmojiMapper（約20件の辞書と線形探索）と EmojiIndex を比較する
+
+実行: python -m benchmarks.bench_emoji
+"""
+import timeit
+from typing import Dict, Optional
+
+from utils.emoji_mapper import emoji_index
+
+
+class LegacyEmojiMapper:
+    """比較用: 変更前の EmojiMapper"""
+    EMOJI_MAP: Dict[str, str] = {
+        ":smile:": "😊", ":laughing:": "😄", ":thumbsup:": "👍", ":thumbsdown:": "👎",
+        ":heart:": "❤️", ":warning:": "⚠️", ":anger:": "💢", ":star:": "⭐",
+        ":question:": "❓", ":exclamation:": "❗", ":ok:": "🆗", ":pray:": "🙏",
+        ":clap:": "👏", ":fire:": "🔥", ":eyes:": "👀", ":paper:": "📄",
+        ":book:": "📚", ":computer:": "💻", ":bulb:": "💡", ":calendar:": "📅",
+        ":clock:": "⏰",
+    }
+
+    @classmethod
+    def slack_to_discord(cls, slack_emoji: str) -> Optional[str]:
+        return cls.EMOJI_MAP.get(slack_emoji)
+
+    @classmethod
+    def discord_to_slack(cls, discord_emoji: str) -> Optional[str]:
+        for slack, discord in cls.EMOJI_MAP.items():
+            if discord == discord_emoji:
+                return slack
+        return None
+
+    @classmethod
+    def translate_text(cls, text: str) -> str:
+        # 以前は本文の変換がなかったため、辞書の全件で置換した場合の比較用
+        for slack, discord in cls.EMOJI_MAP.items():
+            text = text.replace(slack, discord)
+        return text
+
+
+REACTIONS = ["👍", "🔥", "👀", "⏰", "🙏", "🎉", "👍🏽"]
+TEXT = (
+    "今日のミーティングは15:30からです :calendar: 資料は共有済み :paper: "
+    "よろしくお願いします :pray::skin-tone-3: :tada: :+1: :unknown_emoji: "
+) * 20
+
+
+def bench(label: str, statement, number: int):
+    seconds = timeit.timeit(statement, number=number)
+    print(f"{label:<40} {seconds / number * 1e6:10.2f} µs/回")
+
+
+def main(number: int = 20000):
+    print(f"対応表の件数: 変更前 {len(LegacyEmojiMapper.EMOJI_MAP)}件 / 変更後 {len(emoji_index)}件")
+    print(f"変換できたリアクション: 変更前 {sum(LegacyEmojiMapper.discord_to_slack(r) is not None for r in REACTIONS)}"
+          f" / 変更後 {sum(emoji_index.discord_to_slack(r) is not None for r in REACTIONS)} (全{len(REACTIONS)}件)")
+    print()
+
+    bench("discord_to_slack (変更前: 線形探索)",
+          lambda: [LegacyEmojiMapper.discord_to_slack(r) for r in REACTIONS], number)
+    bench("discord_to_slack (変更後: 辞書)",
+          lambda: [emoji_index.discord_to_slack(r) for r in REACTIONS], number)
+    bench("slack_to_discord (変更前)",
+          lambda: [LegacyEmojiMapper.slack_to_discord(f":{n}:") for n in ("fire", "eyes", "tada")], number)
+    bench("slack_to_discord (変更後)",
+          lambda: [emoji_index.slack_to_discord(n) for n in ("fire", "eyes", "tada")], number)
+    bench(f"本文の変換 {len(TEXT)}文字 (変更前: 全件置換)",
+          lambda: LegacyEmojiMapper.translate_text(TEXT), number // 20)
+    full_map = {f":{name}:": unicode_emoji for name, unicode_emoji in emoji_index._to_unicode.items()}
+
+    def replace_all(text):
+        for slack, discord in full_map.items():
+            text = text.replace(slack, discord)
+        return text
+
+    bench(f"本文の変換 {len(TEXT)}文字 (変更前の方式で全{len(full_map)}件)",
+          lambda: replace_all(TEXT), number // 200)
+    bench(f"本文の変換 {len(TEXT)}文字 (変更後: 1回の走査)",
+          lambda: emoji_index.slack_text_to_discord(TEXT), number // 20)
+
+
+if __name__ == "__main__":
+    main()
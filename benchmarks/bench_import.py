@@ -0,0 +1,130 @@
+"""
+Slackエクスポート（ZIP）の取り込みのベンチマーク
+合成したエクスポートを取り込む速度（件/秒）とメモリ使用量、
+取り込んだアーカイブを偽の Discord チャンネルへ投稿する速度を計測する
+
+実行: python -m benchmarks.bench_import
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import resource
+import tempfile
+import time
+import zipfile
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.migration_harness import FakeDiscordChannel
+from services.database_service import Base
+from services.migration_service import MigrationEngine, SlackExportImporter, iter_json_array
+from services.slack_directory import SlackDirectory
+
+CHANNELS = 20
+DAYS = 365
+MESSAGES_PER_DAY = 40
+USERS = 50
+REPLAY_CHANNEL = "C0000"
+
+
+def build_export(path: str, rng: random.Random) -> int:
+    """標準エクスポートと同じ構成（チャンネルごと・日ごとのJSON）のZIPを作る"""
+    total = 0
+    start = date(2020, 1, 1)
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("users.json", json.dumps([
+            {"id": f"U{u:04d}", "name": f"user{u}", "real_name": f"ユーザー {u}"} for u in range(USERS)
+        ]))
+        archive.writestr("channels.json", json.dumps([
+            {"id": f"C{c:04d}", "name": f"channel-{c}"} for c in range(CHANNELS)
+        ]))
+        for c in range(CHANNELS):
+            number = 0
+            for d in range(DAYS):
+                day = start + timedelta(days=d)
+                base = int(time.mktime(day.timetuple()))
+                messages = []
+                for m in range(MESSAGES_PER_DAY):
+                    ts = f"{base + m * 60}.{m:06d}"
+                    message = {
+                        "type": "message", "ts": ts, "user": f"U{rng.randrange(USERS):04d}",
+                        "text": f"msg-C{c:04d}-{number} <@U{rng.randrange(USERS):04d}> " + "研究の進捗です。" * rng.randint(1, 20),
+                        "user_profile": {"real_name": "dummy", "display_name": "dummy", "image_72": "https://example.com/a.png"},
+                        "blocks": [{"type": "rich_text", "elements": [{"type": "text", "text": "..."}]}],
+                    }
+                    # スレッドの返信（同じ日のファイルに含まれる）
+                    if m % 10 == 9:
+                        message["thread_ts"] = messages[-1]["ts"]
+                    messages.append(message)
+                    number += 1
+                archive.writestr(f"channel-{c}/{day.isoformat()}.json", json.dumps(messages, ensure_ascii=False,
+                                                                                     indent=4))
+                total += len(messages)
+    return total
+
+
+def max_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def bench_parser(path: str):
+    """要素ごとの解析と json.load の比較（DBへの書き込みなし）"""
+    for label, parse in (("要素ごとに解析", lambda stream: iter_json_array(stream)),
+                         ("json.load", lambda stream: json.load(stream))):
+        count = 0
+        start = time.perf_counter()
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if "/" in info.filename:
+                    with archive.open(info) as stream:
+                        count += sum(1 for _ in parse(stream))
+        elapsed = time.perf_counter() - start
+        print(f"解析のみ ({label}): {count}件 / {elapsed:.2f}秒 ({count / elapsed:.0f}件/秒)")
+
+
+async def bench_replay(session_factory, discord_channel: FakeDiscordChannel):
+    engine = MigrationEngine(None, SlackDirectory(None), lambda channel_id: discord_channel,
+                             slack_rate=0, discord_rate=0, report_interval=60, session_factory=session_factory)
+    start = time.perf_counter()
+    progress = await engine.migrate({REPLAY_CHANNEL: "1"}, fetch=False)
+    elapsed = time.perf_counter() - start
+    posted = progress.posted
+    print(f"アーカイブからの投稿: {posted}件 / {discord_channel.sends}回の送信 / {elapsed:.2f}秒 "
+          f"({posted / elapsed:.0f}件/秒)")
+
+
+def main():
+    logging.getLogger().setLevel(logging.ERROR)
+    logging.getLogger("sqlalchemy").setLevel(logging.WARNING)
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as directory:
+        export_path = os.path.join(directory, "export.zip")
+        total = build_export(export_path, rng)
+        print(f"エクスポート: {total}件 / ZIP {os.path.getsize(export_path) / 1024 / 1024:.1f}MB")
+
+        bench_parser(export_path)
+
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'archive.db')}")
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(bind=engine)
+        importer = SlackExportImporter(session_factory)
+        rss_before = max_rss_mb()
+        result = importer.import_zip(export_path)
+        print(f"取り込み: {result.messages}件 / {result.files}ファイル / {result.elapsed:.2f}秒 "
+              f"({result.rate():.0f}件/秒), 最大RSS {rss_before:.0f}MB → {max_rss_mb():.0f}MB")
+        print(f"アーカイブ: {os.path.getsize(os.path.join(directory, 'archive.db')) / 1024 / 1024:.1f}MB")
+
+        # 2回目は全件が既存のため挿入されない
+        result = importer.import_zip(export_path)
+        print(f"再取り込み: {result.elapsed:.2f}秒 ({result.rate():.0f}件/秒)")
+
+        asyncio.run(bench_replay(session_factory, FakeDiscordChannel("1", random.Random(2))))
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+書式変換（Slack mrkdwn <-> Discord markdown）のベンチマーク
+大きなメッセージで1回の走査による変換と、置換を順に適用する方式を比較する
+順に置換する方式は絵文字の変換とコードスパン内の保護を行わないが、それでも1回の走査より2割ほど速い
+（1回の走査の利点は速度ではなく、変換済みの部分やコードを再び置換しない正確さ）
+
+実行: python -m benchmarks.bench_markdown
+"""
+import re
+import time
+
+from utils.markdown_converter import discord_to_slack, slack_to_discord
+
+SLACK_LINE = (
+    "<@U012AB3CD> さん、<#C024BE91L|general> の資料です *重要* ~古い版~ "
+    "<https://example.com/paper?id=1&amp;v=2|論文リンク> `a &lt; b` :fire: :pray::skin-tone-3: &amp; 15:30\n"
+)
+DISCORD_LINE = (
+    "<@!123456789012345678> さん、<#234567890123456789> の資料です **重要** ~~古い版~~ "
+    "[論文リンク](https://example.com/paper?id=1&v=2) `a < b` <:lab:345678901234567890> <@&456789012345678901>\n"
+)
+
+USERS = {"U012AB3CD": "Taro Yamada"}
+DISCORD_USERS = {"123456789012345678": "Hanako"}
+DISCORD_CHANNELS = {"234567890123456789": "general"}
+DISCORD_ROLES = {"456789012345678901": "admins"}
+
+# 比較用: 置換を1つずつ順に適用する方式
+NAIVE_SLACK_RULES = [
+    (re.compile(r"<@(\w+)(?:\|[^>]*)?>"), lambda m: f"@{USERS.get(m.group(1), m.group(1))}"),
+    (re.compile(r"<#\w+\|([^>]+)>"), r"#\1"),
+    (re.compile(r"<(https?://[^|>]+)\|([^>]+)>"), r"[\2](\1)"),
+    (re.compile(r"<(https?://[^>]+)>"), r"\1"),
+    (re.compile(r"(?<![\w*])\*([^*\n]+)\*(?![\w*])"), r"**\1**"),
+    (re.compile(r"(?<![\w~])~([^~\n]+)~(?![\w~])"), r"~~\1~~"),
+    (re.compile(r"&lt;"), "<"),
+    (re.compile(r"&gt;"), ">"),
+    (re.compile(r"&amp;"), "&"),
+]
+
+
+def naive_slack_to_discord(text: str) -> str:
+    for pattern, replacement in NAIVE_SLACK_RULES:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def throughput(label: str, function, text: str, repeat: int = 5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(text)
+        best = min(best, time.perf_counter() - start)
+    size = len(text.encode("utf-8")) / 1024 / 1024
+    print(f"{label:<36} {size:6.2f}MB  {best * 1000:8.1f}ms  {size / best:7.1f}MB/s")
+
+
+def main():
+    for lines in (100, 2000, 20000):
+        slack_text = SLACK_LINE * lines
+        discord_text = DISCORD_LINE * lines
+        print(f"--- {lines}行 ---")
+        throughput("Slack -> Discord (1回の走査)",
+                   lambda text: slack_to_discord(text, USERS.get), slack_text)
+        throughput("Slack -> Discord (順に置換)", naive_slack_to_discord, slack_text)
+        throughput("Discord -> Slack (1回の走査)",
+                   lambda text: discord_to_slack(text, DISCORD_USERS.get, DISCORD_CHANNELS.get, DISCORD_ROLES.get),
+                   discord_text)
+
+
+if __name__ == "__main__":
+    main()
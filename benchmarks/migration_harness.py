@@ -0,0 +1,217 @@
+"""
+Slack→Discord 履歴移行のオフライン検証
+偽の Slack API（カーソル・スレッド・429）と偽の Discord チャンネルに対して移行を実行し、
+途中で中断してから再開しても全メッセージが順番通りに投稿されることを確認する
+
+実行: python -m benchmarks.migration_harness
+"""
+import asyncio
+import logging
+import os
+import random
+import re
+import tempfile
+import time
+from collections import defaultdict
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from services.database_service import Base
+from services.migration_service import MigrationEngine
+from services.slack_directory import SlackDirectory
+
+CHANNELS = 4
+MESSAGES_PER_CHANNEL = 1500
+THREAD_RATIO = 0.1  # スレッドの親になるメッセージの割合
+REPLIES_PER_THREAD = 12
+PAGE_SIZE = 100
+RATE_LIMIT_RATIO = 0.02  # 429を返す割合
+API_LATENCY = 0.002  # 偽APIの応答時間（秒）
+CRASH_AFTER_RATIO = 0.4  # 全体のこの割合を投稿したところで中断する
+
+MESSAGE_ID = re.compile(r"msg-(\w+)-(\d+)")
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class FakeSlackApiError(Exception):
+    """slack_sdk.errors.SlackApiError と同じく response を持つ"""
+
+    def __init__(self, message, response):
+        super().__init__(message)
+        self.response = response
+
+
+class FakeDiscordRateLimited(Exception):
+    """discord.HTTPException（429）と同じく status・retry_after を持つ"""
+    status = 429
+    retry_after = 0.01
+
+
+class FakeSlackClient:
+    """conversations.history（新しい順）・conversations.replies・users.info の偽実装"""
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        self.history = {}  # channel -> 親・通常メッセージ（古い順）
+        self.threads = {}  # (channel, thread_ts) -> 返信（古い順）
+        self.expected = {}  # channel -> 投稿されるべき順序のメッセージ番号
+        self.calls = defaultdict(int)
+        for c in range(CHANNELS):
+            channel = f"C{c:04d}"
+            self._generate(channel)
+
+    def _generate(self, channel: str):
+        messages = []
+        order = []
+        number = 0
+        base = 1_600_000_000
+        for i in range(MESSAGES_PER_CHANNEL):
+            ts = f"{base + i * 60}.{i:06d}"
+            message = {"type": "message", "ts": ts, "user": f"U{i % 7}",
+                       "text": f"msg-{channel}-{number} <@U{i % 7}> *太字* の本文"}
+            order.append(number)
+            number += 1
+            if self.rng.random() < THREAD_RATIO:
+                replies = []
+                for r in range(REPLIES_PER_THREAD):
+                    # 返信は後のメッセージより遅い時刻になることもある
+                    reply_ts = f"{base + i * 60 + (r + 1) * 7}.{r:06d}"
+                    replies.append({"type": "message", "ts": reply_ts, "thread_ts": ts, "user": f"U{r % 5}",
+                                    "text": f"msg-{channel}-{number} 返信"})
+                    order.append(number)
+                    number += 1
+                message.update(thread_ts=ts, reply_count=len(replies))
+                self.threads[(channel, ts)] = replies
+            messages.append(message)
+        # 参加メッセージは移行しない
+        messages.append({"type": "message", "subtype": "channel_join", "ts": f"{base - 1}.000000", "user": "U0",
+                         "text": "joined"})
+        messages.sort(key=lambda message: message["ts"])
+        self.history[channel] = messages
+        self.expected[channel] = order
+
+    async def _api(self, method: str):
+        self.calls[method] += 1
+        await asyncio.sleep(API_LATENCY)
+        if self.rng.random() < RATE_LIMIT_RATIO:
+            raise FakeSlackApiError("ratelimited", FakeResponse(429, {"Retry-After": "0.01"}))
+
+    async def conversations_history(self, channel, cursor=None, limit=100):
+        await self._api("conversations.history")
+        messages = self.history[channel][::-1]
+        start = int(cursor or 0)
+        page = messages[start:start + limit]
+        has_more = start + limit < len(messages)
+        return {"ok": True, "messages": [dict(message) for message in page], "has_more": has_more,
+                "response_metadata": {"next_cursor": str(start + limit) if has_more else ""}}
+
+    async def conversations_replies(self, channel, ts, cursor=None, limit=100):
+        await self._api("conversations.replies")
+        parent = next(message for message in self.history[channel] if message["ts"] == ts)
+        messages = [parent] + self.threads[(channel, ts)]
+        start = int(cursor or 0)
+        page = messages[start:start + limit]
+        has_more = start + limit < len(messages)
+        return {"ok": True, "messages": [dict(message) for message in page], "has_more": has_more,
+                "response_metadata": {"next_cursor": str(start + limit) if has_more else ""}}
+
+    async def users_info(self, user):
+        await self._api("users.info")
+        return {"ok": True, "user": {"id": user, "real_name": f"User {user}"}}
+
+    async def conversations_info(self, channel):
+        await self._api("conversations.info")
+        return {"ok": True, "channel": {"id": channel, "name": f"channel-{channel.lower()}"}}
+
+
+class FakeDiscordChannel:
+    def __init__(self, channel_id: str, rng: random.Random):
+        self.id = channel_id
+        self.rng = rng
+        self.posted = []  # (Slackチャンネル, メッセージ番号)
+        self.sends = 0
+
+    async def send(self, embeds):
+        await asyncio.sleep(API_LATENCY)
+        if self.rng.random() < RATE_LIMIT_RATIO:
+            raise FakeDiscordRateLimited("429 Too Many Requests")
+        assert len(embeds) <= 10 and sum(len(embed) for embed in embeds) <= 6000
+        self.sends += 1
+        for embed in embeds:
+            match = MESSAGE_ID.search(embed.description)
+            self.posted.append((match.group(1), int(match.group(2))))
+
+
+def verify(slack: FakeSlackClient, discord_channels, mapping):
+    """投稿漏れがなく順番通りであることを確認し、重複して投稿された件数を返す"""
+    duplicates = 0
+    for slack_channel, discord_channel_id in mapping.items():
+        posted = [number for channel, number in discord_channels[discord_channel_id].posted if channel == slack_channel]
+        first_seen = list(dict.fromkeys(posted))
+        assert first_seen == slack.expected[slack_channel], f"{slack_channel}: 投稿漏れ・順序違いがあります"
+        duplicates += len(posted) - len(first_seen)
+    return duplicates
+
+
+async def run():
+    rng = random.Random(42)
+    slack = FakeSlackClient(rng)
+    discord_channels = {str(1000 + c): FakeDiscordChannel(str(1000 + c), rng) for c in range(CHANNELS)}
+    mapping = {f"C{c:04d}": str(1000 + c) for c in range(CHANNELS)}
+    total = sum(len(order) for order in slack.expected.values())
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'migration.db')}")
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(bind=engine)
+
+        def new_engine():
+            return MigrationEngine(slack, SlackDirectory(slack), discord_channels.get, concurrency=2,
+                                   slack_rate=0, discord_rate=0, page_size=PAGE_SIZE, report_interval=1,
+                                   session_factory=session_factory)
+
+        # 1回目: 途中で中断する
+        first = new_engine()
+        started = time.perf_counter()
+        task = asyncio.create_task(first.migrate(mapping))
+        while first.progress is None or first.progress.posted < total * CRASH_AFTER_RATIO:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        print(f"中断: {first.progress.posted}/{total}件を投稿した時点")
+
+        # 2回目: チェックポイントから再開する
+        second = new_engine()
+        progress = await second.migrate(mapping)
+        elapsed = time.perf_counter() - started
+        engine.dispose()
+
+    duplicates = verify(slack, discord_channels, mapping)
+    sends = sum(channel.sends for channel in discord_channels.values())
+    print(progress.describe())
+    print(f"合計 {total}件 / {elapsed:.2f}秒 ({total / elapsed:.0f}件/秒)")
+    print(f"Slack API 呼び出し: {dict(slack.calls)}")
+    print(f"Discord 送信: {sends}回 (1回あたり {total / sends:.1f}件)")
+    print(f"429 による再試行: {first.progress.rate_limited + progress.rate_limited}回")
+    print(f"再開時の重複投稿: {duplicates}件")
+    print("OK: すべてのメッセージが順番通りに投稿されました")
+
+
+def main():
+    # 進捗ログ・SQLのログは表示しない
+    logging.getLogger().setLevel(logging.ERROR)
+    logging.getLogger("sqlalchemy").setLevel(logging.WARNING)
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
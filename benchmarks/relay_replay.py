@@ -0,0 +1,557 @@
+"""
+記録したイベントを再生して Slack⇔Discord の転送性能を計測する
+Slack Web API と Discord REST API の代わりにレート制限と遅延を再現するローカルサーバーを起動し、
+実際のハンドラ（SlackBot.event_handler・on_message → send_to_slack）にイベントを渡す
+
+記録: config.TRAFFIC_RECORD_FILE を設定して Bot を実行する
+実行: python -m benchmarks.relay_replay [記録ファイル] [--speed 1|10|max] [--latency 50] [--routes routes.json]
+記録ファイルを省略した場合は合成したイベントを再生する（--channels で転送するチャンネル数を指定）
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import logging
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+
+from aiohttp import web
+
+import config
+
+GUILD_ID = 900000000000000001
+BOT_USER = {"id": "900000000000000002", "username": "lab-bot", "discriminator": "0", "avatar": None, "bot": True}
+DISCORD_EPOCH = 1420070400000
+MAX_GAP = 5.0  # 記録の間隔がこれより長い場合は詰める（秒）
+# 合成する場合の転送ルート（Slack n → Discord n、Discord → Slack は1チャンネル）
+SYNTHETIC_DISCORD_SOURCE = 920000000000000000
+SYNTHETIC_SLACK_TARGET = "C800000000"
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """取得できた場合は 0、できない場合は待つべき秒数を返す"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class FakeServer:
+    """遅延・レート制限を再現するローカルAPIサーバーの共通部分"""
+
+    def __init__(self, latency: float, rng: random.Random):
+        self.latency = latency
+        self.rng = rng
+        self.calls = defaultdict(int)
+        self.succeeded = defaultdict(int)
+        self.rate_limited = 0
+        self.buckets = {}
+        self.base_url = None
+        self._runner = None
+
+    async def delay(self):
+        if self.latency:
+            await asyncio.sleep(self.latency * (0.5 + self.rng.random()))
+
+    def bucket(self, key, rate: float, burst: int) -> TokenBucket:
+        if key not in self.buckets:
+            self.buckets[key] = TokenBucket(rate, burst)
+        return self.buckets[key]
+
+    def reset(self):
+        self.calls.clear()
+        self.succeeded.clear()
+        self.rate_limited = 0
+
+    def routes(self, app: web.Application):
+        raise NotImplementedError
+
+    async def start(self, path: str):
+        app = web.Application()
+        self.routes(app)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}{path}"
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+
+class FakeSlackApi(FakeServer):
+    """
+    Slack Web API の代わり
+    chat.postMessage はチャンネルごとに毎秒1回（短時間のバーストは許可）、それ以外はメソッドごとの Tier 制限
+    """
+
+    # メソッド -> (毎秒の回数, バースト)
+    LIMITS = {
+        "chat.postMessage": (1.0, 3),
+        "users.info": (100 / 60, 20),  # Tier 4
+        "conversations.info": (100 / 60, 20),
+        "files.getUploadURLExternal": (20 / 60, 5),  # Tier 2
+        "files.completeUploadExternal": (20 / 60, 5),
+    }
+    DEFAULT_LIMIT = (50 / 60, 10)  # Tier 3
+
+    def __init__(self, latency, rng, records):
+        super().__init__(latency, rng)
+        # users.list / conversations.list で返すユーザーとチャンネル（記録に含まれるもの）
+        self.users = set()
+        self.channels = set()
+        for record in records:
+            event = record["payload"].get("event", {}) if record["source"] == "slack" else {}
+            if isinstance(event.get("user"), str):
+                self.users.add(event["user"])
+            if isinstance(event.get("channel"), str):
+                self.channels.add(event["channel"])
+
+    def routes(self, app):
+        app.router.add_route("*", "/api/{method}", self.handle)
+        app.router.add_post("/upload/{file_id}", self.upload)
+
+    async def handle(self, request: web.Request):
+        method = request.match_info["method"]
+        self.calls[method] += 1
+        params = dict(request.query)
+        if request.content_type == "application/json":
+            params.update(await request.json())
+        elif request.can_read_body:
+            params.update(await request.post())
+        await self.delay()
+
+        rate, burst = self.LIMITS.get(method, self.DEFAULT_LIMIT)
+        key = (method, params.get("channel")) if method == "chat.postMessage" else method
+        wait = self.bucket(key, rate, burst).take()
+        if wait:
+            self.rate_limited += 1
+            return web.json_response({"ok": False, "error": "ratelimited"}, status=429,
+                                     headers={"Retry-After": str(math.ceil(wait))})
+        self.succeeded[method] += 1
+        return web.json_response(self.respond(method, params))
+
+    async def upload(self, request: web.Request):
+        await request.read()
+        await self.delay()
+        return web.Response(text="OK")
+
+    def respond(self, method: str, params: dict) -> dict:
+        if method == "auth.test":
+            return {"ok": True, "user_id": "UBOT0000", "bot_id": "BBOT0000"}
+        if method == "users.list":
+            return {"ok": True, "members": [{"id": user, "name": user.lower(), "real_name": f"User {user}"}
+                                            for user in sorted(self.users)]}
+        if method == "conversations.list":
+            return {"ok": True, "channels": [{"id": channel, "name": f"channel-{channel.lower()}"}
+                                             for channel in sorted(self.channels)]}
+        if method == "users.info":
+            user = params.get("user", "")
+            return {"ok": True, "user": {"id": user, "name": user.lower(), "real_name": f"User {user}"}}
+        if method == "conversations.info":
+            channel = params.get("channel", "")
+            return {"ok": True, "channel": {"id": channel, "name": f"channel-{channel.lower()}"}}
+        if method == "chat.postMessage":
+            return {"ok": True, "channel": params.get("channel"), "ts": f"{time.time():.6f}"}
+        if method == "files.getUploadURLExternal":
+            file_id = f"F{uuid.uuid4().hex[:10].upper()}"
+            return {"ok": True, "file_id": file_id, "upload_url": f"{self.base_url.rsplit('/api/', 1)[0]}/upload/{file_id}"}
+        if method == "files.completeUploadExternal":
+            return {"ok": True, "files": []}
+        return {"ok": True}
+
+
+class FakeDiscordApi(FakeServer):
+    """
+    Discord REST API の代わり
+    メッセージの送信はチャンネルごとに5秒間に5回（X-RateLimit-* ヘッダーと 429 を返す）
+    """
+
+    def __init__(self, latency, rng):
+        super().__init__(latency, rng)
+        self._sequence = 0
+
+    def routes(self, app):
+        app.router.add_get("/api/v10/users/@me", self.current_user)
+        app.router.add_get("/api/v10/oauth2/applications/@me", self.application)
+        app.router.add_post("/api/v10/channels/{channel_id}/messages", self.create_message)
+        app.router.add_route("*", "/api/v10/{tail:.*}", self.other)
+
+    @staticmethod
+    def json(data, status: int = 200, headers=None) -> web.Response:
+        # discord.py は Content-Type が "application/json" と完全に一致する場合だけ JSON として読む
+        return web.Response(body=json.dumps(data).encode(), status=status, headers=headers,
+                            content_type="application/json")
+
+    def snowflake(self) -> str:
+        self._sequence += 1
+        return str(((int(time.time() * 1000) - DISCORD_EPOCH) << 22) | (self._sequence & 0x3FFFFF))
+
+    async def current_user(self, request):
+        return self.json(BOT_USER)
+
+    async def application(self, request):
+        return self.json({"id": BOT_USER["id"], "name": "lab-bot", "description": "", "icon": None,
+                          "bot_public": False, "bot_require_code_grant": False, "verify_key": "",
+                          "owner": BOT_USER, "flags": 0})
+
+    async def create_message(self, request: web.Request):
+        channel_id = request.match_info["channel_id"]
+        self.calls["POST /channels/{channel_id}/messages"] += 1
+        if request.content_type == "application/json":
+            body = await request.json()
+        else:
+            # ファイル付きの場合は multipart の payload_json
+            form = await request.post()
+            body = json.loads(form.get("payload_json", "{}"))
+        await self.delay()
+
+        bucket = self.bucket(channel_id, 1.0, 5)
+        wait = bucket.take()
+        headers = {
+            "X-RateLimit-Limit": "5",
+            "X-RateLimit-Remaining": str(int(bucket.tokens)),
+            "X-RateLimit-Reset-After": f"{max(wait, (bucket.burst - bucket.tokens) / bucket.rate):.3f}",
+            "X-RateLimit-Bucket": f"channel-{channel_id}",
+        }
+        if wait:
+            self.rate_limited += 1
+            return self.json({"message": "You are being rate limited.", "retry_after": wait, "global": False},
+                                     status=429, headers=headers)
+        self.succeeded["POST /channels/{channel_id}/messages"] += 1
+        return self.json({
+            "id": self.snowflake(), "channel_id": channel_id, "guild_id": str(GUILD_ID), "author": BOT_USER,
+            "content": body.get("content") or "", "embeds": body.get("embeds", []),
+            "timestamp": datetime.now(timezone.utc).isoformat(), "edited_timestamp": None, "tts": False,
+            "mention_everyone": False, "mentions": [], "mention_roles": [], "attachments": [], "pinned": False,
+            "type": 0,
+        }, headers=headers)
+
+    async def other(self, request: web.Request):
+        self.calls[f"{request.method} {request.match_info['tail']}"] += 1
+        await self.delay()
+        return web.Response(status=204)
+
+
+# ---- 合成したイベント ----
+
+def synthetic_routes(channels: int):
+    routes = [{"slack": f"C9{n:08d}", "discord": 910000000000000000 + n, "direction": "slack_to_discord"}
+              for n in range(channels)]
+    routes.append({"slack": SYNTHETIC_SLACK_TARGET, "discord": SYNTHETIC_DISCORD_SOURCE,
+                   "direction": "discord_to_slack"})
+    return {"routes": routes}
+
+
+def generate_recording(path: str, messages: int, rate: float, rng: random.Random, channels: int = 1):
+    """Slackの発言（一部は再送）とDiscordの発言を記録と同じ形式で書き出す"""
+    started = time.time()
+    slack_channels = [route["slack"] for route in synthetic_routes(channels)["routes"][:channels]]
+    slack_users = [f"U{n:07d}" for n in range(20)]
+    with open(path, "w", encoding="utf-8") as file:
+        for i in range(messages):
+            at = started + i / rate
+            if i % 3 == 2:
+                author = {"id": str(800000000000000000 + i % 15), "username": f"member{i % 15}",
+                          "discriminator": "0", "avatar": None, "global_name": f"Member {i % 15}"}
+                payload = {
+                    "id": str(((int(at * 1000) - DISCORD_EPOCH) << 22) | i), "channel_id": str(SYNTHETIC_DISCORD_SOURCE),
+                    "guild_id": str(GUILD_ID), "author": author,
+                    "member": {"roles": [], "joined_at": "2024-04-01T00:00:00+00:00", "deaf": False, "mute": False},
+                    "content": f"Discordからの連絡 {i} **重要** <@{author['id']}>" + " 詳細" * rng.randint(0, 30),
+                    "timestamp": datetime.fromtimestamp(at, timezone.utc).isoformat(), "edited_timestamp": None,
+                    "tts": False, "mention_everyone": False, "mentions": [], "mention_roles": [], "attachments": [],
+                    "embeds": [], "pinned": False, "type": 0,
+                }
+                records = [{"time": at, "source": "discord", "type": "MESSAGE_CREATE", "payload": payload}]
+            else:
+                user = rng.choice(slack_users)
+                event = {"type": "message", "channel": rng.choice(slack_channels), "user": user,
+                         "text": f"Slackからの連絡 {i} *重要* <@{rng.choice(slack_users)}> :tada:" + " 詳細" * rng.randint(0, 30),
+                         "ts": f"{at:.6f}", "client_msg_id": str(uuid.uuid4())}
+                payload = {"type": "event_callback", "event_id": f"Ev{i:08d}", "event": event}
+                records = [{"time": at, "source": "slack", "type": "events_api", "envelope_id": str(uuid.uuid4()),
+                            "payload": payload}]
+                # Slackの再送（同じ event_id で別のエンベロープ）
+                if rng.random() < 0.05:
+                    records.append(dict(records[0], time=at + 0.5, envelope_id=str(uuid.uuid4())))
+            for record in records:
+                file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def load_recording(path: str):
+    with open(path, encoding="utf-8") as file:
+        records = [json.loads(line) for line in file if line.strip()]
+    records.sort(key=lambda record: record["time"])
+    # 記録の経過時間（Botを再起動した間などの長い間隔は詰める）
+    offset = 0.0
+    for previous, record in zip([None] + records, records):
+        if previous:
+            offset += min(record["time"] - previous["time"], MAX_GAP)
+        record["offset"] = offset
+    return records
+
+
+def guild_payload(records, route_channels):
+    """記録に含まれるチャンネル・転送ルートのチャンネルを持つサーバーのデータ（ゲートウェイの GUILD_CREATE の代わり）"""
+    guilds = defaultdict(set)
+    guilds[str(GUILD_ID)].update(str(channel_id) for channel_id in (
+        config.NOTIFICATION_CHANNEL_ID, config.DISCORD_NEWS_CHANNEL_ID,
+        config.DISCORD_LOG_CHANNEL_ID, config.DISCORD_ARXIV_CHANNEL_ID, *route_channels))
+    for record in records:
+        payload = record["payload"]
+        if record["source"] == "discord" and payload.get("guild_id") and payload.get("channel_id"):
+            guilds[payload["guild_id"]].add(payload["channel_id"])
+    for guild_id, channel_ids in guilds.items():
+        yield {
+            "id": guild_id, "name": "relay-replay", "owner_id": BOT_USER["id"], "features": [], "emojis": [],
+            "stickers": [], "member_count": 2, "members": [],
+            "roles": [{"id": guild_id, "name": "@everyone", "permissions": "0", "position": 0, "color": 0,
+                       "hoist": False, "managed": False, "mentionable": False}],
+            "channels": [{"id": channel_id, "type": 0, "name": f"channel-{channel_id}", "position": position,
+                          "permission_overwrites": [], "guild_id": guild_id}
+                         for position, channel_id in enumerate(sorted(channel_ids))],
+        }
+
+
+# ---- 計測 ----
+
+class FakeSocketModeClient:
+    """send_socket_mode_response を受け取り、受信から ack までの時間を記録する"""
+
+    def __init__(self, injected):
+        self.injected = injected
+        self.ack_latencies = []
+
+    async def send_socket_mode_response(self, response):
+        queue = self.injected.get(response.envelope_id)
+        if queue:
+            self.ack_latencies.append(time.monotonic() - queue.popleft())
+
+
+class ErrorCounter(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.count = 0
+        self.samples = []
+
+    def emit(self, record):
+        self.count += 1
+        if len(self.samples) < 3:
+            self.samples.append(record.getMessage()[:200])
+
+
+def percentile(values, q: float):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def describe_latency(values) -> str:
+    if not values:
+        return "0件"
+    return (f"{len(values)}件, p50 {percentile(values, 0.5) * 1000:.0f}ms, "
+            f"p99 {percentile(values, 0.99) * 1000:.0f}ms, 最大 {max(values) * 1000:.0f}ms")
+
+
+def format_quantile(value) -> str:
+    """ヒストグラムの分位点（バケットの上限による推定値）"""
+    return f"{value * 1000:.0f}ms" if value is not None and value != float("inf") else "-"
+
+
+async def replay(records, speed: float, latency: float):
+    rng = random.Random(7)
+    slack_api = FakeSlackApi(latency, rng, records)
+    discord_api = FakeDiscordApi(latency, rng)
+    await slack_api.start("/api/")
+    await discord_api.start("/api/v10")
+
+    import discord
+    discord.http.Route.BASE = discord_api.base_url
+    # Bot本体は実際のモジュールを使う（API の接続先だけをローカルサーバーにする）
+    from bot import discord_bot
+    import main as slack_main
+    from utils.metrics import INGEST_EVENTS, INGEST_WAIT
+
+    root = logging.getLogger()
+    for handler in root.handlers:
+        handler.setLevel(logging.CRITICAL)
+    root.setLevel(logging.ERROR)
+    errors = ErrorCounter()
+    root.addHandler(errors)
+
+    bot = discord_bot.bot
+    await bot.login("replay-token")
+    from services.channel_router import channel_router
+    for payload in guild_payload(records, channel_router.table.discord_channels):
+        bot._connection._add_guild_from_data(payload)
+
+    slack_bot = slack_main.SlackBot()
+    slack_bot.slack_client.base_url = slack_api.base_url
+    discord_bot.slack_client.base_url = slack_api.base_url
+    await slack_bot.directory.warm_up()
+
+    slack_injected = defaultdict(deque)
+    socket_client = FakeSocketModeClient(slack_injected)
+    discord_injected = {}
+    slack_to_discord = []
+    discord_to_slack = []
+
+    # 転送の完了時刻を記録する（処理は元の関数のまま）
+    on_sent = discord_bot.relay_queue.on_sent
+
+    async def timed_on_sent(sent, items):
+        now = time.monotonic()
+        slack_to_discord.extend(now - item.received_at for item in items if item.received_at)
+        await on_sent(sent, items)
+
+    discord_bot.relay_queue.on_sent = timed_on_sent
+    send_to_slack = discord_bot.send_to_slack
+    post_message = discord_bot.slack_client.chat_postMessage
+    # send_to_slack はエラーをログに出して握りつぶすため、投稿が成功した時刻を呼び出し元のタスクに返す
+    posted_at = contextvars.ContextVar("posted_at")
+    discord_dropped = [0]
+
+    async def timed_post_message(*args, **kwargs):
+        response = await post_message(*args, **kwargs)
+        posted = posted_at.get(None)
+        if posted is not None:
+            posted.append(time.monotonic())
+        return response
+
+    async def timed_send_to_slack(message, user, channel, slack_channels=None):
+        posted = []
+        token = posted_at.set(posted)
+        try:
+            await send_to_slack(message, user, channel, slack_channels)
+        finally:
+            posted_at.reset(token)
+        injected_at = discord_injected.pop(message.id, None)
+        if injected_at is None:
+            return
+        # 転送先のいずれにも投稿できなかったメッセージは遅延に含めず、未達として数える
+        if posted:
+            discord_to_slack.append(posted[0] - injected_at)
+        else:
+            discord_dropped[0] += 1
+
+    discord_bot.slack_client.chat_postMessage = timed_post_message
+    discord_bot.send_to_slack = timed_send_to_slack
+
+    slack_api.reset()
+    discord_api.reset()
+    tasks = []
+    counts = defaultdict(int)
+    started = time.monotonic()
+    for record in records:
+        if speed:
+            delay = record["offset"] / speed - (time.monotonic() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        counts[f"{record['source']} {record['type']}"] += 1
+        if record["source"] == "slack":
+            from slack_sdk.socket_mode.request import SocketModeRequest
+            envelope_id = record.get("envelope_id") or str(uuid.uuid4())
+            request = SocketModeRequest(type=record["type"], envelope_id=envelope_id, payload=record["payload"])
+            slack_injected[envelope_id].append(time.monotonic())
+            # Socket Mode のクライアントと同じく1件ごとにタスクを作る
+            tasks.append(asyncio.create_task(slack_bot.event_handler(socket_client, request)))
+        else:
+            parser = bot._connection.parsers.get(record["type"])
+            if parser is None:
+                continue
+            if record["type"] == "MESSAGE_CREATE":
+                discord_injected[int(record["payload"]["id"])] = time.monotonic()
+            try:
+                parser(record["payload"])
+            except Exception as e:
+                errors.count += 1
+                errors.samples.append(f"{record['type']}: {e}")
+    injected_at = time.monotonic() - started
+
+    # すべてのイベントの処理と送信キューが空になるまで待つ
+    await asyncio.gather(*tasks)
+    await slack_bot.ingest.join()
+    while any(task.get_name().startswith("discord.py: on_") and not task.done() for task in asyncio.all_tasks()):
+        await asyncio.sleep(0.05)
+    await discord_bot.relay_queue.close()
+    elapsed = time.monotonic() - started
+
+    messages = counts["slack events_api"] + counts["discord MESSAGE_CREATE"]
+    slack_calls = sum(slack_api.calls.values())
+    discord_calls = sum(discord_api.calls.values())
+    print(f"再生: {len(records)}件 ({', '.join(f'{key} {value}' for key, value in sorted(counts.items()))}), "
+          f"速度 {'max' if not speed else f'{speed:g}x'}, API遅延 {latency * 1000:.0f}ms")
+    print(f"処理時間: {elapsed:.2f}秒（投入 {injected_at:.2f}秒）, スループット {messages / elapsed:.1f}件/秒")
+    print(f"Slack→Discord 転送: {describe_latency(slack_to_discord)}")
+    print(f"Discord→Slack 転送: {describe_latency(discord_to_slack)} "
+          f"(未達 {discord_dropped[0]}件, Slack に届いた投稿 {slack_api.succeeded['chat.postMessage']}件)")
+    print(f"Slack ack: {describe_latency(socket_client.ack_latencies)}")
+    print(f"受信キューの待ち時間: p50 {format_quantile(INGEST_WAIT.quantile(0.5, queue='slack_ingest'))}, "
+          f"p99 {format_quantile(INGEST_WAIT.quantile(0.99, queue='slack_ingest'))} "
+          f"(処理待ちの上限超過: {int(INGEST_EVENTS.value(queue='slack_ingest', status='rejected'))}件)")
+    print(f"Slack API: {slack_calls}回 (429: {slack_api.rate_limited}回) {dict(slack_api.calls)}")
+    print(f"Discord API: {discord_calls}回 (429: {discord_api.rate_limited}回) {dict(discord_api.calls)}")
+    if messages:
+        print(f"1メッセージあたりの API 呼び出し: {(slack_calls + discord_calls) / messages:.2f}回")
+    print(f"エラーログ: {errors.count}件 {errors.samples}")
+
+    await bot.http.close()
+    await slack_api.stop()
+    await discord_api.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="記録したイベントを再生して転送性能を計測する")
+    parser.add_argument("recording", nargs="?", help="TRAFFIC_RECORD_FILE で記録した JSONL（省略時は合成）")
+    parser.add_argument("--speed", default="max", help="再生速度（1, 10 など。max は待機なし）")
+    parser.add_argument("--latency", type=float, default=50, help="ローカルAPIサーバーの平均応答時間（ミリ秒）")
+    parser.add_argument("--messages", type=int, default=600, help="合成する場合のメッセージ数")
+    parser.add_argument("--rate", type=float, default=20, help="合成する場合の毎秒のメッセージ数")
+    parser.add_argument("--channels", type=int, default=1, help="合成する場合の転送するSlackチャンネル数")
+    parser.add_argument("--routes", help="記録を再生する場合の転送ルート（省略時は config.ROUTING_FILE）")
+    args = parser.parse_args()
+    speed = 0.0 if args.speed == "max" else float(args.speed)
+
+    recording = os.path.abspath(args.recording) if args.recording else None
+    routes = os.path.abspath(args.routes or config.ROUTING_FILE)
+    sys.path.insert(0, os.getcwd())
+    with tempfile.TemporaryDirectory() as directory:
+        if recording is None:
+            recording = os.path.join(directory, "traffic.jsonl")
+            generate_recording(recording, args.messages, args.rate, random.Random(1), args.channels)
+            routes = os.path.join(directory, "routes.json")
+            with open(routes, "w", encoding="utf-8") as file:
+                json.dump(synthetic_routes(args.channels), file)
+        records = load_recording(recording)
+        # Bot のデータ・ログ・DB は一時ディレクトリに作る
+        os.chdir(directory)
+        config.DATABASE_URL = f"sqlite:///{os.path.join(directory, 'replay.db')}"
+        config.TRAFFIC_RECORD_FILE = None
+        config.ROUTING_FILE = routes
+        config.LOG_LIBRARY_LEVEL = "WARNING"
+        asyncio.run(replay(records, speed, args.latency / 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,45 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-from utils.logger import log_event
+from utils.logger import log_event, tail_log, format_log_line
 from utils.formatter import format_message
 from utils.embed_utils import create_error_embed, create_notification_embed
-from config import DISCORD_BOT_TOKEN, SLACK_BOT_TOKEN, NOTIFICATION_CHANNEL_ID, NOTIFICATION_CHANNEL_ID2, SLACK_CHANNEL_ID_1, SLACK_CHANNEL_ID_4, DISCORD_NEWS_CHANNEL_ID, DISCORD_ROLE_ID, MAX_FILE_SIZE, ALLOWED_FILE_TYPES, DISCORD_ARXIV_CHANNEL_ID, DISCORD_LOG_CHANNEL_ID
+from config import DISCORD_BOT_TOKEN, SLACK_BOT_TOKEN, NOTIFICATION_CHANNEL_ID, DISCORD_NEWS_CHANNEL_ID, DISCORD_ROLE_ID, MAX_FILE_SIZE, ALLOWED_FILE_TYPES, DISCORD_ARXIV_CHANNEL_ID, DISCORD_LOG_CHANNEL_ID, DEDUP_TTL, DEDUP_MAX_SIZE, SCHEDULE_REMINDER_HOUR, ARXIV_MAX_RESULTS, LOG_FILE, NEWS_PREFETCH_CRON, NEWS_POST_CRON, PRESENCE_UPDATE_INTERVAL, MAINTENANCE_CRON, SYSTEM_SAMPLE_INTERVAL, ROUTING_RELOAD_INTERVAL
 import logging
-from slack_sdk.web.async_client import AsyncWebClient
-from utils.emoji_mapper import EmojiMapper
-from datetime import datetime, timedelta, time
+from utils.emoji_mapper import emoji_index
+from utils.markdown_converter import discord_to_slack
+from datetime import datetime, timezone
 import asyncio
-import aiohttp
 import io
 import os
 import time as time_module
-import chardet
-from services.news_service import NewsService
-import pytz
-import psutil
+from services.news_service import news_service
+from services.news_index import seen_articles
+from services.message_link_service import MessageLinkStore
+from services.favorites_service import FavoritesStore
+from services.schedule_service import ScheduleJournal, ReminderDispatcher
+from services.arxiv_service import arxiv_client, ArxivError
+from services.system_monitor import system_monitor
+from services.job_scheduler import scheduler, CronTrigger, IntervalTrigger
+from services.migration_service import MigrationEngine, SlackExportImporter, migrate_channels
+from services.slack_directory import SlackDirectory
+from services.channel_router import channel_router
+from services.memory_profiler import memory_profiler
+from services.traffic_recorder import traffic_recorder
+from services.relay_queue import RelayQueue
+from services.http_client import http_pool
+from services.slack_api import InstrumentedWebClient
+from services.file_service import download_file, is_allowed_file, upload_to_slack, FileTransferError
+from utils.dedup import DedupWindow
+from utils.metrics import API_CALLS, API_ERRORS, RELAY_LATENCY, QUEUE_DEPTH, INGEST_WAIT, register_cache, cache_hit_ratio
 from typing import Literal
-import json
-from datetime import datetime, date
 import requests
-from xml.etree import ElementTree
 import random
-import json
 from typing import Optional
 
-SCHEDULE_FILE = "data/schedules.json" # スケジュールデータを保存するファイル
-FAVORITES_FILE = "data/favorites.json" # お気に入り論文を保存するファイル
+SCHEDULE_FILE = "data/schedules.json" # 旧形式のスケジュールファイル（ジャーナルへの移行元）
+SCHEDULE_JOURNAL_FILE = "data/schedules.jsonl" # スケジュールの変更履歴を追記するファイル
+FAVORITES_FILE = "data/favorites.json" # 旧形式のお気に入り論文ファイル（SQLiteへの移行元）
 
 # スケジュールデータを保存するディレクトリの作成
 os.makedirs("data", exist_ok=True)
@@ -44,13 +55,64 @@ class LabBot(commands.Bot):
         super().__init__(*args, **kwargs)
         self.start_time = datetime.now()
 
+    async def setup_hook(self):
+        # Discord REST API の呼び出しをメトリクスに記録する
+        request = self.http.request
+
+        async def instrumented_request(route, **kwargs):
+            API_CALLS.inc(service="discord", method=f"{route.method} {route.path}")
+            try:
+                return await request(route, **kwargs)
+            except Exception:
+                API_ERRORS.inc(service="discord", method=f"{route.method} {route.path}")
+                raise
+
+        self.http.request = instrumented_request
+
+    async def close(self):
+        # 共有HTTPクライアントも一緒に終了する
+        await http_pool.close()
+        await super().close()
+
 # Botインスタンスの作成を修正
-bot = LabBot(command_prefix="!", intents=intents)
+# イベントを記録する場合はゲートウェイの生のメッセージを受け取る
+bot = LabBot(command_prefix="!", intents=intents, enable_debug_events=traffic_recorder.enabled)
+
+slack_client = InstrumentedWebClient(token=SLACK_BOT_TOKEN)
+
+# Slack履歴の移行（/migrate）
+migration_engine = MigrationEngine(slack_client, SlackDirectory(slack_client), lambda channel_id: bot.get_channel(int(channel_id)))
+export_importer = SlackExportImporter()
+
+# メッセージごとのログ（DEBUGは間引いて出力）
+relay_logger = logging.getLogger("relay")
+
+# Slackへ転送済みのメッセージ（重複送信の防止）
+relayed_messages = DedupWindow(DEDUP_TTL, DEDUP_MAX_SIZE)
+
+# お気に入り論文（初回起動時に favorites.json から移行）
+favorites_store = FavoritesStore(FAVORITES_FILE)
+
+# スケジュール（変更はジャーナルに追記）と当日のリマインド
+schedules = ScheduleJournal(SCHEDULE_JOURNAL_FILE, legacy_path=SCHEDULE_FILE)
+reminder_dispatcher = ReminderDispatcher(bot, schedules, NOTIFICATION_CHANNEL_ID)
+
+# DiscordメッセージとSlackメッセージの対応表（リアクション同期用）
+message_links = MessageLinkStore()
 
-slack_client = AsyncWebClient(token=SLACK_BOT_TOKEN)
+async def record_relay_links(sent, items):
+    """まとめて送信したメッセージとSlackのtsを対応付ける（リアクションは最初のメッセージに同期される）"""
+    await message_links.add_many(sent.channel.id, sent.id, [
+        (item.slack_channel, item.slack_ts) for item in items if item.slack_channel and item.slack_ts
+    ])
 
-# メッセージ転送履歴を追跡するためのキャッシュ
-message_cache = {}
+# Slack→Discordの送信キュー
+relay_queue = RelayQueue(bot, on_sent=record_relay_links)
+
+QUEUE_DEPTH.set_function(relay_queue.depth, queue="relay")
+register_cache("arxiv", arxiv_client.cache)
+register_cache("news", news_service)
+register_cache("discord_relay_dedup", relayed_messages)
 
 # チャンネルチェックデコレータ
 def arxiv_channel_only():
@@ -64,34 +126,6 @@ def arxiv_channel_only():
         return True
     return app_commands.check(predicate)
 
-# お気に入り論文の読み込み関数を修正
-def load_favorites():
-    try:
-        if os.path.exists(FAVORITES_FILE):
-            with open(FAVORITES_FILE, 'r', encoding='utf-8') as f:
-                content = f.read()
-                if content:
-                    return json.loads(content)
-        # ファイルが存在しないか空の場合は空の辞書を返す
-        return {}
-    except json.JSONDecodeError as e:
-        logging.error(f"JSONデコードエラー: {e}")
-        return {}
-    except Exception as e:
-        logging.error(f"ファイル読み込みエラー: {e}")
-        return {}
-
-# お気に入り論文の保存関数を修正
-def save_favorites(favorites):
-    try:
-        # データディレクトリが存在しない場合は作成
-        os.makedirs(os.path.dirname(FAVORITES_FILE), exist_ok=True)
-        with open(FAVORITES_FILE, 'w', encoding='utf-8') as f:
-            json.dump(favorites, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        logging.error(f"ファイル保存エラー: {e}")
-        raise
-
 @bot.event
 async def on_ready():
     print(f"{bot.user} is now running!")
@@ -100,11 +134,13 @@ async def on_ready():
         synced = await bot.tree.sync()
         print(f"Synced {len(synced)} commands")
 
-        # ニュース投稿タスクの開始
-        bot.loop.create_task(schedule_news())
-        
-        # ステータス更新タスクの開始
-        bot.loop.create_task(update_bot_status())
+        # カスタム絵文字の対応表を更新
+        emoji_index.set_discord_custom(e for guild in bot.guilds for e in guild.emojis)
+
+        # 定期ジョブ（ニュース・ステータス更新・計測・整理）と予定のリマインドを開始
+        # on_ready は再接続時にも呼ばれるが、どちらも二重には起動しない
+        await scheduler.start()
+        reminder_dispatcher.start()
         
         # サーバー情報をログに記録
         logging.info(f"Connected to {len(bot.guilds)} servers")
@@ -116,72 +152,96 @@ async def on_ready():
     except Exception as e:
         print(f"Failed to sync commands: {e}")
 
-# ステータス更新用の関数を追加
+# ---- 定期ジョブ ----
+
 async def update_bot_status():
-    """定期的にボットのステータスを更新"""
-    while True:
-        try:
-            # 接続時間を計算
-            uptime = datetime.now() - bot.start_time
-            hours = uptime.total_seconds() // 3600
-            minutes = (uptime.total_seconds() % 3600) // 60
-
-            # システム情報を取得
-            memory_usage = psutil.Process().memory_info().rss / 1024 / 1024  # MB
-            cpu_percent = psutil.Process().cpu_percent()
-            
-            # ネットワーク情報を取得
-            net_io = psutil.net_io_counters()
-            network_speed = (net_io.bytes_sent + net_io.bytes_recv) / 1024 / 1024  # MB
-            
-            # ステータス文字列を作成
-            status_details = f"CPU: {cpu_percent:.1f}% | MEM: {memory_usage:.1f}MB"
-            status_state = f"NET: {network_speed:.1f}MB/s"
-            
-            # ステータスを更新
-            activity = discord.Activity(
-                type=discord.ActivityType.watching,
-                name=f"稼働時間: {int(hours)}時間{int(minutes)}分",
-                details=status_details,
-                state=status_state
-            )
-            await bot.change_presence(
-                status=discord.Status.online,
-                activity=activity
-            )
-            await asyncio.sleep(60)  # 1分ごとに更新
+    """ボットのステータスを更新"""
+    # 接続時間を計算
+    uptime = datetime.now() - bot.start_time
+    hours = uptime.total_seconds() // 3600
+    minutes = (uptime.total_seconds() % 3600) // 60
+
+    # 計測済みのシステム情報を取得
+    sample = system_monitor.latest() or system_monitor.sample()
+    memory_usage = sample.rss / 1024 / 1024  # MB
+    network_speed = (sample.net_sent_rate + sample.net_recv_rate) / 1024 / 1024  # MB/s
+
+    # ステータス文字列を作成
+    status_details = f"CPU: {sample.process_cpu_percent:.1f}% | MEM: {memory_usage:.1f}MB"
+    status_state = f"NET: {network_speed:.2f}MB/s"
+
+    # ステータスを更新
+    activity = discord.Activity(
+        type=discord.ActivityType.watching,
+        name=f"稼働時間: {int(hours)}時間{int(minutes)}分",
+        details=status_details,
+        state=status_state
+    )
+    await bot.change_presence(
+        status=discord.Status.online,
+        activity=activity
+    )
 
-        except Exception as e:
-            logging.error(f"ステータス更新エラー: {e}")
-            await asyncio.sleep(60)
+async def sample_system():
+    system_monitor.sample()
 
-async def schedule_news():
-    """毎朝9時にニュースを投稿するスケジューラー"""
-    try:
-        news_service = NewsService(bot)
-        japan_tz = pytz.timezone('Asia/Tokyo')
+async def prefetch_news():
+    """投稿前に記事を取得してキャッシュしておき、投稿時はAPIを呼ばない"""
+    await news_service.prefetch()
 
-        while True:
-            now = datetime.now(japan_tz)
-            target_time = time(hour=9, minute=0)  # datetime.timeを使用
+async def post_news():
+    """毎朝のニュース投稿"""
+    await news_service.post_news(bot.get_channel(DISCORD_NEWS_CHANNEL_ID))
 
-            # 次の実行時刻を計算
-            if now.time() >= target_time:
-                tomorrow = now.date() + timedelta(days=1)
-                next_run = datetime.combine(tomorrow, target_time)
-            else:
-                next_run = datetime.combine(now.date(), target_time)
+async def run_maintenance():
+    """期限切れキャッシュの削除とジャーナルの整理"""
+    removed = await arxiv_client.cache.prune()
+    schedules.compact()
+    logging.info(f"定期メンテナンスを実行しました (arXivキャッシュ削除: {removed}件)")
 
-            next_run = japan_tz.localize(next_run)
-            delay = (next_run - now).total_seconds()
+def format_memory_report(report) -> discord.Embed:
+    """メモリ使用量の変化を埋め込みにする"""
+    def mb(size):
+        return f"{size / 1024 / 1024:+.2f}MB"
 
-            await asyncio.sleep(delay)
-            await news_service.post_news()
-    except Exception as e:
-        logging.error(f"ニュース配信スケジューラーでエラーが発生: {e}")
+    embed = discord.Embed(
+        title="🧠 メモリ使用量の変化",
+        description=(
+            f"追跡中: {report.current / 1024 / 1024:.1f}MB (最大 {report.peak / 1024 / 1024:.1f}MB)\n"
+            f"前回から: {mb(report.total_diff)} / {report.elapsed / 60:.0f}分間\n"
+            f"計測開始: <t:{int(report.started_at)}:R>"
+        ),
+        color=discord.Color.orange() if report.total_diff > 0 else discord.Color.green(),
+        timestamp=datetime.now()
+    )
+    modules = "\n".join(f"{mb(diff)} {name} ({size / 1024:.0f}KB)" for name, diff, size in report.modules)
+    embed.add_field(name="増加したモジュール", value=f"```\n{modules[:1000]}\n```" if modules else "なし", inline=False)
+    lines = "\n".join(f"{mb(diff)} {location} ({count:+d}個)" for location, diff, count in report.lines)
+    embed.add_field(name="増加した行", value=f"```\n{lines[:1000]}\n```" if lines else "なし", inline=False)
+    return embed
+
+async def post_memory_report(report):
+    """計測中の定期スナップショットをログチャンネルに投稿する"""
+    channel = bot.get_channel(DISCORD_LOG_CHANNEL_ID)
+    if channel:
+        await channel.send(embed=format_memory_report(report))
+
+memory_profiler.on_report = post_memory_report
+
+scheduler.add_job("system_sample", sample_system, IntervalTrigger(SYSTEM_SAMPLE_INTERVAL))
+scheduler.add_job("presence", update_bot_status, IntervalTrigger(PRESENCE_UPDATE_INTERVAL), timeout=30)
+scheduler.add_job("news_prefetch", prefetch_news, CronTrigger(NEWS_PREFETCH_CRON), jitter=60, timeout=120)
+scheduler.add_job("news_post", post_news, CronTrigger(NEWS_POST_CRON), catch_up=True, timeout=120)
+scheduler.add_job("maintenance", run_maintenance, CronTrigger(MAINTENANCE_CRON), jitter=600, catch_up=True)
+scheduler.add_job("routing_reload", channel_router.reload_if_changed, IntervalTrigger(ROUTING_RELOAD_INTERVAL))
 
 # on_message イベントハンドラーを修正
 
+@bot.event
+async def on_socket_raw_receive(msg):
+    """ゲートウェイのイベントを記録する（TRAFFIC_RECORD_FILE を設定した場合のみ呼ばれる）"""
+    traffic_recorder.record_gateway(msg)
+
 @bot.event
 async def on_message(message):
     # Botからのメッセージは完全に無視
@@ -191,26 +251,28 @@ async def on_message(message):
     # コマンド処理を優先
     await bot.process_commands(message)
 
-    # NOTIFICATION_CHANNEL_ID2からのメッセージのみSlackに転送
-    if message.channel.id == NOTIFICATION_CHANNEL_ID2:
+    # 転送ルートに転送先があるチャンネルのメッセージのみSlackに転送
+    table = channel_router.table
+    slack_channels = table.slack_targets(message.channel.id)
+    if slack_channels:
         try:
             # テキストメッセージの転送
             if message.content:
-                await send_to_slack(message, message.author, message.channel)
+                await send_to_slack(message, message.author, message.channel, slack_channels)
 
             # ファイルの転送
             if message.attachments:
                 for attachment in message.attachments:
-                    await send_file_to_slack(message, attachment)
+                    await send_file_to_slack(message, attachment, slack_channels)
 
-            logging.info(f"Message and files forwarded from Discord user {message.author.name}")
+            relay_logger.debug("Message and files forwarded from Discord user %s", message.author.name)
         except Exception as e:
             logging.error(f"Failed to send message or files to Slack: {e}")
         return
 
     # 通常のメッセージ処理（スラッシュコマンドではない場合のみ）
     if not message.content.startswith('/'):
-        if message.channel.id != NOTIFICATION_CHANNEL_ID:
+        if message.channel.id != NOTIFICATION_CHANNEL_ID and message.channel.id not in table.discord_channels:
             log_event(f"Discord メッセージ受信: {message.content}")
             try:
                 formatted_message = format_message(message.content)
@@ -229,6 +291,14 @@ async def notify(interaction: discord.Interaction, user: discord.Member, *, cont
     else:
         await interaction.response.send_message("通知チャンネルが見つかりません。", ephemeral=True)
 
+def format_channel_mentions(channel_ids, limit: int = 10) -> str:
+    """チャンネルの一覧（多い場合は先頭だけ表示する）"""
+    channel_ids = sorted(channel_ids)
+    if not channel_ids:
+        return "なし"
+    mentions = ", ".join(f"<#{channel_id}>" for channel_id in channel_ids[:limit])
+    return mentions + (f" ほか{len(channel_ids) - limit}件" if len(channel_ids) > limit else "")
+
 # 管理者権限チェック用のデコレータを作成
 def is_admin():
     async def predicate(interaction: discord.Interaction) -> bool:
@@ -260,23 +330,14 @@ def log_channel_only():
 @bot.tree.command(name="log")
 @is_admin()
 @log_channel_only()
-async def log(interaction: discord.Interaction):
+async def log(interaction: discord.Interaction, lines: int = 10):
     """
     最新のログを表示します（管理者のみ）
     """
     try:
-        # ファイルのエンコーディングを自動検出
-        with open("logs.txt", 'rb') as f:
-            raw_data = f.read()
-            detected = chardet.detect(raw_data)
-            encoding = detected['encoding']
-
-        # 検出されたエンコーディングでファイルを読み込み
-        with open("logs.txt", "r", encoding=encoding) as f:
-            logs = f.readlines()
-
-        # 最新の10行を取得
-        recent_logs = ''.join(logs[-10:])
+        lines = max(1, min(lines, 50))
+        # ファイル末尾だけを読み込む
+        recent_logs = '\n'.join(format_log_line(line) for line in await asyncio.to_thread(tail_log, lines))
 
         # 文字列が空でないことを確認
         if not recent_logs.strip():
@@ -286,14 +347,15 @@ async def log(interaction: discord.Interaction):
             )
             return
 
+        # Discordの文字数制限に収まるよう古い行から削る
+        recent_logs = recent_logs[-1900:]
         await interaction.response.send_message(
-            f"最新のログ (エンコーディング: {encoding}):\n```\n{recent_logs}\n```",
+            f"最新のログ ({lines}行):\n```\n{recent_logs}\n```",
             ephemeral=True
         )
     except Exception as e:
         await interaction.response.send_message(
-            f"ログの読み取りに失敗しました。エラー: {str(e)}\n"
-            f"エンコーディング: {encoding if 'encoding' in locals() else '不明'}",
+            f"ログの読み取りに失敗しました。エラー: {str(e)}",
             ephemeral=True
         )
         logging.error(f"ログ読み取りエラー: {e}")
@@ -308,7 +370,7 @@ async def log_delete(interaction: discord.Interaction):
     """ログファイルの内容を削除します（管理者のみ）"""
     try:
         # ファイルを空にする
-        with open("logs.txt", "w", encoding='utf-8') as f:
+        with open(LOG_FILE, "w", encoding='utf-8') as f:
             f.write("")
 
         embed = discord.Embed(
@@ -343,6 +405,145 @@ async def log_delete(interaction: discord.Interaction):
         )
         logging.error(f"ログ削除エラー: {e}")
 
+@bot.tree.command(
+    name="migrate",
+    description="Slackチャンネルの履歴をDiscordチャンネルへ移行します（管理者のみ）"
+)
+@is_admin()
+async def migrate(interaction: discord.Interaction, slack_channels: str, channel: discord.TextChannel,
+                  from_archive: bool = False):
+    """
+    Slackチャンネルの履歴を移行します（管理者のみ）
+    slack_channels: SlackチャンネルID（複数の場合はカンマ区切り）
+    from_archive: /migrate_import で取り込んだエクスポートから移行する
+    中断した場合は同じコマンドで続きから再開します
+    """
+    slack_channel_ids = [channel_id.strip() for channel_id in slack_channels.split(",") if channel_id.strip()]
+    if not slack_channel_ids:
+        await interaction.response.send_message("SlackチャンネルIDを指定してください。", ephemeral=True)
+        return
+    if migration_engine.running:
+        await interaction.response.send_message(
+            f"移行は既に実行中です。\n```\n{migration_engine.progress.describe()[:1800]}\n```",
+            ephemeral=True
+        )
+        return
+
+    await interaction.response.send_message("移行を開始しました。進捗はこのチャンネルに表示します。", ephemeral=True)
+    # インタラクションのトークンは15分で失効するため、進捗は通常のメッセージを編集して表示する
+    status_message = await interaction.channel.send(
+        f"🚚 移行を開始します: {', '.join(slack_channel_ids)} → {channel.mention}"
+    )
+
+    async def report(progress):
+        title = "✅ 移行完了" if progress.finished else "🚚 移行中"
+        await status_message.edit(content=f"{title}\n```\n{progress.describe()[:1800]}\n```")
+
+    try:
+        await migrate_channels(migration_engine, slack_channel_ids, channel.id, on_progress=report,
+                               from_archive=from_archive)
+    except Exception as e:
+        logging.error(f"移行エラー: {e}")
+        await status_message.edit(content=f"❌ 移行に失敗しました: {e}")
+
+@bot.tree.command(
+    name="migrate_import",
+    description="Slackのエクスポート（ZIP）を取り込みます（管理者のみ）"
+)
+@is_admin()
+async def migrate_import(interaction: discord.Interaction, path: str):
+    """
+    Botを実行しているサーバー上のSlackエクスポート（ZIP）を取り込みます（管理者のみ）
+    取り込んだ履歴は /migrate の from_archive で投稿します
+    """
+    if not os.path.isfile(path):
+        await interaction.response.send_message(f"ファイルが見つかりません: {path}", ephemeral=True)
+        return
+
+    await interaction.response.send_message("エクスポートの取り込みを開始しました。", ephemeral=True)
+    status_message = await interaction.channel.send(f"📦 エクスポートを取り込んでいます: `{os.path.basename(path)}`")
+    try:
+        result = await asyncio.to_thread(export_importer.import_zip, path)
+    except Exception as e:
+        logging.error(f"エクスポートの取り込みエラー: {e}")
+        await status_message.edit(content=f"❌ エクスポートの取り込みに失敗しました: {e}")
+        return
+
+    channels = "\n".join(
+        f"#{name} ({channel_id}): {result.counts.get(channel_id, 0)}件"
+        for name, channel_id in sorted(result.channels.items())
+        if result.counts.get(channel_id)
+    )
+    await status_message.edit(content=(
+        f"✅ エクスポートを取り込みました: {result.messages}件 / {result.files}ファイル "
+        f"({result.elapsed:.1f}秒, {result.rate():.0f}件/秒)\n```\n{channels[:1700]}\n```"
+    ))
+
+@bot.tree.command(
+    name="routes",
+    description="Slack⇔Discordの転送ルートを表示・再読み込みします（管理者のみ）"
+)
+@is_admin()
+async def routes(interaction: discord.Interaction, action: Literal["show", "reload"] = "show"):
+    """
+    転送ルートを表示します（管理者のみ）
+    reload: ルートのファイルを今すぐ読み込み直す（通常は更新から一定時間内に自動で反映されます）
+    """
+    message = ""
+    if action == "reload":
+        _, message = await asyncio.to_thread(channel_router.reload)
+    table = channel_router.table
+    description = table.describe() or "なし"
+    if len(description) > 1800:
+        description = description[:1800] + "\n..."
+    await interaction.response.send_message(
+        f"{message}\n転送ルート ({len(table.routes)}件, `{channel_router.path}`):\n```\n{description}\n```".lstrip(),
+        ephemeral=True
+    )
+
+@bot.tree.command(
+    name="memory",
+    description="メモリ使用量の計測を開始・終了します（管理者のみ）"
+)
+@is_admin()
+@log_channel_only()
+async def memory(interaction: discord.Interaction, action: Literal["start", "stop", "report"]):
+    """
+    tracemalloc によるメモリ使用量の計測を操作します（管理者のみ）
+    計測中は一定間隔で前回からの増加分をこのチャンネルに投稿します
+    """
+    try:
+        if action == "start":
+            started = await memory_profiler.start()
+            message = (f"メモリの計測を開始しました。{memory_profiler.interval / 60:.0f}分ごとに報告します。"
+                       if started else "メモリの計測は既に実行中です。")
+            await interaction.response.send_message(message, ephemeral=True)
+        elif action == "stop":
+            stopped = memory_profiler.stop()
+            await interaction.response.send_message(
+                "メモリの計測を終了しました。" if stopped else "メモリの計測は実行されていません。",
+                ephemeral=True
+            )
+        else:
+            if not memory_profiler.running:
+                await interaction.response.send_message(
+                    "メモリの計測は実行されていません。/memory start で開始してください。",
+                    ephemeral=True
+                )
+                return
+            await interaction.response.defer(ephemeral=True)
+            report = await memory_profiler.take_report()
+            if report is None:
+                await interaction.followup.send("メモリの計測は実行されていません。", ephemeral=True)
+                return
+            await interaction.followup.send(embed=format_memory_report(report), ephemeral=True)
+    except Exception as e:
+        logging.error(f"メモリ計測エラー: {e}")
+        if interaction.response.is_done():
+            await interaction.followup.send(f"メモリの計測に失敗しました: {e}", ephemeral=True)
+        else:
+            await interaction.response.send_message(f"メモリの計測に失敗しました: {e}", ephemeral=True)
+
 @bot.tree.command(
     name="news",
     description="最新のテックニュースを取得します"
@@ -357,7 +558,6 @@ async def news(interaction: discord.Interaction, default: bool = False):
             return
 
         await interaction.response.defer(ephemeral=True)
-        news_service = NewsService(bot)
         # ニュース取得中にデフォルトのニュースを表示
         if default:
             default_article = {
@@ -380,6 +580,8 @@ async def news(interaction: discord.Interaction, default: bool = False):
                 news_service.fetch_news(),
                 timeout=15.0
             )
+            # 投稿済みの記事・別の媒体による同じ記事は表示しない
+            articles = await seen_articles.filter_new(articles, record=False)
             
             if not articles:
                 # デフォルトのニュース情報を作成
@@ -398,15 +600,12 @@ async def news(interaction: discord.Interaction, default: bool = False):
                 )
                 return
 
-            for i, article in enumerate(articles[:5]):
-                if embed := news_service.create_news_embed(article):
-                    prefix = "🌟 今日のテックニュース" if i == 0 else ""
-                    await interaction.followup.send(
-                        content=prefix,
-                        embed=embed,
-                        ephemeral=True
-                    )
-                await asyncio.sleep(0.5)
+            # 定期投稿と共有のキャッシュから、1回の送信でまとめて表示する
+            await interaction.followup.send(
+                content="🌟 今日のテックニュース",
+                embeds=[embed for _, embed in news_service.create_news_embeds(articles)],
+                ephemeral=True
+            )
 
         except asyncio.TimeoutError:
             await interaction.followup.send(
@@ -435,52 +634,54 @@ async def news(interaction: discord.Interaction, default: bool = False):
     description="arXivから論文を検索します"
 )
 @arxiv_channel_only()
-async def arxiv_search(interaction: discord.Interaction, query: str):
+async def arxiv_search(interaction: discord.Interaction, query: str, max_results: int = 5):
     try:
-        url = f'http://export.arxiv.org/api/query?search_query=all:{query}&start=0&max_results=5'
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status == 200:
-                    content = await response.text()
-                    root = ElementTree.fromstring(content)
-                    entries = root.findall('{http://www.w3.org/2005/Atom}entry')
-
-                    if not entries:
-                        await interaction.response.send_message("論文が見つかりませんでした。", ephemeral=True)
-                        return
-
-                    embed = discord.Embed(
-                        title=f"検索結果 (キーワード: {query})",
-                        description="IDをコピーするには、IDの行を選択してコピーしてください。",
-                        color=discord.Color.blue()
-                    )
-                    
-                    for entry in entries:
-                        title = entry.find('{http://www.w3.org/2005/Atom}title').text
-                        link = entry.find('{http://www.w3.org/2005/Atom}id').text
-                        paper_id = link.split('/')[-1]
-                        
-                        # タイトルとキーワードを組み合わせて表示
-                        keywords = [kw.strip() for kw in query.split(',')]
-                        keyword_text = " | ".join([f"🔑={kw}" for kw in keywords])
-                        
-                        embed.add_field(
-                            name=f"📄 論文情報",
-                            value=(
-                                f"**タイトル**: {title}\n"
-                                f"**キーワード**: {keyword_text}\n"
-                                f"**ID**: `{paper_id}`\n"
-                                f"**リンク**: [arXiv]({link})"
-                            ),
-                            inline=False
-                        )
-                    
-                    await interaction.response.send_message(embed=embed, ephemeral=True)
-                else:
-                    await interaction.response.send_message("APIの呼び出しに失敗しました。", ephemeral=True)
+        # arXiv APIの待ち時間があるため先に応答を保留する
+        await interaction.response.defer(ephemeral=True)
+        max_results = max(1, min(max_results, ARXIV_MAX_RESULTS))
+
+        # タイトルとキーワードを組み合わせて表示
+        keywords = [kw.strip() for kw in query.split(',')]
+        keyword_text = " | ".join([f"🔑={kw}" for kw in keywords])
+
+        def new_embed(page):
+            return discord.Embed(
+                title=f"検索結果 (キーワード: {query})" + (f" - {page}ページ目" if page > 1 else ""),
+                description="IDをコピーするには、IDの行を選択してコピーしてください。",
+                color=discord.Color.blue()
+            )
+
+        # 10件ごとに送信し、後続の結果は取得しながら順次表示する
+        page = 1
+        count = 0
+        embed = new_embed(page)
+        async for entry in arxiv_client.iter_search(query, max_results=max_results):
+            embed.add_field(
+                name=f"📄 論文情報",
+                value=(
+                    f"**タイトル**: {entry.title}\n"
+                    f"**キーワード**: {keyword_text}\n"
+                    f"**ID**: `{entry.id}`\n"
+                    f"**リンク**: [arXiv]({entry.link})"
+                ),
+                inline=False
+            )
+            count += 1
+            if len(embed.fields) == 10:
+                await interaction.followup.send(embed=embed, ephemeral=True)
+                page += 1
+                embed = new_embed(page)
+
+        if embed.fields:
+            await interaction.followup.send(embed=embed, ephemeral=True)
+        elif count == 0:
+            await interaction.followup.send("論文が見つかりませんでした。", ephemeral=True)
+    except ArxivError as e:
+        logging.error(f"arXiv検索エラー: {e}")
+        await interaction.followup.send("APIの呼び出しに失敗しました。", ephemeral=True)
     except Exception as e:
         logging.error(f"arXiv検索エラー: {e}")
-        await interaction.response.send_message("検索中にエラーが発生しました。", ephemeral=True)
+        await interaction.followup.send("検索中にエラーが発生しました。", ephemeral=True)
 
 @bot.tree.command(
     name="arxiv_save",
@@ -489,47 +690,32 @@ async def arxiv_search(interaction: discord.Interaction, query: str):
 @arxiv_channel_only()
 async def arxiv_save(interaction: discord.Interaction, paper_id: str):
     try:
-        favorites = load_favorites()
+        await interaction.response.defer(ephemeral=True)
         user_id = str(interaction.user.id)
-        
-        if user_id not in favorites:
-            favorites[user_id] = []
-        
+
         # 既に保存済みかチェック
-        if paper_id in [paper['id'] for paper in favorites[user_id]]:
-            await interaction.response.send_message("この論文は既に保存されています。", ephemeral=True)
+        if await favorites_store.contains(user_id, paper_id):
+            await interaction.followup.send("この論文は既に保存されています。", ephemeral=True)
             return
         
-        url = f'http://export.arxiv.org/api/query?id_list={paper_id}'
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status == 200:
-                    content = await response.text()
-                    root = ElementTree.fromstring(content)
-                    entry = root.find('{http://www.w3.org/2005/Atom}entry')
-                    
-                    if entry:
-                        title = entry.find('{http://www.w3.org/2005/Atom}title').text
-                        # 新しい論文を追加
-                        favorites[user_id].append({
-                            'id': paper_id,
-                            'title': title,
-                            'saved_at': datetime.now().isoformat()
-                        })
-                        # 変更を保存
-                        save_favorites(favorites)
-                        
-                        await interaction.response.send_message(
-                            f"論文を保存しました:\nID: {paper_id}\nTitle: {title}",
-                            ephemeral=True
-                        )
-                    else:
-                        await interaction.response.send_message("論文が見つかりませんでした。", ephemeral=True)
-                else:
-                    await interaction.response.send_message("APIの呼び出しに失敗しました。", ephemeral=True)
+        # 検索結果に表示した論文はキャッシュから取得される
+        paper = await arxiv_client.get_paper(paper_id)
+        if paper:
+            # 新しい論文を保存
+            await favorites_store.add(user_id, paper_id, paper.title)
+
+            await interaction.followup.send(
+                f"論文を保存しました:\nID: {paper_id}\nTitle: {paper.title}",
+                ephemeral=True
+            )
+        else:
+            await interaction.followup.send("論文が見つかりませんでした。", ephemeral=True)
+    except ArxivError as e:
+        logging.error(f"論文保存エラー: {e}")
+        await interaction.followup.send("APIの呼び出しに失敗しました。", ephemeral=True)
     except Exception as e:
         logging.error(f"論文保存エラー: {e}")
-        await interaction.response.send_message("保存中にエラーが発生しました。", ephemeral=True)
+        await interaction.followup.send("保存中にエラーが発生しました。", ephemeral=True)
 
 
 @bot.tree.command(
@@ -538,11 +724,10 @@ async def arxiv_save(interaction: discord.Interaction, paper_id: str):
 )
 @arxiv_channel_only()
 async def arxiv_list(interaction: discord.Interaction, user: Optional[discord.Member] = None):
-    favorites = load_favorites()
     target_user = user or interaction.user
-    user_id = str(target_user.id)
-    
-    if user_id not in favorites or not favorites[user_id]:
+    papers = await favorites_store.list(target_user.id)
+
+    if not papers:
         await interaction.response.send_message(
             f"{target_user.display_name}の保存済み論文はありません。",
             ephemeral=True
@@ -554,7 +739,7 @@ async def arxiv_list(interaction: discord.Interaction, user: Optional[discord.Me
         color=discord.Color.blue()
     )
     
-    for paper in favorites[user_id]:
+    for paper in papers:
         embed.add_field(
             name=f"ID: {paper['id']}",
             value=f"Title: {paper['title']}\nSaved: {paper['saved_at']}",
@@ -569,14 +754,9 @@ async def arxiv_list(interaction: discord.Interaction, user: Optional[discord.Me
 )
 @arxiv_channel_only()
 async def arxiv_delete(interaction: discord.Interaction, paper_id: str):
-    favorites = load_favorites()
-    user_id = str(interaction.user.id)
-    
-    if user_id not in favorites or not any(p['id'] == paper_id for p in favorites[user_id]):
+    if not await favorites_store.remove(interaction.user.id, paper_id):
         await interaction.response.send_message("指定された論文は保存されていません。", ephemeral=True)
         return
-    favorites[user_id] = [p for p in favorites[user_id] if p['id'] != paper_id]
-    save_favorites(favorites)
     await interaction.response.send_message("論文を削除しました。", ephemeral=True)
 
 
@@ -613,7 +793,7 @@ async def help(interaction: discord.Interaction):
             name="📚 論文管理機能",
             value=(
                 "```\n"
-                "/arxiv_search [クエリ] - arXivから論文を検索\n"
+                "/arxiv_search [クエリ] [件数] - arXivから論文を検索\n"
                 "   - 検索結果にキーワードと簡単コピー用IDを表示\n"
                 "/arxiv_save [論文ID] - 論文をお気に入りに保存\n"
                 "/arxiv_list [ユーザー] - 保存した論文の一覧を表示\n"
@@ -629,10 +809,14 @@ async def help(interaction: discord.Interaction):
             name="👑 管理者用コマンド",
             value=(
                 "```\n"
-                "/log - 最新のログを表示\n"
+                "/log [行数] - 最新のログを表示\n"
                 "/log_delete - ログファイルの内容を削除\n"
+                "/migrate [SlackチャンネルID] [チャンネル] - Slackの履歴を移行\n"
+                "/migrate_import [パス] - Slackのエクスポートを取り込む\n"
+                "/routes [show/reload] - 転送ルートの表示・再読み込み\n"
+                "/memory [start/stop/report] - メモリ使用量の計測\n"
                 "```\n"
-                f"※ これらのコマンドは <#{DISCORD_LOG_CHANNEL_ID}> チャンネルでのみ使用可能です。"
+                f"※ /log, /log_delete, /memory は <#{DISCORD_LOG_CHANNEL_ID}> チャンネルでのみ使用可能です。"
             ),
             inline=False
         )
@@ -646,6 +830,7 @@ async def help(interaction: discord.Interaction):
                 "/schedule add [日付] [内容] [カテゴリ] - 予定を追加\n"
                 "   - カテゴリ: ミーティング/セミナー/締切/その他\n"
                 "/schedule show - 予定一覧を表示\n"
+                "/schedule week - 今後7日間の予定を表示\n"
                 "/schedule delete [日付] - 予定を削除\n"
                 "```"
             ),
@@ -660,6 +845,7 @@ async def help(interaction: discord.Interaction):
                 "• ファイル転送対応（画像・文書など）\n"
                 "• リアクション同期（絵文字反応の共有）\n"
                 "• 毎朝9時の自動ニュース配信\n"
+                f"• 予定当日{SCHEDULE_REMINDER_HOUR}時のリマインド通知\n"
                 "• ボットステータスの自動更新（CPU/メモリ/ネットワーク）"
             ),
             inline=False
@@ -671,8 +857,8 @@ async def help(interaction: discord.Interaction):
             value=(
                 f"• `/news`: <#{DISCORD_NEWS_CHANNEL_ID}> のみ\n"
                 f"• `/arxiv_*`: <#{DISCORD_ARXIV_CHANNEL_ID}> のみ\n"
-                f"• `/log`, `/log_delete`: <#{DISCORD_LOG_CHANNEL_ID}> のみ\n"
-                f"• Slack連携: <#{NOTIFICATION_CHANNEL_ID2}> のみ"
+                f"• `/log`, `/log_delete`, `/memory`: <#{DISCORD_LOG_CHANNEL_ID}> のみ\n"
+                f"• Slack連携: {format_channel_mentions(channel_router.table.discord_sources)}"
             ),
             inline=False
         )
@@ -714,48 +900,96 @@ async def stats(interaction: discord.Interaction):
             timestamp=datetime.now()
         )
 
-        # システムリソース情報
-        memory = psutil.virtual_memory()
-        disk = psutil.disk_usage('/')
-        cpu_freq = psutil.cpu_freq()
-        
+        # システムリソース情報（バックグラウンドで計測済みの値）
+        sample = system_monitor.latest() or system_monitor.sample()
+
         embed.add_field(
             name="💻 システム情報",
             value=(
-                f"CPU使用率: {psutil.cpu_percent()}%\n"
-                f"CPU周波数: {cpu_freq.current:.1f}MHz\n"
-                f"メモリ使用率: {memory.percent}%\n"
-                f"ディスク使用率: {disk.percent}%"
+                f"CPU使用率: {sample.cpu_percent:.1f}% (Bot: {sample.process_cpu_percent:.1f}%)\n"
+                f"CPU周波数: {sample.cpu_freq:.1f}MHz\n"
+                f"メモリ使用率: {sample.memory_percent}%\n"
+                f"ディスク使用率: {sample.disk_percent}%"
             ),
             inline=False
         )
 
         # ネットワーク情報
-        net_io = psutil.net_io_counters()
-        net_speed = (net_io.bytes_sent + net_io.bytes_recv) / 1024 / 1024
-        
         embed.add_field(
             name="🌐 ネットワーク",
             value=(
-                f"送信: {net_io.bytes_sent / 1024 / 1024:.1f}MB\n"
-                f"受信: {net_io.bytes_recv / 1024 / 1024:.1f}MB\n"
-                f"現在の速度: {net_speed:.1f}MB/s"
+                f"送信: {sample.net_sent / 1024 / 1024:.1f}MB\n"
+                f"受信: {sample.net_recv / 1024 / 1024:.1f}MB\n"
+                f"現在の速度: ↑{sample.net_sent_rate / 1024:.1f}KB/s ↓{sample.net_recv_rate / 1024:.1f}KB/s"
             ),
             inline=True
         )
 
         # Bot統計
         uptime = datetime.now() - bot.start_time
+        http_stats = http_pool.stats()
         embed.add_field(
             name="🤖 Bot統計",
             value=(
                 f"稼働時間: {int(uptime.total_seconds() // 3600)}時間\n"
-                f"監視メッセージ: {len(message_cache)}件\n"
-                f"メモリ使用量: {psutil.Process().memory_info().rss / 1024 / 1024:.1f}MB"
+                f"監視メッセージ: {len(relayed_messages)}件\n"
+                f"送信キュー: {relay_queue.depth()}件\n"
+                f"送信遅延: {max((st.last_flush_latency for st in relay_queue.stats.values()), default=0):.2f}秒\n"
+                f"HTTP接続: 使用中 {http_stats['in_use']} / 待機 {http_stats['idle']}\n"
+                f"メモリ使用量: {sample.rss / 1024 / 1024:.1f}MB ({sample.rss_delta / 1024:+.0f}KB)"
             ),
             inline=True
         )
 
+        # 1時間・24時間の推移（最小 / 平均 / 最大）
+        for label, seconds in (("1時間", 60 * 60), ("24時間", 24 * 60 * 60)):
+            summaries = system_monitor.summaries(seconds)
+            cpu = summaries["process_cpu_percent"]
+            rss = summaries["rss"]
+            net = summaries["net_recv_rate"]
+            if cpu is None:
+                continue
+            embed.add_field(
+                name=f"🕒 直近{label} (最小/平均/最大)",
+                value=(
+                    f"CPU: {cpu.minimum:.1f} / {cpu.average:.1f} / {cpu.maximum:.1f}%\n"
+                    f"メモリ: {rss.minimum / 1024 / 1024:.0f} / {rss.average / 1024 / 1024:.0f} / {rss.maximum / 1024 / 1024:.0f}MB\n"
+                    f"受信: {net.minimum / 1024:.1f} / {net.average / 1024:.1f} / {net.maximum / 1024:.1f}KB/s"
+                ),
+                inline=True
+            )
+
+        # メトリクスの要約
+        def format_seconds(value):
+            return f"{value:.2f}秒" if value is not None else "-"
+
+        def format_ratio(value):
+            return f"{value * 100:.1f}%" if value is not None else "-"
+
+        embed.add_field(
+            name="📈 メトリクス",
+            value=(
+                f"転送遅延 (p50/p99): {format_seconds(RELAY_LATENCY.quantile(0.5, direction='slack_to_discord'))}"
+                f" / {format_seconds(RELAY_LATENCY.quantile(0.99, direction='slack_to_discord'))}\n"
+                f"転送件数: {RELAY_LATENCY.count(direction='slack_to_discord')}件\n"
+                f"受信の待ち時間 (p50/p99): {format_seconds(INGEST_WAIT.quantile(0.5, queue='slack_ingest'))}"
+                f" / {format_seconds(INGEST_WAIT.quantile(0.99, queue='slack_ingest'))}\n"
+                f"API呼び出し: {int(API_CALLS.total())}回 (エラー {int(API_ERRORS.total())}回)\n"
+                f"arXivキャッシュ: {format_ratio(cache_hit_ratio('arxiv'))}\n"
+                f"Slackユーザーキャッシュ: {format_ratio(cache_hit_ratio('slack_users'))}"
+            ),
+            inline=False
+        )
+
+        # 定期ジョブ（前回の結果と次回の実行時刻）
+        job_lines = []
+        for job in scheduler.jobs.values():
+            status = {"success": "✅", "error": "❌"}.get(job.last_status, "-")
+            duration = f"{job.last_duration:.2f}s" if job.last_duration is not None else "-"
+            next_run = f"<t:{int(job.next_run)}:R>" if job.next_run else "-"
+            job_lines.append(f"{status} {job.name}: {duration} / 次回 {next_run}")
+        embed.add_field(name="⏱ 定期ジョブ", value="\n".join(job_lines) or "なし", inline=False)
+
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
     except Exception as e:
@@ -771,19 +1005,12 @@ async def stats(interaction: discord.Interaction):
 )
 async def schedule(
     interaction: discord.Interaction,
-    action: Literal["add", "show", "delete"],
+    action: Literal["add", "show", "week", "delete"],
     date: str = None,
     event: str = None,
     category: Literal["ミーティング", "セミナー", "締切", "その他"] = "その他"
 ):
     try:
-        # スケジュールデータの読み込み
-        if os.path.exists(SCHEDULE_FILE):
-            with open(SCHEDULE_FILE, 'r', encoding='utf-8') as f:
-                schedules = json.load(f)
-        else:
-            schedules = {}
-
         if action == "add":
             if not date or not event:
                 await interaction.response.send_message(
@@ -811,15 +1038,9 @@ async def schedule(
                 )
                 return
 
-            if date not in schedules:
-                schedules[date] = []
-            
-            schedules[date].append({
-                "event": event,
-                "category": category,
-                "created_by": str(interaction.user),
-                "created_at": datetime.now().isoformat()
-            })
+            # ジャーナルは日付文字列の順で並べるため、ゼロ埋めした形式で保存する（"2026-1-5" → "2026-01-05"）
+            date = event_date.isoformat()
+            schedules.add(date, event, category, str(interaction.user))
 
             embed = discord.Embed(
                 title="📅 予定を追加しました",
@@ -827,17 +1048,17 @@ async def schedule(
                 color=discord.Color.green()
             )
 
-        elif action == "show":
+        elif action in ("show", "week"):
             embed = discord.Embed(
-                title="📅 スケジュール一覧",
+                title="📅 スケジュール一覧" if action == "show" else "📅 今後7日間の予定",
                 color=discord.Color.blue()
             )
 
-            if not schedules:
+            entries = schedules.range() if action == "show" else schedules.upcoming(7)
+            if not entries:
                 embed.description = "予定はありません。"
             else:
-                for date in sorted(schedules.keys()):
-                    events = schedules[date]
+                for date, events in entries:
                     if events:
                         event_text = "\n".join(
                             f"• [{e['category']}] {e['event']}" for e in events
@@ -856,8 +1077,13 @@ async def schedule(
                 )
                 return
 
-            if date in schedules:
-                del schedules[date]
+            # 追加時と同じくゼロ埋めした形式にそろえる
+            try:
+                date = datetime.strptime(date, "%Y-%m-%d").date().isoformat()
+            except ValueError:
+                pass
+
+            if schedules.delete(date):
                 embed = discord.Embed(
                     title="🗑️ 予定を削除しました",
                     description=f"日付: {date}の予定を全て削除しました。",
@@ -870,10 +1096,6 @@ async def schedule(
                     color=discord.Color.red()
                 )
 
-        # スケジュールデータの保存
-        with open(SCHEDULE_FILE, 'w', encoding='utf-8') as f:
-            json.dump(schedules, f, ensure_ascii=False, indent=2)
-
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
     except Exception as e:
@@ -883,42 +1105,49 @@ async def schedule(
             ephemeral=True
         )
 
-async def send_to_discord(message_text, user_name, channel_name, from_slack=True):
+async def send_to_discord(message_text, user_name, channel_name, from_slack=True, slack_channel=None, slack_ts=None,
+                          received_at=None):
     """
     Discordの通知チャンネルにメッセージをEmbed形式で送信
     from_slack: Slackからの転送かどうかを示すフラグ
+    slack_channel, slack_ts: 指定するとリアクション同期用に対応を記録
+    received_at: Slackイベントの受信時刻（転送時間の計測用）
     """
     if not from_slack:  # Slackからの転送でない場合は処理しない
         return
 
-    logging.info(f"Sending message to Discord from {user_name} in {channel_name}")
-    channel = bot.get_channel(NOTIFICATION_CHANNEL_ID)
+    relay_logger.debug("Sending message to Discord from %s in %s", user_name, channel_name)
 
-    if channel:
-        embed = discord.Embed(
-            title=f"Message from {channel_name}",
-            description=message_text,
-            color=discord.Color.blue()
-        )
-        embed.set_author(name=user_name)
-        embed.set_footer(text=f"Sent from Slack • {channel_name}")
+    embed = discord.Embed(
+        title=f"Message from {channel_name}",
+        description=message_text,
+        color=discord.Color.blue()
+    )
+    embed.set_author(name=user_name)
+    embed.set_footer(text=f"Sent from Slack • {channel_name}")
 
-        await channel.send(embed=embed)
-        logging.info("Message sent to Discord successfully")
-    else:
-        logging.error("Discord通知チャンネルが見つかりません")
+    # 転送先ごとの送信キューに追加（短時間のメッセージはまとめて送信される）
+    for discord_channel_id in channel_router.table.discord_targets(slack_channel):
+        await relay_queue.put(discord_channel_id, embed, slack_channel, slack_ts, received_at=received_at)
 
-async def send_to_slack(message, user, channel):
+async def send_to_slack(message, user, channel, slack_channels=None):
     """
     メッセージの重複送信を防ぐためのキャッシュチェック付きSlack送信
+    slack_channels: 転送先のSlackチャンネル（省略時は転送ルートから求める）
     """
-    cache_key = f"{message.id}"
-    if cache_key in message_cache:
+    if relayed_messages.seen(message.id):
         return
-
-    message_cache[cache_key] = datetime.now()
+    if slack_channels is None:
+        slack_channels = channel_router.table.slack_targets(channel.id)
 
     try:
+        # Discordの書式・メンションをSlackの mrkdwn に変換する
+        content = discord_to_slack(
+            message.content,
+            resolve_user={str(m.id): m.display_name for m in message.mentions}.get,
+            resolve_channel={str(c.id): c.name for c in message.channel_mentions}.get,
+            resolve_role={str(r.id): r.name for r in message.role_mentions}.get
+        )
         blocks = [
             {
                 "type": "header",
@@ -931,7 +1160,7 @@ async def send_to_slack(message, user, channel):
                 "type": "section",
                 "text": {
                     "type": "mrkdwn",
-                    "text": message.content
+                    "text": content
                 }
             },
             {
@@ -945,101 +1174,118 @@ async def send_to_slack(message, user, channel):
             }
         ]
 
-        response = await slack_client.chat_postMessage(
-            channel=SLACK_CHANNEL_ID_4,
-            blocks=blocks,
-            text=f"Message from Discord: {message.content}"
-        )
+        links = []
+        for slack_channel in slack_channels:
+            try:
+                response = await slack_client.chat_postMessage(
+                    channel=slack_channel,
+                    blocks=blocks,
+                    text=f"Message from Discord: {content}"
+                )
+                RELAY_LATENCY.observe(
+                    (datetime.now(timezone.utc) - message.created_at).total_seconds(),
+                    direction="discord_to_slack"
+                )
 
-        # Slackのタイムスタンプをキャッシュに保存
-        message_cache[cache_key] = response['ts']
+                links.append((response['channel'], response['ts']))
+            except Exception as e:
+                logging.error(f"Error sending message to Slack: {e}")
 
-        # 古いキャッシュエントリの削除
-        current_time = datetime.now()
-        message_cache.update({k: v for k, v in message_cache.items() 
-                            if current_time - v < timedelta(minutes=5)})
+        # Slackのタイムスタンプを対応表に保存（転送先が複数の場合はまとめて登録する）
+        await message_links.add_many(channel.id, message.id, links)
 
     except Exception as e:
         logging.error(f"Error sending message to Slack: {e}")
 
 async def handle_file_upload(message, file_url, filename):
     """ファイルをダウンロードして転送する共通関数"""
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(file_url) as response:
-                if response.status == 200:
-                    file_content = await response.read()
-                    file_size = len(file_content)
-
-                    if file_size > MAX_FILE_SIZE:
-                        return False, "ファイルサイズが大きすぎます"
+    if not is_allowed_file(filename):
+        return False, "未対応のファイル形式です"
 
-                    file_ext = os.path.splitext(filename)[1].lower()
-                    if file_ext not in ALLOWED_FILE_TYPES:
-                        return False, "未対応のファイル形式です"
-
-                    return True, file_content
+    try:
+        spool, _ = await download_file(file_url)
+        return True, spool
+    except FileTransferError as e:
+        return False, str(e)
     except Exception as e:
         logging.error(f"ファイルダウンロードエラー: {e}")
         return False, str(e)
 
-async def send_file_to_slack(message, attachment):
+async def send_file_to_slack(message, attachment, slack_channels):
     """Discordのファイルを Slack に転送"""
     try:
+        # 添付ファイルのサイズはダウンロード前に分かる
+        if attachment.size > MAX_FILE_SIZE:
+            logging.error(f"ファイル転送失敗: ファイルサイズが大きすぎます ({attachment.size} bytes)")
+            return
+
         success, result = await handle_file_upload(message, attachment.url, attachment.filename)
         if success:
-            await slack_client.files_upload_v2(
-                channel=SLACK_CHANNEL_ID_1,
-                file=result,
-                filename=attachment.filename,
-                initial_comment=f"File shared by {message.author.name} from Discord"
-            )
+            # 1回のアップロードで全ての転送先に共有する
+            with result:
+                await upload_to_slack(
+                    slack_client,
+                    slack_channels,
+                    result,
+                    attachment.filename,
+                    initial_comment=f"File shared by {message.author.name} from Discord"
+                )
             logging.info(f"ファイル転送成功: {attachment.filename}")
         else:
             logging.error(f"ファイル転送失敗: {result}")
     except Exception as e:
         logging.error(f"Slackへのファイル転送エラー: {e}")
 
+@bot.event
+async def on_guild_emojis_update(guild, before, after):
+    emoji_index.set_discord_custom(e for g in bot.guilds for e in g.emojis)
+
 @bot.event
 async def on_reaction_add(reaction, user):
     if user.bot:
         return
 
-    if reaction.message.channel.id == NOTIFICATION_CHANNEL_ID2:
-        try:
-            # メッセージIDをキーとしてSlackのts（タイムスタンプ）を取得
-            slack_ts = message_cache.get(str(reaction.message.id))
-            if slack_ts:
-                emoji = EmojiMapper.discord_to_slack(str(reaction.emoji))
-                if emoji:
+    try:
+        # メッセージIDから対応するSlackのメッセージを取得（まとめて投稿した場合は最初のメッセージに同期する）
+        links = await message_links.get_reaction_targets(reaction.message.id)
+        emoji = emoji_index.discord_to_slack(str(reaction.emoji)) if links else None
+        if emoji:
+            for slack_channel, slack_ts in links:
+                # 1件の失敗（リアクション済みなど）で残りの同期を止めない
+                try:
                     await slack_client.reactions_add(
-                        channel=SLACK_CHANNEL_ID_1,
+                        channel=slack_channel,
                         timestamp=slack_ts,
-                        name=emoji.strip(':')
+                        name=emoji
                     )
-                    logging.info(f"Reaction synced to Slack: {emoji}")
-        except Exception as e:
-            logging.error(f"Failed to sync reaction to Slack: {e}")
+                except Exception as e:
+                    logging.error(f"Failed to sync reaction to Slack ({slack_channel} {slack_ts}): {e}")
+            logging.info(f"Reaction synced to Slack: {emoji} ({len(links)}件)")
+    except Exception as e:
+        logging.error(f"Failed to sync reaction to Slack: {e}")
 
 @bot.event
 async def on_reaction_remove(reaction, user):
     if user.bot:
         return
 
-    if reaction.message.channel.id == NOTIFICATION_CHANNEL_ID2:
-        try:
-            slack_ts = message_cache.get(str(reaction.message.id))
-            if slack_ts:
-                emoji = EmojiMapper.discord_to_slack(str(reaction.emoji))
-                if emoji:
+    try:
+        links = await message_links.get_reaction_targets(reaction.message.id)
+        emoji = emoji_index.discord_to_slack(str(reaction.emoji)) if links else None
+        if emoji:
+            for slack_channel, slack_ts in links:
+                # 1件の失敗（リアクション済みなど）で残りの同期を止めない
+                try:
                     await slack_client.reactions_remove(
-                        channel=SLACK_CHANNEL_ID_1,
+                        channel=slack_channel,
                         timestamp=slack_ts,
-                        name=emoji.strip(':')
+                        name=emoji
                     )
-                    logging.info(f"Reaction removed from Slack: {emoji}")
-        except Exception as e:
-            logging.error(f"Failed to remove reaction from Slack: {e}")
+                except Exception as e:
+                    logging.error(f"Failed to sync reaction to Slack ({slack_channel} {slack_ts}): {e}")
+            logging.info(f"Reaction removed from Slack: {emoji} ({len(links)}件)")
+    except Exception as e:
+        logging.error(f"Failed to remove reaction from Slack: {e}")
 
 async def start_discord_bot():
     await bot.start(DISCORD_BOT_TOKEN)
\ No newline at end of file
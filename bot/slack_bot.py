@@ -1,37 +1,45 @@
 import logging
 import asyncio
-from slack_sdk.web.async_client import AsyncWebClient
+import time
 from slack_sdk.socket_mode import SocketModeClient
 from slack_sdk.socket_mode.request import SocketModeRequest
 from slack_sdk.socket_mode.response import SocketModeResponse
 from slack_sdk.errors import SlackApiError
-from utils.emoji_mapper import EmojiMapper
+from utils.emoji_mapper import emoji_index
+from services.slack_directory import SlackDirectory
+from services.slack_api import InstrumentedWebClient
+from services.file_service import download_file, is_allowed_file
+from services.channel_router import channel_router
+from utils.dedup import DedupWindow
+from utils.logger import setup_logging
+from utils.metrics import register_cache
 import discord
-import io
-import aiohttp
 from config import (
     SLACK_BOT_TOKEN,
     SLACK_APP_TOKEN,
-    SLACK_CHANNEL_ID_1,
-    SLACK_CHANNEL_ID_2,
-    SLACK_CHANNEL_ID_3,
     NOTIFICATION_CHANNEL_ID,
-    NOTIFICATION_CHANNEL_ID2,
     MAX_FILE_SIZE,
-    ALLOWED_FILE_TYPES
+    DEDUP_TTL,
+    DEDUP_MAX_SIZE
 )
-from bot.discord_bot import send_to_discord, bot
+from bot.discord_bot import send_to_discord, bot, message_links
 from datetime import datetime
 
 # グローバル変数
-slack_client = AsyncWebClient(token=SLACK_BOT_TOKEN)
+slack_client = InstrumentedWebClient(token=SLACK_BOT_TOKEN)
 socket_mode_client = SocketModeClient(app_token=SLACK_APP_TOKEN, web_client=slack_client)
 
-# メッセージキャッシュ
-message_cache = {}
+# ユーザー名・チャンネル名のキャッシュ
+directory = SlackDirectory(slack_client)
 
-# チャンネルID
-CHANNEL_IDS = [SLACK_CHANNEL_ID_1, SLACK_CHANNEL_ID_2, SLACK_CHANNEL_ID_3]
+# 処理済みイベント（Slackからの再送を検出する）
+processed_events = DedupWindow(DEDUP_TTL, DEDUP_MAX_SIZE)
+register_cache("slack_users", directory.users)
+register_cache("slack_channels", directory.channels)
+register_cache("slack_event_dedup", processed_events)
+
+# メッセージごとのログ（DEBUGは間引いて出力）
+relay_logger = logging.getLogger("relay")
 
 # 監視するユーザーリスト
 monitored_users = set()
@@ -45,73 +53,79 @@ async def handle_reaction_event(event, action="add"):
     try:
         channel = event["item"]["channel"]
         ts = event["item"]["ts"]
-        emoji = f":{event['reaction']}:"        
-        if channel == SLACK_CHANNEL_ID_1:
-            discord_emoji = EmojiMapper.slack_to_discord(emoji)
-            if discord_emoji:
-                discord_channel = bot.get_channel(NOTIFICATION_CHANNEL_ID2)
-                if discord_channel:
-                    async for message in discord_channel.history(limit=100):
-                        if str(message.id) in message_cache:
-                            if message_cache[str(message.id)]["slack_ts"] == ts:
-                                if action == "add":
-                                    await message.add_reaction(discord_emoji)
-                                else:
-                                    await message.remove_reaction(discord_emoji, bot.user)
-                                logging.info(f"Reaction {'added to' if action == 'add' else 'removed from'} Discord: {emoji}")
-                                break
+        emoji = event["reaction"]
+        # 対応表から転送先のDiscordメッセージを取得
+        link = await message_links.get_discord(channel, ts)
+        if not link:
+            return
+        discord_emoji = emoji_index.slack_to_discord(emoji)
+        if discord_emoji:
+            discord_channel_id, discord_message_id = link
+            discord_channel = bot.get_channel(discord_channel_id)
+            if discord_channel:
+                message = discord_channel.get_partial_message(discord_message_id)
+                if action == "add":
+                    await message.add_reaction(discord_emoji)
+                else:
+                    await message.remove_reaction(discord_emoji, bot.user)
+                logging.info("Reaction %s Discord: %s", 'added to' if action == 'add' else 'removed from', emoji)
     except Exception as e:
         logging.error(f"Error handling reaction {action}: {e}")
 
-async def handle_slack_events(event):
+async def handle_slack_events(event, received_at=None):
     try:
+        # ユーザー・チャンネル情報の更新イベント
+        if directory.handle_event(event):
+            return
+
         if event.get("type") == "message":
             # ファイル添付の確認
             files = event.get("files", [])
-            if files:
+            # 転送先は転送ルートから求める（転送先のないチャンネルのファイルは転送しない）
+            discord_channel_ids = channel_router.table.discord_targets(event.get("channel"))
+            if files and discord_channel_ids:
                 channel = event["channel"]
                 user = event["user"]
                 # ユーザー情報とチャンネル情報を取得
-                user_info = await slack_client.users_info(user=user)
-                channel_info = await slack_client.conversations_info(channel=channel)
-                user_name = user_info["user"]["real_name"]
-                channel_name = channel_info["channel"]["name"]
+                user_name = await directory.get_user_name(user)
+                channel_name = await directory.get_channel_name(channel)
                 for file in files:
                     try:
                         # ファイルサイズと種類のチェック
                         file_size = file.get("size", 0)
-                        file_type = file.get("filetype", "").lower()
+                        filename = file["name"]
                         if file_size > MAX_FILE_SIZE:
                             logging.warning(f"ファイルサイズが大きすぎます: {file_size} bytes")
                             continue
-                        if file_type not in ALLOWED_FILE_TYPES:
-                            logging.warning(f"未対応のファイル形式です: {file_type}")
+                        if not is_allowed_file(filename):
+                            logging.warning(f"未対応のファイル形式です: {filename}")
+                            continue
+                        # Discordのチャンネルを取得
+                        discord_channels = [bot.get_channel(channel_id) for channel_id in discord_channel_ids]
+                        discord_channels = [discord_channel for discord_channel in discord_channels if discord_channel]
+                        if not discord_channels:
                             continue
                         # ファイルURLと認証情報を取得
                         file_url = file["url_private"]
                         headers = {"Authorization": f"Bearer {SLACK_BOT_TOKEN}"}
-                        # ファイルをダウンロード
-                        async with aiohttp.ClientSession(headers=headers) as session:
-                            async with session.get(file_url) as response:
-                                if response.status == 200:
-                                    file_content = await response.read()
-                                    # Discordのチャンネルを取得
-                                    discord_channel = bot.get_channel(NOTIFICATION_CHANNEL_ID2)
-                                    if discord_channel:
-                                        # ファイル名を取得
-                                        filename = file["name"]
-                                        # Discordに送信
-                                        file_obj = discord.File(io.BytesIO(file_content), filename=filename)
-                                        embed = discord.Embed(
-                                            title="📎 Slackからのファイル共有",
-                                            description=f"チャンネル: #{channel_name}\n"
-                                                      f"ファイル名: {filename}\n"
-                                                      f"サイズ: {file_size / 1024 / 1024:.1f}MB",
-                                            color=discord.Color.blue()
-                                        )
-                                        embed.set_author(name=user_name)
-                                        await discord_channel.send(embed=embed, file=file_obj)
-                                        logging.info(f"ファイル転送成功: {filename}")
+                        # ファイルを分割してダウンロード
+                        spool, file_size = await download_file(file_url, headers=headers)
+                        with spool:
+                            for discord_channel in discord_channels:
+                                # Discordに送信
+                                spool.seek(0)
+                                file_obj = discord.File(spool, filename=filename)
+                                embed = discord.Embed(
+                                    title="📎 Slackからのファイル共有",
+                                    description=f"チャンネル: #{channel_name}\n"
+                                              f"ファイル名: {filename}\n"
+                                              f"サイズ: {file_size / 1024 / 1024:.1f}MB",
+                                    color=discord.Color.blue()
+                                )
+                                embed.set_author(name=user_name)
+                                sent = await discord_channel.send(embed=embed, file=file_obj)
+                                await message_links.add(discord_channel.id, sent.id, channel, event["ts"])
+                        logging.info("ファイル転送成功: %s", filename)
                     except Exception as e:
                         logging.error(f"ファイル転送エラー: {e}")
 
@@ -121,27 +135,26 @@ async def handle_slack_events(event):
                 user = event["user"]
                 text = event["text"]
                 # Botのユーザー情報を取得
-                auth_response = await slack_client.auth_test()
-                bot_user_id = auth_response["user_id"]
+                bot_user_id = await directory.get_bot_user_id()
                 
                 # 以下の条件のいずれかに該当する場合はスキップ
                 if any([
                     user == bot_user_id,  # Botからのメッセージ
                     "bot_id" in event,    # Bot投稿
+                    "app_id" in event,    # アプリからの投稿
                     event.get("subtype") == "bot_message",  # Botメッセージ
                     not text.strip(),     # 空のメッセージ
                 ]):
-                    logging.info("Botまたは空のメッセージなのでスキップします")
+                    relay_logger.debug("Botまたは空のメッセージなのでスキップします")
                     return
                 
                 # 通常のメッセージ処理
-                if channel in CHANNEL_IDS:
-                    channel_info = await slack_client.conversations_info(channel=channel)
-                    user_info = await slack_client.users_info(user=user)
-                    channel_name = channel_info["channel"]["name"]
-                    user_name = user_info["user"]["real_name"]
+                if discord_channel_ids:
+                    channel_name = await directory.get_channel_name(channel)
+                    user_name = await directory.get_user_name(user)
                     
-                    await send_to_discord(text, user_name, channel_name)
+                    text = await directory.to_discord_markdown(text)
+                    await send_to_discord(text, user_name, channel_name, slack_channel=channel, slack_ts=event.get("ts"), received_at=received_at)
                 
         # リアクションイベントの処理
         elif event.get("type") == "reaction_added":
@@ -150,8 +163,8 @@ async def handle_slack_events(event):
             await handle_reaction_event(event, "remove")
 
     except Exception as e:
-        logging.error(f"Error handling Slack event: {e}")
-        logging.debug(f"Event data: {event}")
+        logging.error("Error handling Slack event: %s", e)
+        logging.debug("Event data: %s", event)
 
 async def handle_slash_command(client: SocketModeClient, request: SocketModeRequest):
     if request.type == "slash_commands" and request.payload["command"] == "/add_user":
@@ -164,10 +177,14 @@ async def handle_slash_command(client: SocketModeClient, request: SocketModeRequ
         logging.info(f"Added user {user_id} to monitored users.")
 
 async def event_handler(client: SocketModeClient, req: SocketModeRequest):
-    logging.info(f"Received SocketModeRequest: {req}")
+    received_at = time.monotonic()
+    relay_logger.debug("Received SocketModeRequest: type=%s envelope_id=%s", req.type, req.envelope_id)
     if req.type == "events_api":
         event = req.payload.get("event", {})
-        await handle_slack_events(event)
+        if processed_events.seen(req.payload.get("event_id"), event.get("client_msg_id")):
+            relay_logger.debug("重複イベントをスキップ: %s", req.payload.get("event_id"))
+        else:
+            await handle_slack_events(event, received_at)
     await client.send_socket_mode_response(
         SocketModeResponse(envelope_id=req.envelope_id)
     )
@@ -180,6 +197,9 @@ def start_slack_bot():
     loop = asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
 
+    # ユーザー・チャンネル情報を事前に読み込む
+    loop.run_until_complete(directory.warm_up())
+
     socket_mode_client.socket_mode_request_listeners.append(
         lambda client, req: asyncio.run_coroutine_threadsafe(event_handler(client, req), loop)
     )
@@ -187,5 +207,6 @@ def start_slack_bot():
     loop.run_forever()
 
 if __name__ == "__main__":
+    setup_logging()
     asyncio.run(start_slack_bot())
     logging.info("Slack bot is running...")
\ No newline at end of file
@@ -6,13 +6,12 @@ DISCORD_BOT_TOKEN = "YOUR_TOKEN" # Discord Bot Token
 DATABASE_URL = "sqlite:///migration.db" # データベースのURL
 NGROK_AUTH_TOKEN = "YOUR_TOKEN" # ngrokの認証トークン
 
-# 通知専用チャンネルID
+# 通知専用チャンネルID（リマインド・/notify の送信先）
 NOTIFICATION_CHANNEL_ID = 1234567890
-NOTIFICATION_CHANNEL_ID2 = 1234567890
-SLACK_CHANNEL_ID_1 = "C0812345678"
-SLACK_CHANNEL_ID_2 = "C0812345678"
-SLACK_CHANNEL_ID_3 = "C0812345678"
-SLACK_CHANNEL_ID_4 = "C0812345678"
+
+# Slack⇔Discordの転送ルート（チャンネルの対応表）。更新すると再起動せずに反映される
+ROUTING_FILE = "data/routes.json"
+ROUTING_RELOAD_INTERVAL = 30  # ファイルの更新を確認する間隔（秒）
 
 
 # Discord News Channel
@@ -26,6 +25,9 @@ DISCORD_LOG_CHANNEL_ID = 1234567890
 # 最大ファイルサイズ (10MB)
 MAX_FILE_SIZE = 10 * 1024 * 1024
 
+# これを超えるファイルは転送時に一時ファイルへ書き出す (1MB)
+FILE_SPOOL_THRESHOLD = 1 * 1024 * 1024
+
 # 許可するファイル形式
 ALLOWED_FILE_TYPES = [
     '.txt', '.pdf', '.doc', '.docx',
@@ -33,12 +35,92 @@ ALLOWED_FILE_TYPES = [
     '.jpeg', '.gif', '.zip'
 ]
 
+# Slackユーザー・チャンネル名キャッシュの設定
+SLACK_DIRECTORY_TTL = 60 * 60  # 1時間
+SLACK_DIRECTORY_MAX_SIZE = 5000
+
+# Discord⇔Slackメッセージ対応表のメモリキャッシュ件数
+MESSAGE_LINK_CACHE_SIZE = 10000
+
+# Slack→Discord送信キューの設定
+RELAY_COALESCE_WINDOW = 0.5  # まとめて送信するまでの待機時間（秒）
+RELAY_QUEUE_MAX_SIZE = 500
+
+# Slackイベントの受信処理（受信したら即座に ack し、チャンネルごとに順番を保ってワーカーで処理する）
+INGEST_WORKERS = 8  # 同時に処理するチャンネル数
+INGEST_QUEUE_MAX_SIZE = 1000  # 処理待ちの上限（超えた場合は ack せず Slack の再送に任せる）
+
+# 共有HTTPクライアントの設定
+HTTP_POOL_LIMIT = 100  # 全体の最大同時接続数
+HTTP_POOL_LIMIT_PER_HOST = 10  # ホストごとの最大同時接続数
+HTTP_DNS_CACHE_TTL = 300  # DNSキャッシュの保持時間（秒）
+HTTP_KEEPALIVE_TIMEOUT = 30  # Keep-Alive接続の保持時間（秒）
+HTTP_TIMEOUTS = {  # サービスごとのタイムアウト（秒）
+    "default": 30,
+    "news": 10,
+    "arxiv": 20,
+    "file": 120,
+}
+
+# 重複イベント検出の設定
+DEDUP_TTL = 10 * 60  # 記録を保持する時間（秒）
+DEDUP_MAX_SIZE = 10000
+
+# スケジュールの設定
+SCHEDULE_REMINDER_HOUR = 8  # 予定当日にリマインドを送る時刻（日本時間）
+SCHEDULE_COMPACT_THRESHOLD = 100  # 不要な履歴行がこれを超えたらジャーナルを書き直す
+
+# arXiv APIの設定
+ARXIV_CACHE_TTL = 7 * 24 * 60 * 60  # 検索結果・論文情報のキャッシュ期間（秒）
+ARXIV_CACHE_MAX_SIZE = 2000  # メモリ上に保持する件数
+ARXIV_REQUEST_INTERVAL = 3  # リクエストの最小間隔（秒、arXivの利用規約より）
+ARXIV_PAGE_SIZE = 25  # 1回のリクエストで取得する件数
+ARXIV_MAX_RESULTS = 100  # /arxiv_search で指定できる最大件数
+
+# メトリクスの設定（Prometheus 形式で localhost に公開）
+METRICS_ENABLED = True
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9108
+
+# システム情報の計測設定
+SYSTEM_SAMPLE_INTERVAL = 15  # 計測間隔（秒）
+SYSTEM_HISTORY_SECONDS = 24 * 60 * 60  # 保持する履歴の長さ（秒）
+
+# 定期ジョブの設定（cron形式は 分 時 日 月 曜日、日本時間）
+NEWS_PREFETCH_CRON = "55 8 * * *"  # 投稿前に記事を取得しておく
+NEWS_POST_CRON = "0 9 * * *"  # ニュースの定期投稿
+PRESENCE_UPDATE_INTERVAL = 60  # ステータス表示の更新間隔（秒）
+MAINTENANCE_CRON = "30 4 * * *"  # キャッシュの整理など
+
+# Slack→Discordの履歴移行の設定
+MIGRATION_CONCURRENCY = 3  # 同時に移行するチャンネル数
+MIGRATION_SLACK_RATE = 0.8  # Slack API の呼び出し回数（毎秒、conversations.history は Tier 3）
+MIGRATION_DISCORD_RATE = 1.0  # Discordへの送信回数（毎秒）
+MIGRATION_PAGE_SIZE = 200  # conversations.history / replies の1ページの件数
+MIGRATION_REPORT_INTERVAL = 30  # 進捗を報告する間隔（秒）
+MIGRATION_IMPORT_BATCH = 5000  # エクスポートの取り込みで1回に挿入する件数
+MIGRATION_IMPORT_TRANSACTION = 100000  # エクスポートの取り込みでコミットする間隔（件数）
+
+# メモリの計測（/memory または SIGUSR1 で開始・終了する。通常は無効）
+MEMORY_SNAPSHOT_INTERVAL = 10 * 60  # スナップショットを取ってログチャンネルに報告する間隔（秒）
+MEMORY_TRACE_FRAMES = 1  # 記録するスタックの深さ（深いほど負荷が大きい）
+MEMORY_REPORT_TOP = 10  # 報告するモジュール・行の数
+
+# 受信したイベントの記録（benchmarks.relay_replay で再生する）。None の場合は記録しない
+TRAFFIC_RECORD_FILE = None  # 例: "data/traffic.jsonl"
+
 # NewsAPI設定
 NEWS_API_KEY = "YOUR_API_KEY"
 NEWS_KEYWORDS = [
     "機械学習", "AI", "Google", "OpenAI", "自動運転", "Waymo",
     "Machine Learning", "Artificial Intelligence", "Deep Learning"
 ]
+NEWS_CACHE_TTL = 30 * 60  # 取得した記事を再利用する時間（秒）
+NEWS_SEEN_MAX_AGE = 30 * 24 * 60 * 60  # 投稿済み記事を記録しておく期間（秒）
+NEWS_SEEN_MAX_SIZE = 5000  # 投稿済み記事をメモリ上に保持する件数
+NEWS_DUPLICATE_THRESHOLD = 0.6  # タイトル・説明の類似度（推定Jaccard係数）がこれ以上なら同じ記事とみなす
+NEWS_MINHASH_PERMUTATIONS = 64  # MinHash 署名の長さ
+NEWS_MINHASH_BANDS = 16  # LSH のバンド数（署名の長さを割り切れる値）
 
 # デバッグ設定
 DEBUG_MODE = True
@@ -46,6 +128,14 @@ DEBUG_MODE = True
 # ログ設定
 LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 LOG_LEVEL = 'DEBUG'
+LOG_FILE = 'logs.txt'
+LOG_FILE_LEVEL = 'INFO'  # ファイルに書き込むログのレベル（JSON Lines 形式）
+LOG_SAMPLED_LOGGERS = ['relay']  # DEBUGログを間引くロガー
+LOG_DEBUG_SAMPLE_RATE = 100  # 間引く場合は何件に1件出力するか
+LOG_LIBRARY_LEVEL = 'INFO'  # discord.py・slack_sdk などライブラリのログレベル
+LOG_MAX_BYTES = 5 * 1024 * 1024  # このサイズを超えたらローテーション (5MB)
+LOG_ROTATE_INTERVAL = 24 * 60 * 60  # この時間が経過したらローテーション（秒）
+LOG_BACKUP_COUNT = 7  # 保存する圧縮済みログの数
 
 # Slack Bot Scopes
 REQUIRED_BOT_SCOPES = [
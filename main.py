@@ -2,50 +2,63 @@ import sys
 import os
 import asyncio
 import signal
+import time
 import logging
-import tracemalloc
 from threading import Event, Thread
 
-from slack_sdk.web.async_client import AsyncWebClient
 from slack_sdk.socket_mode.aiohttp import SocketModeClient
 from slack_sdk.socket_mode.request import SocketModeRequest
 from slack_sdk.socket_mode.response import SocketModeResponse
 
 from bot.discord_bot import start_discord_bot, send_to_discord
+from services.slack_directory import SlackDirectory
+from services.slack_api import InstrumentedWebClient
+from services.ingest_queue import OrderedWorkerPool
+from services.channel_router import channel_router
+from services.memory_profiler import memory_profiler
+from services.traffic_recorder import traffic_recorder
+from utils.dedup import DedupWindow
+from utils.logger import setup_logging
+from utils.metrics import register_cache, start_metrics_server
 from config import (
     SLACK_BOT_TOKEN,
     SLACK_APP_TOKEN,
-    SLACK_CHANNEL_ID_1,
-    SLACK_CHANNEL_ID_2,
-    SLACK_CHANNEL_ID_3,
-    LOG_LEVEL
+    DEDUP_TTL,
+    DEDUP_MAX_SIZE,
+    METRICS_ENABLED,
+    METRICS_HOST,
+    METRICS_PORT
 )
 
-# トレースバック追跡を有効化
-tracemalloc.start()
-
-logging.basicConfig(
-    level=LOG_LEVEL,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
+# メッセージごとのログ（DEBUGは間引いて出力）
+relay_logger = logging.getLogger("relay")
 
 shutdown_event = Event()
 
-CHANNEL_IDS = [SLACK_CHANNEL_ID_1, SLACK_CHANNEL_ID_2, SLACK_CHANNEL_ID_3]
-
 class SlackBot:
     def __init__(self):
-        self.slack_client = AsyncWebClient(token=SLACK_BOT_TOKEN)
+        self.slack_client = InstrumentedWebClient(token=SLACK_BOT_TOKEN)
         self.socket_mode_client = SocketModeClient(
             app_token=SLACK_APP_TOKEN,
             web_client=self.slack_client
         )
+        self.directory = SlackDirectory(self.slack_client)
+        # 再送されたイベントの検出用
+        self.processed_events = DedupWindow(DEDUP_TTL, DEDUP_MAX_SIZE)
+        register_cache("slack_users", self.directory.users)
+        register_cache("slack_channels", self.directory.channels)
+        register_cache("slack_event_dedup", self.processed_events)
         self.monitored_users = set()
+        # 受信したイベントはチャンネルごとに順番を保って処理する（ack は処理を待たない）
+        self.ingest = OrderedWorkerPool(self.process_event, "slack_ingest")
         self.running = True
 
-    async def handle_slack_events(self, event):
+    async def handle_slack_events(self, event, received_at=None):
         try:
+            if self.directory.handle_event(event):
+                return
+
             if event.get("type") == "message":
                 channel = event.get("channel")
                 user = event.get("user")
@@ -53,45 +66,82 @@ class SlackBot:
                 if not user:
                     return
 
-                if channel in CHANNEL_IDS and user not in self.monitored_users:
+                # Bot・アプリの投稿（Discordから転送した投稿を含む）は転送し返さない
+                if "bot_id" in event or "app_id" in event or event.get("subtype") == "bot_message":
+                    relay_logger.debug("Bot message skipped in %s", channel)
+                    return
+
+                # 転送先のないチャンネルは処理しない（ルートは実行中に変わることがある）
+                if not channel_router.table.discord_targets(channel):
+                    return
+
+                if user not in self.monitored_users:
                     self.monitored_users.add(user)
-                    logger.info(f"Added user {user} to monitored users.")
+                    logger.info("Added user %s to monitored users.", user)
 
-                if channel in CHANNEL_IDS and user in self.monitored_users:
-                    channel_info = await self.slack_client.conversations_info(channel=channel)
-                    user_info = await self.slack_client.users_info(user=user)
-                    channel_name = channel_info["channel"]["name"]
-                    user_name = user_info["user"]["real_name"]
-                    message_text = event["text"]
-                    logger.info(f"Processing message from {user_name} in {channel_name}")
+                if user in self.monitored_users:
+                    channel_name = await self.directory.get_channel_name(channel)
+                    user_name = await self.directory.get_user_name(user)
+                    message_text = await self.directory.to_discord_markdown(event["text"])
+                    relay_logger.debug("Processing message from %s in %s", user_name, channel_name)
 
                     # handle_slack_events メソッド内の send_to_discord の呼び出し部分
                     await send_to_discord(
                         message_text=message_text,
                         user_name=user_name,
-                        channel_name=channel_name
+                        channel_name=channel_name,
+                        slack_channel=channel,
+                        slack_ts=event.get("ts"),
+                        received_at=received_at
                     )
         except Exception as e:
-            logger.error(f"Error handling Slack event: {e}")
-            logger.debug(f"Event data: {event}")
+            logger.error("Error handling Slack event: %s", e)
+            logger.debug("Event data: %s", event)
+
+    async def process_event(self, item):
+        event, received_at = item
+        await self.handle_slack_events(event, received_at)
+
+    @staticmethod
+    def ordering_key(event) -> str:
+        """同じチャンネルのイベントは同じキーにする（チャンネルのないイベントは種類ごと）"""
+        channel = event.get("channel") or event.get("item", {}).get("channel")
+        # channel_rename・channel_created などはチャンネル情報をオブジェクトで持つ
+        if isinstance(channel, dict):
+            channel = channel.get("id")
+        return channel if isinstance(channel, str) and channel else event.get("type", "")
 
     async def event_handler(self, client, req):
+        received_at = time.monotonic()
+        traffic_recorder.record("slack", req.type, req.payload, envelope_id=req.envelope_id)
         try:
             if req.type == "events_api":
+                # 処理が追いつかない場合は ack しない（Slack が時間をおいて再送する）
+                # 重複検出に記録する前に判定し、再送されたイベントを重複として捨てないようにする
+                if self.ingest.full():
+                    self.ingest.reject()
+                    return
                 event = req.payload.get("event", {})
-                await self.handle_slack_events(event)
+                keys = (req.payload.get("event_id"), event.get("client_msg_id"))
+                if self.processed_events.check(*keys):
+                    relay_logger.debug("Duplicate event skipped: %s", req.payload.get("event_id"))
+                else:
+                    # ack の送信中に他のイベントで満杯にならないよう、キューへの追加を先に行う
+                    # 重複検出への記録はキューに追加できた後に行う（失敗した場合は再送を処理できるように）
+                    self.ingest.submit(self.ordering_key(event), (event, received_at))
+                    self.processed_events.seen(*keys)
             await client.send_socket_mode_response(
                 SocketModeResponse(envelope_id=req.envelope_id)
             )
         except Exception as e:
-            logger.error(f"Error in event handler: {e}")
-            logger.debug(f"Request data: {req}")
+            logger.error("Error in event handler: %s", e)
+            logger.debug("Request data: type=%s envelope_id=%s", req.type, req.envelope_id)
 
     async def start(self):
         try:
-            self.socket_mode_client.socket_mode_request_listeners.append(
-                lambda c, r: asyncio.create_task(self.event_handler(c, r))
-            )
+            await self.directory.warm_up()
+            # SDK がエンベロープごとにタスクを作って呼び出すため、ここではタスクを作らない
+            self.socket_mode_client.socket_mode_request_listeners.append(self.event_handler)
             await self.socket_mode_client.connect()
             logger.info("Slack bot started successfully")
             
@@ -107,6 +157,8 @@ class SlackBot:
         logger.info("Cleaning up Slack bot...")
         if self.socket_mode_client:
             await self.socket_mode_client.close()
+        await self.ingest.close()
+        traffic_recorder.close()
         logger.info("Cleanup completed")
 
     def stop(self):
@@ -117,7 +169,15 @@ def signal_handler(signum, frame):
     shutdown_event.set()
 
 async def main():
+    # SIGUSR1 でメモリの計測を開始・終了する（kill -USR1 <pid>）
+    if hasattr(signal, "SIGUSR1"):
+        asyncio.get_running_loop().add_signal_handler(
+            signal.SIGUSR1, lambda: asyncio.create_task(memory_profiler.toggle())
+        )
     try:
+        if METRICS_ENABLED:
+            await start_metrics_server(METRICS_HOST, METRICS_PORT)
+
         bot = SlackBot()
         discord_task = asyncio.create_task(start_discord_bot())
         slack_task = asyncio.create_task(bot.start())
@@ -128,6 +188,8 @@ async def main():
         raise
 
 if __name__ == "__main__":
+    # ログ出力の設定は utils.logger に集約（キュー経由で別スレッドから書き込む）
+    setup_logging()
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
     
@@ -144,10 +206,4 @@ if __name__ == "__main__":
                 logger.info("強制終了をキャンセルしました。")
                 break
     except Exception as e:
-        logger.error(f"致命的なエラー: {e}")
-    finally:
-        if tracemalloc.is_tracing():
-            snapshot = tracemalloc.take_snapshot()
-            logger.debug("メモリトレースバック:")
-            for stat in snapshot.statistics('lineno')[:3]:
-                logger.debug(str(stat))
\ No newline at end of file
+        logger.error(f"致命的なエラー: {e}")
\ No newline at end of file
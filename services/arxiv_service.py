@@ -0,0 +1,270 @@
+import asyncio
+import json
+import logging
+import re
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from contextlib import aclosing
+from typing import AsyncIterator, Dict, List, Optional
+from urllib.parse import urlencode
+from xml.etree import ElementTree
+
+from sqlalchemy import delete, insert, select
+
+from config import ARXIV_CACHE_TTL, ARXIV_CACHE_MAX_SIZE, ARXIV_REQUEST_INTERVAL, ARXIV_PAGE_SIZE
+from services.database_service import ArxivCacheEntry, SessionLocal, init_db
+from services.http_client import http_pool
+
+ARXIV_API_URL = "http://export.arxiv.org/api/query"
+ATOM = "{http://www.w3.org/2005/Atom}"
+# 不正なIDやクエリに対して arXiv が返すエラー用 <entry> の id
+ARXIV_ERROR_ID = "/api/errors"
+
+# レスポンスを読み込む単位
+CHUNK_SIZE = 16 * 1024
+
+
+class ArxivError(Exception):
+    """arXiv APIの呼び出し失敗"""
+
+
+@dataclass
+class ArxivEntry:
+    """arXiv論文のメタデータ"""
+    id: str
+    title: str
+    link: str
+    summary: str = ""
+    authors: List[str] = field(default_factory=list)
+    published: str = ""
+
+    @classmethod
+    def from_element(cls, entry: ElementTree.Element) -> "ArxivEntry":
+        link = entry.findtext(f"{ATOM}id", "").strip()
+        return cls(
+            id=link.split('/abs/')[-1],
+            title=" ".join(entry.findtext(f"{ATOM}title", "").split()),
+            link=link,
+            summary=" ".join(entry.findtext(f"{ATOM}summary", "").split()),
+            authors=[a.findtext(f"{ATOM}name", "") for a in entry.findall(f"{ATOM}author")],
+            published=entry.findtext(f"{ATOM}published", "")
+        )
+
+    @property
+    def is_error(self) -> bool:
+        """arXiv のエラー応答（論文ではない）かどうか"""
+        return ARXIV_ERROR_ID in self.link or (self.title == "Error" and "/abs/" not in self.link)
+
+
+def normalize_query(query: str) -> str:
+    """大文字小文字と空白の違いを無視したキャッシュキー"""
+    return " ".join(query.lower().split())
+
+
+class ArxivCache:
+    """
+    arXivの論文・検索結果のキャッシュ
+    メモリ上はLRU+TTL、SQLiteにも保存して再起動後も利用する
+    """
+
+    def __init__(self, ttl: float = ARXIV_CACHE_TTL, max_size: int = ARXIV_CACHE_MAX_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (fetched_at, value)
+        self.hits = 0
+        self.misses = 0
+        init_db()
+
+    def _remember(self, key: str, fetched_at: float, value):
+        self._data[key] = (fetched_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def _load(self, keys: List[str]) -> Dict[str, ArxivCacheEntry]:
+        with SessionLocal() as session:
+            rows = session.execute(select(ArxivCacheEntry).where(ArxivCacheEntry.key.in_(keys))).scalars().all()
+        return {row.key: row for row in rows}
+
+    def _store(self, rows: List[Dict]):
+        with SessionLocal() as session:
+            session.execute(insert(ArxivCacheEntry).prefix_with("OR REPLACE"), rows)
+            session.commit()
+
+    async def get_many(self, keys: List[str]) -> Dict[str, object]:
+        """キャッシュにある値を返す（期限切れ・未登録のキーは含まれない）"""
+        now = time.time()
+        found = {}
+        missing = []
+        for key in keys:
+            item = self._data.get(key)
+            if item and now - item[0] < self.ttl:
+                self._data.move_to_end(key)
+                found[key] = item[1]
+            else:
+                missing.append(key)
+
+        if missing:
+            try:
+                rows = await asyncio.to_thread(self._load, missing)
+            except Exception as e:
+                logging.error(f"arXivキャッシュの読み込みエラー: {e}")
+                rows = {}
+            for key, row in rows.items():
+                if now - row.fetched_at < self.ttl:
+                    value = json.loads(row.value)
+                    self._remember(key, row.fetched_at, value)
+                    found[key] = value
+
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def _delete_expired(self, before: float) -> int:
+        with SessionLocal() as session:
+            result = session.execute(delete(ArxivCacheEntry).where(ArxivCacheEntry.fetched_at < before))
+            session.commit()
+            return result.rowcount
+
+    async def prune(self) -> int:
+        """期限切れのキャッシュをSQLiteから削除する"""
+        return await asyncio.to_thread(self._delete_expired, time.time() - self.ttl)
+
+    async def set_many(self, values: Dict[str, object]):
+        if not values:
+            return
+        now = time.time()
+        for key, value in values.items():
+            self._remember(key, now, value)
+        try:
+            await asyncio.to_thread(self._store, [
+                {"key": key, "value": json.dumps(value, ensure_ascii=False), "fetched_at": now}
+                for key, value in values.items()
+            ])
+        except Exception as e:
+            logging.error(f"arXivキャッシュの保存エラー: {e}")
+
+
+class ArxivClient:
+    """
+    arXiv APIクライアント
+    検索結果と論文情報をキャッシュし、未取得の論文は id_list でまとめて取得する
+    arXivの利用規約に従いリクエスト間隔を空ける
+    """
+
+    def __init__(self, cache: ArxivCache = None):
+        self.cache = cache or ArxivCache()
+        self._lock = asyncio.Lock()
+        self._last_request = 0.0
+
+    async def _throttle(self):
+        async with self._lock:
+            wait = self._last_request + ARXIV_REQUEST_INTERVAL - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._last_request = time.monotonic()
+
+    async def _stream_entries(self, params: Dict) -> AsyncIterator[ArxivEntry]:
+        """
+        Atomフィードを受信しながら解析し、<entry> が閉じるたびに返す
+        処理済みの要素はツリーから外すため、件数に関係なくメモリ使用量は一定
+        """
+        await self._throttle()
+        async with http_pool.get(f"{ARXIV_API_URL}?{urlencode(params)}", service="arxiv") as response:
+            if response.status != 200:
+                raise ArxivError(f"arXiv API error: status {response.status}")
+
+            parser = ElementTree.XMLPullParser(events=("start", "end"))
+            root = None
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                parser.feed(chunk)
+                for event, elem in parser.read_events():
+                    if event == "start":
+                        if root is None:
+                            root = elem
+                    elif elem.tag == f"{ATOM}entry":
+                        entry = ArxivEntry.from_element(elem)
+                        root.remove(elem)
+                        # エラー応答は論文として返さない（キャッシュにも保存されない）
+                        if entry.is_error:
+                            logging.warning(f"arXiv APIエラー: {entry.summary or entry.link}")
+                            continue
+                        yield entry
+            parser.close()
+
+    async def _fetch(self, params: Dict) -> List[ArxivEntry]:
+        return [entry async for entry in self._stream_entries(params)]
+
+    async def _remember_entries(self, entries: List[ArxivEntry], extra: Dict[str, object] = None):
+        values = {f"paper:{entry.id}": asdict(entry) for entry in entries}
+        values.update(extra or {})
+        await self.cache.set_many(values)
+
+    async def iter_search(self, query: str, max_results: int = 5,
+                          page_size: int = ARXIV_PAGE_SIZE) -> AsyncIterator[ArxivEntry]:
+        """
+        キーワード検索の結果を1件ずつ返す
+        start= でページを進めながら取得するため、後続ページの受信中にも先頭から処理できる
+        同じクエリの結果はキャッシュから返す
+        """
+        search_key = f"search:{max_results}:{normalize_query(query)}"
+        cached = await self.cache.get_many([search_key])
+        if search_key in cached:
+            papers = await self.get_papers(cached[search_key])
+            for paper_id in cached[search_key]:
+                if paper_id in papers:
+                    yield papers[paper_id]
+            return
+
+        paper_ids = []
+        start = 0
+        while start < max_results:
+            count = min(page_size, max_results - start)
+            page = []
+            async with aclosing(self._stream_entries({
+                "search_query": f"all:{query}",
+                "start": start,
+                "max_results": count
+            })) as entries:
+                async for entry in entries:
+                    page.append(entry)
+                    yield entry
+            await self._remember_entries(page)
+            paper_ids.extend(entry.id for entry in page)
+            # 最終ページに到達
+            if len(page) < count:
+                break
+            start += count
+
+        await self.cache.set_many({search_key: paper_ids})
+
+    async def search(self, query: str, max_results: int = 5) -> List[ArxivEntry]:
+        """キーワード検索（同じクエリはキャッシュから返す）"""
+        return [entry async for entry in self.iter_search(query, max_results)]
+
+    async def get_papers(self, paper_ids: List[str]) -> Dict[str, ArxivEntry]:
+        """論文IDから情報を取得（キャッシュにない論文は1回のリクエストでまとめて取得）"""
+        paper_ids = [paper_id.strip() for paper_id in paper_ids if paper_id.strip()]
+        cached = await self.cache.get_many([f"paper:{paper_id}" for paper_id in paper_ids])
+        papers = {key[len("paper:"):]: ArxivEntry(**value) for key, value in cached.items()}
+
+        missing = [paper_id for paper_id in paper_ids if paper_id not in papers]
+        if missing:
+            entries = await self._fetch({"id_list": ",".join(missing), "max_results": len(missing)})
+            # 取得結果はバージョンの有無に関わらず要求したIDでも引けるようにする
+            extra = {}
+            for entry in entries:
+                base_id = re.sub(r"v\d+$", "", entry.id)
+                for paper_id in missing:
+                    if paper_id in (entry.id, base_id):
+                        papers[paper_id] = entry
+                        extra[f"paper:{paper_id}"] = asdict(entry)
+            await self._remember_entries(entries, extra)
+        return papers
+
+    async def get_paper(self, paper_id: str) -> Optional[ArxivEntry]:
+        return (await self.get_papers([paper_id])).get(paper_id.strip())
+
+
+arxiv_client = ArxivClient()
@@ -0,0 +1,146 @@
+import asyncio
+import json
+import logging
+import os
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, FrozenSet, Iterable, List, Mapping, Optional, Set, Tuple
+
+from config import ROUTING_FILE
+
+# 転送の向き
+SLACK_TO_DISCORD = "slack_to_discord"
+DISCORD_TO_SLACK = "discord_to_slack"
+BOTH = "both"
+DIRECTIONS = {SLACK_TO_DISCORD, DISCORD_TO_SLACK, BOTH}
+
+
+class RoutingError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class Route:
+    slack: str  # SlackチャンネルID
+    discord: int  # DiscordチャンネルID
+    direction: str  # 転送の向き（省略不可）
+
+
+def parse_routes(data: Dict) -> List[Route]:
+    """routes.json の内容を検証して Route のリストにする（誤りがあれば RoutingError）"""
+    if not isinstance(data, dict) or not isinstance(data.get("routes"), list):
+        raise RoutingError('"routes" のリストがありません')
+    routes = []
+    for index, entry in enumerate(data["routes"]):
+        if not isinstance(entry, dict):
+            raise RoutingError(f"routes[{index}]: オブジェクトではありません")
+        slack = entry.get("slack")
+        discord = entry.get("discord")
+        # 双方向の転送はループの原因になりやすいため、向きは必ず明示させる
+        direction = entry.get("direction")
+        if not isinstance(slack, str) or not slack:
+            raise RoutingError(f"routes[{index}]: slack にはSlackチャンネルIDを指定してください")
+        try:
+            discord = int(discord)
+        except (TypeError, ValueError):
+            raise RoutingError(f"routes[{index}]: discord にはDiscordチャンネルIDを指定してください")
+        if direction not in DIRECTIONS:
+            raise RoutingError(f"routes[{index}]: direction に {', '.join(sorted(DIRECTIONS))} のいずれかを指定してください")
+        routes.append(Route(slack, discord, direction))
+    return routes
+
+
+class RoutingTable:
+    """
+    Slack⇔Discordの転送ルートを索引にしたもの（作成後は変更しない）
+    転送先の検索は辞書の参照だけで済み、読み込み直す場合は新しい表に置き換える
+    """
+
+    def __init__(self, routes: Iterable[Route] = ()):
+        slack_to_discord: Dict[str, Set[int]] = {}
+        discord_to_slack: Dict[int, Set[str]] = {}
+        unique = []
+        for route in dict.fromkeys(routes):
+            unique.append(route)
+            if route.direction in (SLACK_TO_DISCORD, BOTH):
+                slack_to_discord.setdefault(route.slack, set()).add(route.discord)
+            if route.direction in (DISCORD_TO_SLACK, BOTH):
+                discord_to_slack.setdefault(route.discord, set()).add(route.slack)
+        self.routes: Tuple[Route, ...] = tuple(unique)
+        self._slack_to_discord: Mapping[str, FrozenSet[int]] = MappingProxyType(
+            {channel: frozenset(targets) for channel, targets in slack_to_discord.items()}
+        )
+        self._discord_to_slack: Mapping[int, FrozenSet[str]] = MappingProxyType(
+            {channel: frozenset(targets) for channel, targets in discord_to_slack.items()}
+        )
+        # 転送に使うDiscordチャンネル（転送先・転送元のどちらか）
+        self.discord_channels: FrozenSet[int] = frozenset(route.discord for route in self.routes)
+
+    def discord_targets(self, slack_channel: Optional[str]) -> FrozenSet[int]:
+        """Slackチャンネルの投稿の転送先（転送しない場合は空）"""
+        return self._slack_to_discord.get(slack_channel, frozenset())
+
+    def slack_targets(self, discord_channel: Optional[int]) -> FrozenSet[str]:
+        """Discordチャンネルの投稿の転送先（転送しない場合は空）"""
+        return self._discord_to_slack.get(discord_channel, frozenset())
+
+    @property
+    def slack_sources(self) -> FrozenSet[str]:
+        return frozenset(self._slack_to_discord)
+
+    @property
+    def discord_sources(self) -> FrozenSet[int]:
+        return frozenset(self._discord_to_slack)
+
+    def describe(self) -> str:
+        arrows = {SLACK_TO_DISCORD: "→", DISCORD_TO_SLACK: "←", BOTH: "⇔"}
+        return "\n".join(f"{route.slack} {arrows[route.direction]} {route.discord}" for route in self.routes)
+
+
+class ChannelRouter:
+    """
+    routes.json から転送ルートを読み込む
+    ファイルが更新されたら reload_if_changed で読み込み直す（再起動・再接続は不要）
+    誤りのあるファイルは読み込まず、それまでの表を使い続ける
+    """
+
+    def __init__(self, path: str = ROUTING_FILE):
+        self.path = path
+        self.table = RoutingTable()
+        self._mtime: Optional[float] = None
+        self.reload()
+
+    def reload(self) -> Tuple[bool, str]:
+        """ファイルを読み込み直す。戻り値は (成功したか, メッセージ)"""
+        try:
+            # 読み込みに失敗した場合も更新時刻は記録し、次にファイルが変わるまで再試行しない
+            self._mtime = os.path.getmtime(self.path)
+            with open(self.path, encoding="utf-8") as f:
+                table = RoutingTable(parse_routes(json.load(f)))
+        except FileNotFoundError:
+            message = f"転送ルートのファイルがありません: {self.path}"
+            logging.warning(message)
+            return False, message
+        except (OSError, ValueError, RoutingError) as e:
+            message = f"転送ルートの読み込みエラー: {e}"
+            logging.error(message)
+            return False, message
+        # 参照の置き換えだけなので、処理中のイベントは古い表か新しい表のどちらかを使う
+        self.table = table
+        message = f"転送ルートを読み込みました: {len(table.routes)}件"
+        logging.info(message)
+        return True, message
+
+    def changed(self) -> bool:
+        try:
+            return os.path.getmtime(self.path) != self._mtime
+        except OSError:
+            return False
+
+    async def reload_if_changed(self):
+        """定期ジョブ: ファイルの更新時刻が変わっていれば読み込み直す"""
+        if self.changed():
+            await asyncio.to_thread(self.reload)
+
+
+channel_router = ChannelRouter()
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String
+from sqlalchemy import create_engine, event, Column, Integer, Float, String, Index, ForeignKey, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -6,6 +6,16 @@ from config import DATABASE_URL
 
 Base = declarative_base()
 engine = create_engine(DATABASE_URL)
+
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragma(dbapi_connection, connection_record):
+    # 読み込みと書き込みを並行できるようにWALモードを使用
+    if DATABASE_URL.startswith("sqlite"):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 class Message(Base):
@@ -15,5 +25,107 @@ class Message(Base):
     content = Column(String)
     platform = Column(String)
 
+class MessageLink(Base):
+    """DiscordのメッセージとSlackのメッセージ(ts)の対応"""
+    __tablename__ = "message_links"
+
+    id = Column(Integer, primary_key=True)
+    discord_channel_id = Column(String, nullable=False)
+    discord_message_id = Column(String, nullable=False, index=True)
+    slack_channel_id = Column(String, nullable=False)
+    slack_ts = Column(String, nullable=False)
+
+    __table_args__ = (
+        Index("ix_message_links_slack", "slack_channel_id", "slack_ts", unique=True),
+    )
+
+class Paper(Base):
+    """arXiv論文の情報（ユーザー間で共有）"""
+    __tablename__ = "papers"
+
+    id = Column(String, primary_key=True)  # arXiv ID
+    title = Column(String, nullable=False)
+
+class UserFavorite(Base):
+    """ユーザーごとのお気に入り論文"""
+    __tablename__ = "user_favorites"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(String, nullable=False, index=True)
+    paper_id = Column(String, ForeignKey("papers.id"), nullable=False, index=True)
+    saved_at = Column(String, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "paper_id", name="uq_user_favorites_user_paper"),
+    )
+
+class ArxivCacheEntry(Base):
+    """arXiv APIの取得結果キャッシュ（論文メタデータ・検索結果）"""
+    __tablename__ = "arxiv_cache"
+
+    key = Column(String, primary_key=True)  # "paper:<ID>" または "search:<正規化したクエリ>"
+    value = Column(String, nullable=False)  # JSON
+    fetched_at = Column(Float, nullable=False, index=True)
+
+class SeenArticle(Base):
+    """投稿済みのニュース記事（重複投稿の防止用）"""
+    __tablename__ = "seen_articles"
+
+    url_hash = Column(String, primary_key=True)  # 正規化したURLのハッシュ
+    signature = Column(String, nullable=False)  # タイトル・説明の MinHash 署名 (JSON)
+    title = Column(String, nullable=False)
+    seen_at = Column(Float, nullable=False, index=True)
+
+class JobState(Base):
+    """定期ジョブの最後の実行結果"""
+    __tablename__ = "job_states"
+
+    name = Column(String, primary_key=True)
+    last_run = Column(Float, nullable=False)  # UNIX時間
+    last_status = Column(String, nullable=False)
+    duration = Column(Float, nullable=False)  # 秒
+
+class SlackArchiveMessage(Base):
+    """Slackから取得したメッセージ（Discordへの移行元）"""
+    __tablename__ = "slack_archive_messages"
+
+    id = Column(Integer, primary_key=True)
+    channel_id = Column(String, nullable=False)
+    ts = Column(String, nullable=False)
+    thread_ts = Column(String)  # スレッドの返信の場合は親メッセージの ts
+    root_ts = Column(String, nullable=False)  # スレッドの親の ts（親・通常のメッセージは自身の ts）
+    user_id = Column(String)
+    username = Column(String)  # Botの投稿など user_id がない場合の表示名
+    text = Column(String, nullable=False, default="")
+    subtype = Column(String)
+    files = Column(String)  # 添付ファイルの名前とURL (JSON)
+
+    __table_args__ = (
+        Index("ix_slack_archive_messages_ts", "channel_id", "ts", unique=True),
+        # スレッドを親の直後にまとめて投稿する順序
+        Index("ix_slack_archive_messages_order", "channel_id", "root_ts", "ts"),
+    )
+
+class SlackArchiveName(Base):
+    """エクスポートから取り込んだユーザー名・チャンネル名（API を使わずに投稿するため）"""
+    __tablename__ = "slack_archive_names"
+
+    kind = Column(String, primary_key=True)  # "user" または "channel"
+    id = Column(String, primary_key=True)
+    name = Column(String, nullable=False)
+
+class MigrationCheckpoint(Base):
+    """チャンネルごとの移行の進捗（中断した位置から再開するため）"""
+    __tablename__ = "migration_checkpoints"
+
+    slack_channel_id = Column(String, primary_key=True)
+    discord_channel_id = Column(String, nullable=False)
+    fetch_cursor = Column(String)  # conversations.history の次のページのカーソル
+    fetch_done = Column(Integer, nullable=False, default=0)
+    posted_root_ts = Column(String)  # 最後に投稿したメッセージの位置
+    posted_ts = Column(String)
+    posted_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(Float, nullable=False)
+
 def init_db():
     Base.metadata.create_all(bind=engine)
\ No newline at end of file
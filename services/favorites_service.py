@@ -0,0 +1,112 @@
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Dict, List
+
+from sqlalchemy import delete, insert, select
+
+from services.database_service import Paper, SessionLocal, UserFavorite, init_db
+
+
+class FavoritesStore:
+    """
+    arXivお気に入り論文の保存先（SQLite）
+    論文情報は papers、ユーザーごとの保存は user_favorites に正規化して保持し、
+    読み込んだユーザーの一覧はメモリ上にキャッシュする（書き込み時に同時更新）
+    """
+
+    def __init__(self, json_path: str = None):
+        # user_id -> [{"id", "title", "saved_at"}, ...]（保存順）
+        self._cache: Dict[str, List[Dict]] = {}
+        init_db()
+        if json_path and os.path.exists(json_path):
+            self.migrate_from_json(json_path)
+
+    def migrate_from_json(self, json_path: str):
+        """旧形式の favorites.json を取り込む（取り込み後はファイル名を変更）"""
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                content = f.read()
+            favorites = json.loads(content) if content else {}
+
+            with SessionLocal() as session:
+                for user_id, papers in favorites.items():
+                    for paper in papers:
+                        session.execute(
+                            insert(Paper).prefix_with("OR IGNORE").values(id=paper["id"], title=paper["title"])
+                        )
+                        session.execute(
+                            insert(UserFavorite).prefix_with("OR IGNORE").values(
+                                user_id=str(user_id),
+                                paper_id=paper["id"],
+                                saved_at=paper.get("saved_at", datetime.now().isoformat())
+                            )
+                        )
+                session.commit()
+
+            os.replace(json_path, json_path + ".migrated")
+            logging.info(f"お気に入り論文を移行しました: {sum(len(p) for p in favorites.values())}件")
+        except Exception as e:
+            logging.error(f"お気に入り論文の移行エラー: {e}")
+
+    def _load_user(self, user_id: str) -> List[Dict]:
+        with SessionLocal() as session:
+            rows = session.execute(
+                select(UserFavorite.paper_id, Paper.title, UserFavorite.saved_at)
+                .join(Paper, Paper.id == UserFavorite.paper_id)
+                .where(UserFavorite.user_id == user_id)
+                .order_by(UserFavorite.id)
+            ).all()
+        return [{"id": paper_id, "title": title, "saved_at": saved_at} for paper_id, title, saved_at in rows]
+
+    def _insert(self, user_id: str, paper_id: str, title: str, saved_at: str):
+        with SessionLocal() as session:
+            session.execute(insert(Paper).prefix_with("OR IGNORE").values(id=paper_id, title=title))
+            session.execute(
+                insert(UserFavorite).prefix_with("OR IGNORE").values(
+                    user_id=user_id, paper_id=paper_id, saved_at=saved_at
+                )
+            )
+            session.commit()
+
+    def _delete(self, user_id: str, paper_id: str):
+        with SessionLocal() as session:
+            session.execute(
+                delete(UserFavorite).where(UserFavorite.user_id == user_id, UserFavorite.paper_id == paper_id)
+            )
+            session.commit()
+
+    async def list(self, user_id) -> List[Dict]:
+        """ユーザーの保存済み論文一覧"""
+        user_id = str(user_id)
+        if user_id not in self._cache:
+            self._cache[user_id] = await asyncio.to_thread(self._load_user, user_id)
+        return self._cache[user_id]
+
+    async def contains(self, user_id, paper_id: str) -> bool:
+        return any(paper["id"] == paper_id for paper in await self.list(user_id))
+
+    async def add(self, user_id, paper_id: str, title: str) -> bool:
+        """論文を保存する（既に保存済みなら False）"""
+        user_id = str(user_id)
+        papers = await self.list(user_id)
+        if any(paper["id"] == paper_id for paper in papers):
+            return False
+
+        saved_at = datetime.now().isoformat()
+        await asyncio.to_thread(self._insert, user_id, paper_id, title, saved_at)
+        papers.append({"id": paper_id, "title": title, "saved_at": saved_at})
+        return True
+
+    async def remove(self, user_id, paper_id: str) -> bool:
+        """保存済みの論文を削除する（保存されていなければ False）"""
+        user_id = str(user_id)
+        papers = await self.list(user_id)
+        if not any(paper["id"] == paper_id for paper in papers):
+            return False
+
+        await asyncio.to_thread(self._delete, user_id, paper_id)
+        self._cache[user_id] = [paper for paper in papers if paper["id"] != paper_id]
+        return True
@@ -1,4 +1,16 @@
 import os
+import tempfile
+
+from services.http_client import http_pool
+from config import MAX_FILE_SIZE, ALLOWED_FILE_TYPES, FILE_SPOOL_THRESHOLD
+
+# ダウンロード時に一度に読み込むサイズ
+CHUNK_SIZE = 64 * 1024
+
+
+class FileTransferError(Exception):
+    """ファイル転送の失敗（サイズ超過・ダウンロード失敗など）"""
+
 
 def upload_file(file_path, platform):
     """
@@ -7,4 +19,75 @@ def upload_file(file_path, platform):
     if platform == "slack":
         print(f"Slack に {file_path} をアップロード")
     elif platform == "discord":
-        print(f"Discord に {file_path} をアップロード")
\ No newline at end of file
+        print(f"Discord に {file_path} をアップロード")
+
+
+async def download_file(url, headers=None, max_size=MAX_FILE_SIZE):
+    """
+    ファイルを分割してダウンロードする
+    FILE_SPOOL_THRESHOLD を超えた分は一時ファイルに書き出すため、
+    ファイルサイズに関係なくメモリ使用量は一定に保たれる
+    戻り値は (先頭にシーク済みのファイルオブジェクト, サイズ)。使用後は close() すること
+    """
+    async with http_pool.get(url, service="file", headers=headers) as response:
+        if response.status != 200:
+            raise FileTransferError(f"ダウンロードに失敗しました: status {response.status}")
+
+        # Content-Length で事前にサイズを確認
+        if response.content_length is not None and response.content_length > max_size:
+            raise FileTransferError(f"ファイルサイズが大きすぎます: {response.content_length} bytes")
+
+        spool = tempfile.SpooledTemporaryFile(max_size=FILE_SPOOL_THRESHOLD)
+        size = 0
+        try:
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_size:
+                    raise FileTransferError(f"ファイルサイズが大きすぎます: {size} bytes 以上")
+                spool.write(chunk)
+        except BaseException:
+            spool.close()
+            raise
+
+        spool.seek(0)
+        return spool, size
+
+
+def _iter_chunks(file):
+    """ファイルオブジェクトを CHUNK_SIZE ずつ読み出す（aiohttp の送信データ用）"""
+    async def chunks():
+        while True:
+            chunk = file.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+    return chunks()
+
+
+async def upload_to_slack(client, channels, file, filename, initial_comment=None):
+    """
+    ファイルオブジェクトを分割して Slack にアップロードし、全てのチャンネルに共有する
+    files_upload_v2 はファイル全体をメモリに読み込むため、
+    files.getUploadURLExternal → アップロード先URLへの送信 → files.completeUploadExternal を直接行う
+    """
+    file.seek(0, os.SEEK_END)
+    length = file.tell()
+    file.seek(0)
+
+    upload = await client.files_getUploadURLExternal(filename=filename, length=length)
+    # aiohttp にファイルオブジェクトを渡すと送信後に close されるため、読み出した分だけを渡す
+    async with http_pool.post(upload["upload_url"], service="file", data=_iter_chunks(file),
+                              headers={"Content-Length": str(length)}) as response:
+        if response.status != 200:
+            raise FileTransferError(f"アップロードに失敗しました: status {response.status}")
+
+    return await client.files_completeUploadExternal(
+        files=[{"id": upload["file_id"], "title": filename}],
+        channels=list(channels),
+        initial_comment=initial_comment
+    )
+
+
+def is_allowed_file(filename):
+    """拡張子が転送対象かどうか"""
+    return os.path.splitext(filename)[1].lower() in ALLOWED_FILE_TYPES
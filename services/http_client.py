@@ -0,0 +1,94 @@
+import asyncio
+import logging
+from collections import Counter
+from typing import Dict
+
+import aiohttp
+
+from config import HTTP_POOL_LIMIT, HTTP_POOL_LIMIT_PER_HOST, HTTP_DNS_CACHE_TTL, HTTP_KEEPALIVE_TIMEOUT, HTTP_TIMEOUTS
+
+
+class HttpClientPool:
+    """
+    Bot全体で共有するHTTPクライアント
+    ホストごとの接続プール・DNSキャッシュ・Keep-Aliveを使い回す
+    """
+
+    def __init__(self):
+        self._sessions: Dict[asyncio.AbstractEventLoop, aiohttp.ClientSession] = {}
+        self.requests = Counter()
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """実行中のイベントループ用のセッション（初回アクセス時に作成）"""
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=HTTP_POOL_LIMIT,
+                limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+                ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+                keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT
+            )
+            session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self.timeout("default")
+            )
+            self._sessions[loop] = session
+        return session
+
+    @staticmethod
+    def timeout(service: str) -> aiohttp.ClientTimeout:
+        """サービスごとのタイムアウト"""
+        return aiohttp.ClientTimeout(total=HTTP_TIMEOUTS.get(service, HTTP_TIMEOUTS["default"]))
+
+    def get(self, url: str, service: str = "default", **kwargs):
+        """
+        GETリクエスト
+        async with http_pool.get(url, service="news") as response: の形で使う
+        """
+        self.requests[service] += 1
+        kwargs.setdefault("timeout", self.timeout(service))
+        return self.session.get(url, **kwargs)
+
+    def post(self, url: str, service: str = "default", **kwargs):
+        """
+        POSTリクエスト
+        async with http_pool.post(url, service="file", data=...) as response: の形で使う
+        """
+        self.requests[service] += 1
+        kwargs.setdefault("timeout", self.timeout(service))
+        return self.session.post(url, **kwargs)
+
+    def stats(self) -> Dict[str, int]:
+        """接続プールの使用状況"""
+        in_use = 0
+        idle = 0
+        for session in self._sessions.values():
+            connector = session.connector
+            if connector is None or session.closed:
+                continue
+            in_use += len(getattr(connector, "_acquired", ()))
+            idle += sum(len(conns) for conns in getattr(connector, "_conns", {}).values())
+        return {
+            "in_use": in_use,
+            "idle": idle,
+            "limit": HTTP_POOL_LIMIT,
+            "requests": sum(self.requests.values()),
+        }
+
+    async def close(self):
+        """セッションを閉じる（Bot終了時に呼び出す）"""
+        current_loop = asyncio.get_running_loop()
+        for loop, session in self._sessions.items():
+            if session.closed:
+                continue
+            if loop is current_loop:
+                await session.close()
+            elif not loop.is_closed():
+                asyncio.run_coroutine_threadsafe(session.close(), loop)
+        self._sessions.clear()
+        logging.info("HTTPクライアントを終了しました")
+
+
+http_pool = HttpClientPool()
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from config import INGEST_WORKERS, INGEST_QUEUE_MAX_SIZE
+from utils.metrics import INGEST_EVENTS, INGEST_WAIT, QUEUE_DEPTH
+
+
+class OrderedWorkerPool:
+    """
+    キーごとに順序を保って処理する固定数のワーカー
+    同じキー（Slackのチャンネル）のイベントは届いた順に1件ずつ処理し、異なるキーは並行して処理する
+    処理待ちが max_size に達した場合は submit が False を返す（呼び出し側で扱いを決める）
+    """
+
+    def __init__(self, handler: Callable[[Any], Awaitable[None]], name: str, workers: int = INGEST_WORKERS,
+                 max_size: int = INGEST_QUEUE_MAX_SIZE):
+        self.handler = handler
+        self.name = name
+        self.workers = workers
+        self.max_size = max_size
+        # キー -> 処理待ちの (投入時刻, イベント)。処理待ちか処理中のキーだけを持つ
+        self._pending: Dict[str, Deque[Tuple[float, Any]]] = {}
+        # 処理できるキー（同じキーは同時に1つのワーカーだけが扱う）
+        self._ready: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._size = 0
+        self._overloaded = False
+        QUEUE_DEPTH.set_function(self.depth, queue=name)
+
+    def depth(self) -> int:
+        return self._size
+
+    def full(self) -> bool:
+        return self._size >= self.max_size
+
+    def _start(self):
+        self._ready = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def reject(self):
+        """受け付けなかったイベントを記録する（ログは上限に達した時に1回だけ出す）"""
+        INGEST_EVENTS.inc(queue=self.name, status="rejected")
+        if not self._overloaded:
+            self._overloaded = True
+            logging.warning(f"処理待ちが上限に達しました (queue={self.name}, size={self._size})")
+
+    def submit(self, key: str, item: Any) -> bool:
+        """イベントを追加する（待機しない）。処理待ちが上限に達している場合は False"""
+        if self.full():
+            self.reject()
+            return False
+        # 上限付近で警告が繰り返されないよう、半分まで減ってから解除する
+        if self._overloaded and self._size < self.max_size // 2:
+            self._overloaded = False
+            logging.info(f"処理待ちが上限を下回りました (queue={self.name}, size={self._size})")
+        if self._ready is None:
+            self._start()
+        items = self._pending.get(key)
+        if items is None:
+            items = self._pending[key] = deque()
+            self._ready.put_nowait(key)
+        items.append((time.monotonic(), item))
+        self._size += 1
+        INGEST_EVENTS.inc(queue=self.name, status="accepted")
+        return True
+
+    async def _worker(self):
+        while True:
+            key = await self._ready.get()
+            items = self._pending[key]
+            enqueued_at, item = items.popleft()
+            self._size -= 1
+            INGEST_WAIT.observe(time.monotonic() - enqueued_at, queue=self.name)
+            try:
+                await self.handler(item)
+            except Exception as e:
+                INGEST_EVENTS.inc(queue=self.name, status="error")
+                logging.error(f"イベント処理エラー (queue={self.name}, key={key}): {e}")
+            finally:
+                # 1件ごとにキューの末尾へ戻し、イベントの多いチャンネルが他を待たせないようにする
+                if items:
+                    self._ready.put_nowait(key)
+                else:
+                    del self._pending[key]
+
+    async def join(self):
+        """処理待ちと処理中のイベントがなくなるまで待つ"""
+        while self._pending:
+            await asyncio.sleep(0.05)
+
+    async def close(self, timeout: float = 10.0):
+        """残りのイベントを処理してからワーカーを終了する"""
+        try:
+            await asyncio.wait_for(self.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logging.warning(f"未処理のイベントを破棄します (queue={self.name}, size={self._size})")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._ready = None
+        self._pending.clear()
+        self._size = 0
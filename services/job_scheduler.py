@@ -0,0 +1,299 @@
+import asyncio
+import heapq
+import logging
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+import pytz
+from sqlalchemy import insert, select
+
+from services.database_service import JobState, SessionLocal, init_db
+from utils.metrics import JOB_DURATION, JOB_RUNS
+
+JST = pytz.timezone('Asia/Tokyo')
+
+
+class IntervalTrigger:
+    """一定間隔で実行する"""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+
+    def next_after(self, timestamp: float) -> float:
+        return timestamp + self.seconds
+
+    def __str__(self):
+        return f"every {self.seconds:g}s"
+
+
+class CronTrigger:
+    """
+    cron形式（分 時 日 月 曜日）で実行する
+    各フィールドは "*", "5", "1,15", "9-17", "*/10", "5/10" の形式に対応（曜日は 0=日曜）
+    """
+
+    RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 6))
+
+    def __init__(self, expression: str, timezone=JST):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"cron形式が正しくありません: {expression}")
+        self.expression = expression
+        self.timezone = timezone
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            self._parse(field, low, high) for field, (low, high) in zip(fields, self.RANGES)
+        )
+        # 日と曜日の両方を指定した場合はどちらかに一致すれば実行する（cronと同じ）
+        self._day_any = fields[2] == "*"
+        self._weekday_any = fields[4] == "*"
+
+    @staticmethod
+    def _parse(field: str, low: int, high: int) -> List[int]:
+        values: Set[int] = set()
+        for part in field.split(","):
+            part, _, step = part.partition("/")
+            if part == "*":
+                start, end = low, high
+            elif "-" in part:
+                start, end = (int(value) for value in part.split("-", 1))
+            else:
+                # "5/10" は cron と同じく 5 から最大値までを10刻みにする
+                start = int(part)
+                end = high if step else start
+            if start < low or end > high or start > end:
+                raise ValueError(f"cronの値が範囲外です: {field}")
+            values.update(range(start, end + 1, int(step) if step else 1))
+        return sorted(values)
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day_ok = moment.day in self.days
+        weekday_ok = (moment.weekday() + 1) % 7 in self.weekdays
+        if self._day_any:
+            return weekday_ok
+        if self._weekday_any:
+            return day_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, timestamp: float) -> float:
+        moment = datetime.fromtimestamp(timestamp, self.timezone).replace(second=0, microsecond=0, tzinfo=None)
+        moment += timedelta(minutes=1)
+        # 最大で約4年分を探す（2月29日のような指定のため）
+        limit = moment + timedelta(days=366 * 4)
+        while moment < limit:
+            if moment.month not in self.months:
+                year, month = (moment.year + 1, 1) if moment.month == 12 else (moment.year, moment.month + 1)
+                moment = datetime(year, month, 1)
+                continue
+            if not self._day_matches(moment):
+                moment = datetime(moment.year, moment.month, moment.day) + timedelta(days=1)
+                continue
+            if moment.hour not in self.hours:
+                later = [hour for hour in self.hours if hour > moment.hour]
+                if not later:
+                    moment = datetime(moment.year, moment.month, moment.day) + timedelta(days=1)
+                else:
+                    moment = moment.replace(hour=later[0], minute=0)
+                continue
+            if moment.minute not in self.minutes:
+                later = [minute for minute in self.minutes if minute > moment.minute]
+                if not later:
+                    moment = moment.replace(minute=0) + timedelta(hours=1)
+                else:
+                    moment = moment.replace(minute=later[0])
+                continue
+            return self.timezone.localize(moment).timestamp()
+        raise ValueError(f"次の実行時刻が見つかりません: {self.expression}")
+
+    def __str__(self):
+        return f"cron '{self.expression}'"
+
+
+@dataclass
+class Job:
+    name: str
+    func: Callable[[], Awaitable[None]]
+    trigger: object
+    jitter: float = 0.0  # 実行時刻に加える最大の揺らぎ（秒）
+    catch_up: bool = False  # 停止中に実行予定を過ぎていた場合、起動時に1回だけ実行する
+    timeout: Optional[float] = None
+    next_run: Optional[float] = None
+    last_run: Optional[float] = None
+    last_duration: Optional[float] = None
+    last_status: Optional[str] = None
+    runs: int = 0
+    failures: int = 0
+    skipped: int = 0
+
+
+class JobScheduler:
+    """
+    定期処理をまとめて実行するスケジューラー
+    次回の実行時刻をヒープで管理し、1つのタスクが最も近い時刻まで待機する
+    同じジョブは同時に1つしか実行せず、最後の実行時刻はSQLiteに保存する
+    """
+
+    def __init__(self):
+        self.jobs: Dict[str, Job] = {}
+        self._heap: List[Tuple[float, int, str]] = []
+        self._seq = 0
+        self._running_jobs: Dict[str, asyncio.Task] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._starting = False
+        init_db()
+
+    def add_job(self, name: str, func: Callable[[], Awaitable[None]], trigger, jitter: float = 0.0,
+                catch_up: bool = False, timeout: Optional[float] = None) -> Job:
+        """ジョブを登録する（同じ名前のジョブは置き換える）"""
+        job = Job(name, func, trigger, jitter=jitter, catch_up=catch_up, timeout=timeout)
+        previous = self.jobs.get(name)
+        if previous:
+            job.last_run, job.runs, job.failures = previous.last_run, previous.runs, previous.failures
+        self.jobs[name] = job
+        if self.running:
+            self._schedule(job, self._next_run(job, time.time()))
+        return job
+
+    def remove_job(self, name: str) -> bool:
+        """ジョブを削除する（ヒープに残った予定は実行時に無視される）"""
+        job = self.jobs.pop(name, None)
+        if job is None:
+            return False
+        job.next_run = None
+        task = self._running_jobs.pop(name, None)
+        if task and not task.done():
+            task.cancel()
+        return True
+
+    def _next_run(self, job: Job, after: float) -> float:
+        next_run = job.trigger.next_after(after)
+        if job.jitter:
+            next_run += random.uniform(0, job.jitter)
+        return next_run
+
+    def _schedule(self, job: Job, next_run: float):
+        job.next_run = next_run
+        self._seq += 1
+        heapq.heappush(self._heap, (next_run, self._seq, job.name))
+        if self._wakeup:
+            self._wakeup.set()
+
+    # ---- 永続化 ----
+
+    def _load_states(self) -> Dict[str, JobState]:
+        with SessionLocal() as session:
+            return {state.name: state for state in session.execute(select(JobState)).scalars().all()}
+
+    def _save_state(self, values: Dict):
+        with SessionLocal() as session:
+            session.execute(insert(JobState).prefix_with("OR REPLACE").values(**values))
+            session.commit()
+
+    # ---- 実行 ----
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        """
+        スケジューラーを開始する（実行中の場合は何もしない）
+        前回の実行時刻を読み込み、停止中に過ぎた実行予定は catch_up のジョブのみ1回実行する
+        """
+        if self.running or self._starting:
+            return
+        self._starting = True
+        self._wakeup = asyncio.Event()
+        self._heap.clear()
+        try:
+            states = await asyncio.to_thread(self._load_states)
+        except Exception as e:
+            logging.error(f"ジョブの状態の読み込みエラー: {e}")
+            states = {}
+        finally:
+            self._starting = False
+
+        now = time.time()
+        for job in self.jobs.values():
+            state = states.get(job.name)
+            if state:
+                job.last_run, job.last_status, job.last_duration = state.last_run, state.last_status, state.duration
+            if job.last_run is not None and job.catch_up and job.trigger.next_after(job.last_run) <= now:
+                logging.info(f"停止中に実行されなかったジョブを実行します: {job.name}")
+                self._schedule(job, now)
+            elif job.last_run is not None and isinstance(job.trigger, IntervalTrigger):
+                # 間隔ジョブは前回の実行から数える
+                self._schedule(job, max(self._next_run(job, job.last_run), now))
+            else:
+                self._schedule(job, self._next_run(job, now))
+        self._task = asyncio.create_task(self._run())
+        logging.info(f"スケジューラーを開始しました: {len(self.jobs)}件のジョブ")
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            now = time.time()
+            while self._heap and self._heap[0][0] <= now:
+                scheduled_at, _, name = heapq.heappop(self._heap)
+                job = self.jobs.get(name)
+                # 置き換え・削除されたジョブの古い予定は無視する
+                if job is None or job.next_run != scheduled_at:
+                    continue
+                self._dispatch(job)
+                self._schedule(job, self._next_run(job, max(now, scheduled_at)))
+
+            timeout = self._heap[0][0] - now if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _dispatch(self, job: Job):
+        current = self._running_jobs.get(job.name)
+        if current and not current.done():
+            # 前回の実行が終わっていない場合は今回の実行を飛ばす
+            job.skipped += 1
+            JOB_RUNS.inc(job=job.name, status="skipped")
+            logging.warning(f"ジョブ {job.name} は実行中のため今回の実行を飛ばします")
+            return
+        self._running_jobs[job.name] = asyncio.create_task(self._execute(job))
+
+    async def _execute(self, job: Job):
+        started = time.time()
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(job.func(), timeout=job.timeout)
+            job.last_status = "success"
+        except Exception as e:
+            job.failures += 1
+            job.last_status = "error"
+            logging.error(f"ジョブ {job.name} の実行エラー: {e}")
+        duration = time.monotonic() - start
+        job.runs += 1
+        job.last_run = started
+        job.last_duration = duration
+        JOB_DURATION.observe(duration, job=job.name)
+        JOB_RUNS.inc(job=job.name, status=job.last_status)
+        try:
+            await asyncio.to_thread(self._save_state, {
+                "name": job.name,
+                "last_run": started,
+                "last_status": job.last_status,
+                "duration": duration,
+            })
+        except Exception as e:
+            logging.error(f"ジョブの状態の保存エラー: {e}")
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        for task in self._running_jobs.values():
+            task.cancel()
+        self._running_jobs.clear()
+
+
+scheduler = JobScheduler()
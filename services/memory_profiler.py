@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import os
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from config import MEMORY_SNAPSHOT_INTERVAL, MEMORY_TRACE_FRAMES, MEMORY_REPORT_TOP
+from services.job_scheduler import IntervalTrigger, scheduler
+
+JOB_NAME = "memory_snapshot"
+
+# 集計から除外するメモリ確保（tracemalloc・この計測処理自身と import 処理）
+SNAPSHOT_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+@dataclass
+class MemoryReport:
+    """前回のスナップショットからのメモリ使用量の変化"""
+    started_at: float  # 計測を開始した時刻（UNIX時間）
+    elapsed: float  # 前回のスナップショットからの秒数
+    current: int  # 追跡中のメモリ使用量 (bytes)
+    peak: int
+    total_diff: int  # 前回からの増減 (bytes)
+    modules: List[Tuple[str, int, int]] = field(default_factory=list)  # (モジュール, 増減, 使用量)
+    lines: List[Tuple[str, int, int]] = field(default_factory=list)  # (ファイル:行, 増減, 確保数の増減)
+
+
+def module_name(filename: str) -> str:
+    """ファイル名をモジュール名にする（sys.path 上にない場合はファイル名のまま）"""
+    path = os.path.abspath(filename)
+    for root in sorted((os.path.abspath(entry or ".") for entry in sys.path), key=len, reverse=True):
+        if path.startswith(root + os.sep):
+            module = os.path.splitext(os.path.relpath(path, root))[0].replace(os.sep, ".")
+            return module[:-len(".__init__")] if module.endswith(".__init__") else module
+    return filename
+
+
+class MemoryProfiler:
+    """
+    必要な時だけ tracemalloc を有効にしてメモリリークを調べる
+    有効な間は一定間隔でスナップショットを取り、前回との差をモジュール別・行別に集計して on_report に渡す
+    """
+
+    def __init__(self, interval: float = MEMORY_SNAPSHOT_INTERVAL, frames: int = MEMORY_TRACE_FRAMES,
+                 top: int = MEMORY_REPORT_TOP):
+        self.interval = interval
+        self.frames = frames
+        self.top = top
+        self.on_report: Optional[Callable[[MemoryReport], Awaitable[None]]] = None
+        self.started_at: Optional[float] = None
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        self._snapshot_at = 0.0
+        # スナップショットの取得は同時に1回だけ行う
+        self._lock = asyncio.Lock()
+
+    @property
+    def running(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    async def start(self) -> bool:
+        """計測を開始する（既に実行中の場合は False）"""
+        if self.running:
+            return False
+        tracemalloc.start(self.frames)
+        self.started_at = time.time()
+        async with self._lock:
+            self._snapshot = await asyncio.to_thread(self._take_snapshot)
+            self._snapshot_at = time.monotonic()
+        scheduler.add_job(JOB_NAME, self.report, IntervalTrigger(self.interval), timeout=self.interval)
+        logging.info(f"メモリの計測を開始しました (間隔: {self.interval}秒, フレーム数: {self.frames})")
+        return True
+
+    def stop(self) -> bool:
+        """計測を終了する（実行中でない場合は False）"""
+        scheduler.remove_job(JOB_NAME)
+        if not self.running:
+            return False
+        tracemalloc.stop()
+        self._snapshot = None
+        self.started_at = None
+        logging.info("メモリの計測を終了しました")
+        return True
+
+    async def toggle(self):
+        """シグナルから呼び出す（実行中なら終了、停止中なら開始）"""
+        if not self.stop():
+            await self.start()
+
+    @staticmethod
+    def _take_snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+
+    def _compare(self, previous: tracemalloc.Snapshot, current: tracemalloc.Snapshot) -> Dict:
+        modules: Dict[str, List[int]] = {}
+        for stat in current.compare_to(previous, "filename"):
+            name = module_name(stat.traceback[0].filename)
+            totals = modules.setdefault(name, [0, 0])
+            totals[0] += stat.size_diff
+            totals[1] += stat.size
+        lines = [
+            (f"{module_name(stat.traceback[0].filename)}:{stat.traceback[0].lineno}", stat.size_diff, stat.count_diff)
+            for stat in current.compare_to(previous, "lineno")[:self.top] if stat.size_diff > 0
+        ]
+        top_modules = sorted(((name, diff, size) for name, (diff, size) in modules.items() if diff > 0),
+                             key=lambda item: item[1], reverse=True)[:self.top]
+        return {
+            "modules": top_modules,
+            "lines": lines,
+            "total_diff": sum(diff for diff, _ in modules.values()),
+        }
+
+    async def take_report(self) -> Optional[MemoryReport]:
+        """スナップショットを取り、前回との差を返す（計測していない場合は None）"""
+        if not self.running:
+            return None
+        async with self._lock:
+            previous = self._snapshot
+            if previous is None:
+                return None
+            current = await asyncio.to_thread(self._take_snapshot)
+            # 比較は重いので別スレッドで行う
+            result = await asyncio.to_thread(self._compare, previous, current)
+            now = time.monotonic()
+            elapsed = now - self._snapshot_at
+            self._snapshot, self._snapshot_at = current, now
+        size, peak = tracemalloc.get_traced_memory()
+        return MemoryReport(self.started_at, elapsed, size, peak, **result)
+
+    async def report(self):
+        """定期ジョブ: 差分を on_report に渡す"""
+        report = await self.take_report()
+        if report and self.on_report:
+            await self.on_report(report)
+
+
+memory_profiler = MemoryProfiler()
@@ -0,0 +1,127 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import insert, select
+
+from config import MESSAGE_LINK_CACHE_SIZE
+from services.database_service import MessageLink, SessionLocal, init_db
+
+
+class MessageLinkStore:
+    """
+    DiscordメッセージIDとSlackのtsの双方向対応表
+    SQLiteに永続化し、直近の対応はメモリ上のLRUで保持する
+    1つのDiscordメッセージは複数のSlackメッセージに対応することがある
+    （送信キューでまとめて投稿した場合・複数のSlackチャンネルへ転送した場合）。
+    Discord側のリアクションはSlackチャンネルごとに最初のメッセージだけに同期する（get_reaction_targets）
+    """
+
+    def __init__(self, cache_size: int = MESSAGE_LINK_CACHE_SIZE):
+        self.cache_size = cache_size
+        # discord_message_id -> [(slack_channel_id, slack_ts), ...]（対応のすべて）
+        self._by_discord: "OrderedDict[str, List[Tuple[str, str]]]" = OrderedDict()
+        # (slack_channel_id, slack_ts) -> (discord_channel_id, discord_message_id)
+        self._by_slack: "OrderedDict[Tuple[str, str], Tuple[int, int]]" = OrderedDict()
+        init_db()
+
+    def _trim(self):
+        while len(self._by_discord) > self.cache_size:
+            self._by_discord.popitem(last=False)
+        while len(self._by_slack) > self.cache_size:
+            self._by_slack.popitem(last=False)
+
+    def _remember_slack(self, discord_channel_id, discord_message_id, slack_channel_id, slack_ts):
+        self._by_slack[(slack_channel_id, slack_ts)] = (int(discord_channel_id), int(discord_message_id))
+        self._by_slack.move_to_end((slack_channel_id, slack_ts))
+
+    def _remember(self, discord_channel_id, discord_message_id, links: List[Tuple[str, str]]):
+        key = str(discord_message_id)
+        cached = self._by_discord.get(key, [])
+        self._by_discord[key] = cached + [link for link in links if link not in cached]
+        self._by_discord.move_to_end(key)
+        for slack_channel_id, slack_ts in links:
+            self._remember_slack(discord_channel_id, discord_message_id, slack_channel_id, slack_ts)
+        self._trim()
+
+    def _insert(self, rows):
+        with SessionLocal() as session:
+            session.execute(insert(MessageLink).prefix_with("OR REPLACE"), rows)
+            session.commit()
+
+    def _select(self, *conditions):
+        with SessionLocal() as session:
+            return session.execute(select(MessageLink).where(*conditions).limit(1)).scalars().first()
+
+    def _select_all(self, *conditions):
+        with SessionLocal() as session:
+            return session.execute(select(MessageLink).where(*conditions).order_by(MessageLink.id)).scalars().all()
+
+    async def add(self, discord_channel_id, discord_message_id, slack_channel_id: str, slack_ts: str):
+        """対応を登録する"""
+        await self.add_many(discord_channel_id, discord_message_id, [(slack_channel_id, slack_ts)])
+
+    async def add_many(self, discord_channel_id, discord_message_id, links: List[Tuple[str, str]]):
+        """1つのDiscordメッセージに対応するSlackメッセージをまとめて登録する"""
+        if not links:
+            return
+        self._remember(discord_channel_id, discord_message_id, links)
+        try:
+            await asyncio.to_thread(self._insert, [
+                {
+                    "discord_channel_id": str(discord_channel_id),
+                    "discord_message_id": str(discord_message_id),
+                    "slack_channel_id": slack_channel_id,
+                    "slack_ts": slack_ts,
+                }
+                for slack_channel_id, slack_ts in links
+            ])
+        except Exception as e:
+            logging.error(f"メッセージ対応の保存エラー: {e}")
+
+    async def get_slack_links(self, discord_message_id) -> List[Tuple[str, str]]:
+        """DiscordメッセージIDから対応するすべての (SlackチャンネルID, ts) を取得（投稿順）"""
+        key = str(discord_message_id)
+        if key in self._by_discord:
+            self._by_discord.move_to_end(key)
+            return list(self._by_discord[key])
+
+        rows = await asyncio.to_thread(self._select_all, MessageLink.discord_message_id == key)
+        if not rows:
+            return []
+        links = [(row.slack_channel_id, row.slack_ts) for row in rows]
+        self._remember(rows[0].discord_channel_id, key, links)
+        return links
+
+    async def get_reaction_targets(self, discord_message_id) -> List[Tuple[str, str]]:
+        """
+        Discordのリアクションを同期する (SlackチャンネルID, ts) を取得する
+        まとめて投稿したメッセージは最初のSlackメッセージだけに同期し、複数のチャンネルに転送した場合はチャンネルごとに1件
+        """
+        targets: Dict[str, str] = {}
+        for slack_channel_id, slack_ts in await self.get_slack_links(discord_message_id):
+            targets.setdefault(slack_channel_id, slack_ts)
+        return list(targets.items())
+
+    async def get_discord(self, slack_channel_id: str, slack_ts: str) -> Optional[Tuple[int, int]]:
+        """Slackのチャンネルとtsから (DiscordチャンネルID, メッセージID) を取得"""
+        key = (slack_channel_id, slack_ts)
+        if key in self._by_slack:
+            self._by_slack.move_to_end(key)
+            return self._by_slack[key]
+
+        link = await asyncio.to_thread(
+            self._select,
+            MessageLink.slack_channel_id == slack_channel_id,
+            MessageLink.slack_ts == slack_ts
+        )
+        if link is None:
+            return None
+        # Discord側の一覧は一部だけになるため、Slack側の索引にだけ登録する
+        self._remember_slack(link.discord_channel_id, link.discord_message_id, link.slack_channel_id, link.slack_ts)
+        self._trim()
+        return int(link.discord_channel_id), int(link.discord_message_id)
+
+    def __len__(self):
+        return len(self._by_discord)
@@ -1,14 +1,638 @@
+import asyncio
+import io
+import json
+import logging
+import re
+import time
+import zipfile
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import discord
+from sqlalchemy import and_, func, insert, or_, select
+
+from config import (
+    MIGRATION_CONCURRENCY,
+    MIGRATION_SLACK_RATE,
+    MIGRATION_DISCORD_RATE,
+    MIGRATION_PAGE_SIZE,
+    MIGRATION_REPORT_INTERVAL,
+    MIGRATION_IMPORT_BATCH,
+    MIGRATION_IMPORT_TRANSACTION,
+)
+from services.database_service import MigrationCheckpoint, SessionLocal, SlackArchiveMessage, SlackArchiveName, init_db
+from services.relay_queue import MAX_EMBEDS_PER_MESSAGE, MAX_EMBED_CHARS_PER_MESSAGE
 from utils.logger import log_event
 
-def migrate_channels(slack_channel_ids, discord_channel_id):
+# 移行しないメッセージの種類
+SKIPPED_SUBTYPES = {"channel_join", "channel_leave", "group_join", "group_leave"}
+# レート制限・一時的なエラーの再試行回数
+MAX_RETRIES = 5
+# Embedの説明文の上限
+MAX_DESCRIPTION_LENGTH = 4096
+# エクスポートのJSONを読み込む単位（文字数）
+IMPORT_CHUNK_SIZE = 64 * 1024
+# エクスポートの日付ごとのファイル名
+DAY_FILE = re.compile(r"\d{4}-\d{2}-\d{2}\.json$")
+
+
+class RateLimiter:
+    """
+    トークンバケットによる呼び出し回数の制限
+    rate が 0 以下の場合は制限しない。429 を受けた場合は pause で全体を止める
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                if self.rate <= 0:
+                    return
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """レート制限・サーバーエラーの場合は再試行までの秒数を返す（それ以外は None）"""
+    response = getattr(error, "response", None)
+    status = (getattr(error, "status", None) or getattr(response, "status_code", None)
+              or getattr(response, "status", None))
+    if status == 429:
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after is None:
+            headers = getattr(response, "headers", None) or {}
+            retry_after = headers.get("Retry-After", 1)
+        return float(retry_after)
+    if isinstance(status, int) and status >= 500:
+        return 1.0
+    return None
+
+
+def archive_row(slack_channel_id: str, message: Dict) -> Optional[Dict]:
+    """Slackのメッセージをアーカイブの行に変換する（移行しないメッセージは None）"""
+    if message.get("subtype") in SKIPPED_SUBTYPES or not message.get("ts"):
+        return None
+    thread_ts = message.get("thread_ts")
+    # スレッドの親は thread_ts == ts なので通常のメッセージとして扱う
+    if thread_ts == message["ts"]:
+        thread_ts = None
+    files = [{"name": file.get("name") or file.get("title", ""), "url": file.get("permalink", "")}
+             for file in message.get("files", [])]
+    return {
+        "channel_id": slack_channel_id,
+        "ts": message["ts"],
+        "thread_ts": thread_ts,
+        "root_ts": thread_ts or message["ts"],
+        "user_id": message.get("user"),
+        "username": message.get("username") or message.get("bot_profile", {}).get("name"),
+        "text": message.get("text") or "",
+        "subtype": message.get("subtype"),
+        "files": json.dumps(files, ensure_ascii=False) if files else None,
+    }
+
+
+@dataclass
+class ChannelProgress:
+    slack_channel_id: str
+    discord_channel_id: str
+    status: str = "待機中"
+    fetched: int = 0  # 取得済みの件数
+    total: Optional[int] = None  # 取得が終わった時点の件数
+    posted: int = 0  # 投稿済みの件数（前回までの分を含む）
+    posted_this_run: int = 0
+    error: Optional[str] = None
+
+
+@dataclass
+class MigrationProgress:
+    """移行全体の進捗（投稿の速度と残り時間の見積もり）"""
+    channels: Dict[str, ChannelProgress] = field(default_factory=dict)
+    started_at: float = field(default_factory=time.monotonic)
+    slack_calls: int = 0
+    discord_sends: int = 0
+    rate_limited: int = 0
+
+    @property
+    def posted(self) -> int:
+        return sum(channel.posted for channel in self.channels.values())
+
+    @property
+    def remaining(self) -> int:
+        """取得済みで未投稿の件数（取得中のチャンネルは取得済みの分のみ）"""
+        return sum(max((channel.total or channel.fetched) - channel.posted, 0) for channel in self.channels.values())
+
+    def rate(self) -> float:
+        """今回の実行での投稿速度（件/秒）"""
+        elapsed = time.monotonic() - self.started_at
+        posted = sum(channel.posted_this_run for channel in self.channels.values())
+        return posted / elapsed if elapsed > 0 else 0.0
+
+    def eta(self) -> Optional[float]:
+        rate = self.rate()
+        return self.remaining / rate if rate > 0 else None
+
+    @property
+    def finished(self) -> bool:
+        return all(channel.status in ("完了", "エラー") for channel in self.channels.values())
+
+    def describe(self) -> str:
+        eta = self.eta()
+        eta_text = f"{int(eta // 60)}分{int(eta % 60)}秒" if eta is not None else "不明"
+        lines = [f"{self.posted}件投稿 / 残り{self.remaining}件以上 • {self.rate():.1f}件/秒 • 残り時間 {eta_text}"]
+        for channel in self.channels.values():
+            total = channel.total if channel.total is not None else f"{channel.fetched}+"
+            line = f"{channel.slack_channel_id} → {channel.discord_channel_id}: {channel.status} {channel.posted}/{total}"
+            if channel.error:
+                line += f" ({channel.error})"
+            lines.append(line)
+        return "\n".join(lines)
+
+
+class MigrationEngine:
+    """
+    Slackのチャンネル履歴をDiscordへ移行する
+    1. conversations.history / conversations.replies をカーソルで取得してSQLiteに保存する
+    2. 保存したメッセージを古い順（スレッドは親の直後）にEmbedにまとめて投稿する
+    どちらもチャンネルごとにチェックポイントを保存し、中断した場合は続きから再開する
+    投稿直後に中断した場合は、最後の1回分が再送されることがある
+    """
+
+    def __init__(self, slack_client, directory, get_channel: Callable[[str], object],
+                 concurrency: int = MIGRATION_CONCURRENCY, slack_rate: float = MIGRATION_SLACK_RATE,
+                 discord_rate: float = MIGRATION_DISCORD_RATE, page_size: int = MIGRATION_PAGE_SIZE,
+                 report_interval: float = MIGRATION_REPORT_INTERVAL, session_factory=SessionLocal):
+        self.slack_client = slack_client
+        self.directory = directory
+        self.get_channel = get_channel
+        self.concurrency = concurrency
+        self.slack_budget = RateLimiter(slack_rate)
+        self.discord_budget = RateLimiter(discord_rate, burst=5)
+        self.page_size = page_size
+        self.report_interval = report_interval
+        self.session_factory = session_factory
+        self.progress: Optional[MigrationProgress] = None
+        # 同じDiscordチャンネルへの投稿は1チャンネルずつ行う（順序が混ざらないように）
+        self._post_locks: Dict[str, asyncio.Lock] = {}
+        self._running = False
+        if session_factory is SessionLocal:
+            init_db()
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    # ---- 永続化 ----
+
+    def _load_checkpoint(self, slack_channel_id: str, discord_channel_id: str) -> Dict:
+        with self.session_factory() as session:
+            checkpoint = session.get(MigrationCheckpoint, slack_channel_id)
+            fetched = self._count_archived(session, slack_channel_id)
+            values = {
+                "slack_channel_id": slack_channel_id,
+                "discord_channel_id": discord_channel_id,
+                "fetch_cursor": None,
+                "fetch_done": 0,
+                "posted_root_ts": None,
+                "posted_ts": None,
+                "posted_count": 0,
+            }
+            if checkpoint:
+                values.update(fetch_cursor=checkpoint.fetch_cursor, fetch_done=checkpoint.fetch_done)
+                # 移行先が変わった場合は最初から投稿する
+                if checkpoint.discord_channel_id == discord_channel_id:
+                    values.update(posted_root_ts=checkpoint.posted_root_ts, posted_ts=checkpoint.posted_ts,
+                                  posted_count=checkpoint.posted_count)
+            return {"checkpoint": values, "fetched": fetched}
+
+    @staticmethod
+    def _count_archived(session, slack_channel_id: str) -> int:
+        return session.execute(
+            select(func.count()).select_from(SlackArchiveMessage)
+            .where(SlackArchiveMessage.channel_id == slack_channel_id)
+        ).scalar()
+
+    def _count_total(self, slack_channel_id: str) -> int:
+        with self.session_factory() as session:
+            return self._count_archived(session, slack_channel_id)
+
+    def _save_checkpoint(self, values: Dict):
+        with self.session_factory() as session:
+            session.execute(insert(MigrationCheckpoint).prefix_with("OR REPLACE").values(
+                updated_at=time.time(), **values))
+            session.commit()
+
+    def _save_page(self, rows: List[Dict], checkpoint: Dict):
+        """取得したメッセージとカーソルを同じトランザクションで保存する"""
+        with self.session_factory() as session:
+            if rows:
+                session.execute(insert(SlackArchiveMessage.__table__).prefix_with("OR IGNORE"), rows)
+            session.execute(insert(MigrationCheckpoint).prefix_with("OR REPLACE").values(
+                updated_at=time.time(), **checkpoint))
+            session.commit()
+
+    def _load_pending(self, slack_channel_id: str, root_ts: Optional[str], ts: Optional[str],
+                      limit: int) -> List[SlackArchiveMessage]:
+        with self.session_factory() as session:
+            query = select(SlackArchiveMessage).where(SlackArchiveMessage.channel_id == slack_channel_id)
+            if root_ts is not None:
+                query = query.where(or_(
+                    SlackArchiveMessage.root_ts > root_ts,
+                    and_(SlackArchiveMessage.root_ts == root_ts, SlackArchiveMessage.ts > ts)
+                ))
+            query = query.order_by(SlackArchiveMessage.root_ts, SlackArchiveMessage.ts).limit(limit)
+            return session.execute(query).scalars().all()
+
+    # ---- API呼び出し ----
+
+    async def _call(self, budget: RateLimiter, function: Callable[..., Awaitable], **kwargs):
+        """レート制限の範囲で呼び出し、429・サーバーエラーは待機して再試行する"""
+        for attempt in range(MAX_RETRIES):
+            await budget.acquire()
+            try:
+                return await function(**kwargs)
+            except Exception as e:
+                retry_after = _retry_after(e)
+                if retry_after is None or attempt == MAX_RETRIES - 1:
+                    raise
+                self.progress.rate_limited += 1
+                logging.warning(f"移行中のAPI呼び出しを{retry_after:.1f}秒後に再試行します: {e}")
+                budget.pause(retry_after)
+
+    async def _slack(self, method: str, **kwargs):
+        self.progress.slack_calls += 1
+        return await self._call(self.slack_budget, getattr(self.slack_client, method), **kwargs)
+
+    # ---- 取得 ----
+
+    async def _fetch_replies(self, slack_channel_id: str, thread_ts: str) -> List[Dict]:
+        replies = []
+        cursor = None
+        while True:
+            response = await self._slack("conversations_replies", channel=slack_channel_id, ts=thread_ts,
+                                         cursor=cursor, limit=self.page_size)
+            # 1件目は親メッセージ（history で取得済み）
+            replies.extend(message for message in response.get("messages", []) if message.get("ts") != thread_ts)
+            cursor = response.get("response_metadata", {}).get("next_cursor")
+            if not cursor:
+                return replies
+
+    async def _fetch_channel(self, progress: ChannelProgress, checkpoint: Dict):
+        """履歴をページ単位で取得し、ページごとにカーソルを保存する"""
+        progress.status = "取得中"
+        while not checkpoint["fetch_done"]:
+            response = await self._slack("conversations_history", channel=progress.slack_channel_id,
+                                         cursor=checkpoint["fetch_cursor"], limit=self.page_size)
+            messages = response.get("messages", [])
+            # スレッドの返信も同じページの一部として保存する（カーソルを保存した時点で揃っているように）
+            for message in list(messages):
+                if message.get("reply_count") and message.get("thread_ts") == message.get("ts"):
+                    messages.extend(await self._fetch_replies(progress.slack_channel_id, message["ts"]))
+
+            rows = [row for row in (archive_row(progress.slack_channel_id, message) for message in messages) if row]
+            cursor = response.get("response_metadata", {}).get("next_cursor")
+            checkpoint["fetch_cursor"] = cursor or None
+            checkpoint["fetch_done"] = 0 if (cursor and response.get("has_more", True)) else 1
+            await asyncio.to_thread(self._save_page, rows, dict(checkpoint))
+            progress.fetched += len(rows)
+
+    # ---- 投稿 ----
+
+    async def _author_name(self, row: SlackArchiveMessage) -> str:
+        if row.username:
+            return row.username
+        if not row.user_id:
+            return "Slack"
+        try:
+            return await self.directory.get_user_name(row.user_id)
+        except Exception as e:
+            logging.error(f"移行中のユーザー名の取得エラー ({row.user_id}): {e}")
+            return row.user_id
+
+    async def _build_embed(self, row: SlackArchiveMessage, channel_name: str) -> discord.Embed:
+        text = await self.directory.to_discord_markdown(row.text) if row.text else ""
+        if row.files:
+            text += "".join(f"\n📎 [{file['name']}]({file['url']})" if file["url"] else f"\n📎 {file['name']}"
+                            for file in json.loads(row.files))
+        if len(text) > MAX_DESCRIPTION_LENGTH:
+            text = text[:MAX_DESCRIPTION_LENGTH - 1] + "…"
+        embed = discord.Embed(
+            description=text or "（本文なし）",
+            color=discord.Color.light_grey() if row.thread_ts else discord.Color.blue(),
+            timestamp=datetime.fromtimestamp(float(row.ts), timezone.utc)
+        )
+        embed.set_author(name=(("↳ " if row.thread_ts else "") + await self._author_name(row))[:256])
+        embed.set_footer(text=f"Migrated from Slack • #{channel_name}")
+        return embed
+
+    @staticmethod
+    def _batches(items: Iterable, max_embeds: int = MAX_EMBEDS_PER_MESSAGE,
+                 max_chars: int = MAX_EMBED_CHARS_PER_MESSAGE):
+        """(row, embed) を1回で送信できる単位（最大10件・合計6000文字）に分ける"""
+        batch = []
+        chars = 0
+        for row, embed in items:
+            size = len(embed)
+            if batch and (len(batch) == max_embeds or chars + size > max_chars):
+                yield batch
+                batch, chars = [], 0
+            batch.append((row, embed))
+            chars += size
+        if batch:
+            yield batch
+
+    async def _post_channel(self, progress: ChannelProgress, checkpoint: Dict):
+        progress.status = "投稿中"
+        channel = self.get_channel(progress.discord_channel_id)
+        if channel is None:
+            raise ValueError(f"Discordチャンネルが見つかりません: {progress.discord_channel_id}")
+        try:
+            channel_name = await self.directory.get_channel_name(progress.slack_channel_id)
+        except Exception as e:
+            logging.error(f"移行中のチャンネル名の取得エラー ({progress.slack_channel_id}): {e}")
+            channel_name = progress.slack_channel_id
+
+        lock = self._post_locks.setdefault(progress.discord_channel_id, asyncio.Lock())
+        async with lock:
+            while True:
+                rows = await asyncio.to_thread(self._load_pending, progress.slack_channel_id,
+                                               checkpoint["posted_root_ts"], checkpoint["posted_ts"],
+                                               self.page_size)
+                if not rows:
+                    return
+                items = [(row, await self._build_embed(row, channel_name)) for row in rows]
+                for batch in self._batches(items):
+                    self.progress.discord_sends += 1
+                    await self._call(self.discord_budget, channel.send, embeds=[embed for _, embed in batch])
+                    last = batch[-1][0]
+                    checkpoint.update(posted_root_ts=last.root_ts, posted_ts=last.ts,
+                                      posted_count=checkpoint["posted_count"] + len(batch))
+                    # 中断されても送信済みの位置は保存する
+                    await asyncio.shield(asyncio.to_thread(self._save_checkpoint, dict(checkpoint)))
+                    progress.posted = checkpoint["posted_count"]
+                    progress.posted_this_run += len(batch)
+
+    # ---- 実行 ----
+
+    async def _migrate_channel(self, semaphore: asyncio.Semaphore, progress: ChannelProgress, fetch: bool):
+        async with semaphore:
+            try:
+                state = await asyncio.to_thread(self._load_checkpoint, progress.slack_channel_id,
+                                                progress.discord_channel_id)
+                checkpoint = state["checkpoint"]
+                progress.fetched = state["fetched"]
+                progress.posted = checkpoint["posted_count"]
+                if fetch:
+                    await self._fetch_channel(progress, checkpoint)
+                progress.total = progress.fetched = await asyncio.to_thread(self._count_total,
+                                                                            progress.slack_channel_id)
+                await self._post_channel(progress, checkpoint)
+                progress.status = "完了"
+                log_event(f"移行完了: Slack {progress.slack_channel_id} → Discord {progress.discord_channel_id} "
+                          f"({progress.posted}件)")
+            except asyncio.CancelledError:
+                progress.status = "中断"
+                raise
+            except Exception as e:
+                progress.status = "エラー"
+                progress.error = str(e)
+                log_event(f"移行中エラー ({progress.slack_channel_id}): {e}", level="ERROR")
+
+    async def _report(self, on_progress: Optional[Callable[[MigrationProgress], Awaitable[None]]]):
+        while True:
+            await asyncio.sleep(self.report_interval)
+            logging.info(f"移行の進捗: {self.progress.describe()}")
+            if on_progress:
+                try:
+                    await on_progress(self.progress)
+                except Exception as e:
+                    logging.error(f"移行の進捗の通知エラー: {e}")
+
+    def _load_names(self) -> List[SlackArchiveName]:
+        with self.session_factory() as session:
+            return session.execute(select(SlackArchiveName)).scalars().all()
+
+    async def _prime_directory(self):
+        """エクスポートから取り込んだ名前をディレクトリに登録する（API を呼ばずに済むように）"""
+        names = await asyncio.to_thread(self._load_names)
+        for name in names:
+            (self.directory.users if name.kind == "user" else self.directory.channels).set(name.id, name.name)
+
+    async def migrate(self, mapping: Dict[str, str],
+                      on_progress: Optional[Callable[[MigrationProgress], Awaitable[None]]] = None,
+                      fetch: bool = True) -> MigrationProgress:
+        """
+        mapping: Slackチャンネル ID → DiscordチャンネルID
+        on_progress: report_interval ごとに進捗を受け取る関数
+        fetch: False の場合は API で取得せず、アーカイブ（エクスポートから取り込んだもの）だけを投稿する
+        """
+        if self._running:
+            raise RuntimeError("移行は既に実行中です")
+        self._running = True
+        self.progress = MigrationProgress(channels={
+            slack_id: ChannelProgress(slack_id, str(discord_id)) for slack_id, discord_id in mapping.items()
+        })
+        log_event(f"移行開始: {len(mapping)}チャンネル" + ("" if fetch else "（アーカイブから）"))
+        semaphore = asyncio.Semaphore(self.concurrency)
+        reporter = asyncio.create_task(self._report(on_progress))
+        try:
+            if not fetch:
+                await self._prime_directory()
+            await asyncio.gather(*(self._migrate_channel(semaphore, progress, fetch)
+                                   for progress in self.progress.channels.values()))
+        finally:
+            reporter.cancel()
+            self._running = False
+        log_event(f"移行終了: {self.progress.describe()}")
+        if on_progress:
+            await on_progress(self.progress)
+        return self.progress
+
+
+def iter_json_array(stream, chunk_size: int = IMPORT_CHUNK_SIZE) -> Iterator:
+    """
+    JSON配列の要素を1つずつ返す
+    ファイル全体を読み込まず、chunk_size ずつ読みながら要素ごとに解析する
+    """
+    decoder = json.JSONDecoder()
+    reader = io.TextIOWrapper(stream, encoding="utf-8-sig")
+    buffer = ""
+    position = 0
+    started = False
+    eof = False
+    while True:
+        # 空白と区切りの "," を読み飛ばす
+        while position < len(buffer) and buffer[position] in " \t\r\n,":
+            position += 1
+        if position >= len(buffer):
+            if eof:
+                if started:
+                    raise ValueError("JSON配列が閉じられていません")
+                return
+            chunk = reader.read(chunk_size)
+            eof = not chunk
+            buffer, position = chunk, 0
+            continue
+        if not started:
+            if buffer[position] != "[":
+                raise ValueError("JSON配列ではありません")
+            started = True
+            position += 1
+            continue
+        if buffer[position] == "]":
+            return
+        try:
+            value, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            # 要素の途中で区切れている場合は続きを読み込む
+            chunk = reader.read(chunk_size)
+            eof = not chunk
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        yield value
+
+
+@dataclass
+class ImportResult:
+    files: int = 0
+    messages: int = 0
+    skipped: int = 0  # 参加・退出などの移行しないメッセージ
+    channels: Dict[str, str] = field(default_factory=dict)  # チャンネル名 -> ID
+    counts: Dict[str, int] = field(default_factory=dict)  # チャンネルID -> 件数
+    elapsed: float = 0.0
+
+    def rate(self) -> float:
+        return self.messages / self.elapsed if self.elapsed > 0 else 0.0
+
+
+class SlackExportImporter:
+    """
+    Slackの標準エクスポート（ZIP）をアーカイブに取り込む
+    ZIPは展開せずにファイルを1つずつ読み、JSONも要素ごとに解析するため、
+    メモリ使用量はエクスポートの大きさによらずバッチ1つ分に収まる
+    取り込んだメッセージは MigrationEngine.migrate(fetch=False) でDiscordへ投稿する
+    """
+
+    CHANNEL_FILES = ("channels.json", "groups.json", "mpims.json", "dms.json")
+
+    def __init__(self, session_factory=SessionLocal, batch_size: int = MIGRATION_IMPORT_BATCH,
+                 transaction_size: int = MIGRATION_IMPORT_TRANSACTION):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.transaction_size = transaction_size
+        if session_factory is SessionLocal:
+            init_db()
+
+    @staticmethod
+    def _folder(info: zipfile.ZipInfo) -> Tuple[str, str]:
+        """(フォルダ名, ファイル名)。ZIPの最上位に1段フォルダがある場合も同じ結果にする"""
+        folder, _, file_name = info.filename.rstrip("/").rpartition("/")
+        return folder.rsplit("/", 1)[-1], file_name
+
+    def _read_directory(self, archive: zipfile.ZipFile, result: ImportResult) -> Tuple[Dict[str, str], List[Dict]]:
+        """チャンネルのフォルダ名 -> ID の対応と、ユーザー名・チャンネル名を読み込む"""
+        folders = {}
+        names = []
+        members = {}
+        for info in archive.infolist():
+            _, file_name = self._folder(info)
+            if file_name in self.CHANNEL_FILES or file_name == "users.json":
+                members[file_name] = info
+        for file_name in self.CHANNEL_FILES:
+            if file_name not in members:
+                continue
+            with archive.open(members[file_name]) as stream:
+                for channel in iter_json_array(stream):
+                    # DMのフォルダ名はID、それ以外はチャンネル名
+                    folders[channel.get("name") or channel["id"]] = channel["id"]
+                    if channel.get("name"):
+                        result.channels[channel["name"]] = channel["id"]
+                        names.append({"kind": "channel", "id": channel["id"], "name": channel["name"]})
+        if "users.json" in members:
+            with archive.open(members["users.json"]) as stream:
+                for user in iter_json_array(stream):
+                    profile = user.get("profile", {})
+                    name = user.get("real_name") or profile.get("real_name") or user.get("name") or user["id"]
+                    names.append({"kind": "user", "id": user["id"], "name": name})
+        return folders, names
+
+    @staticmethod
+    def _insert(session, rows: List[Dict]):
+        session.execute(insert(SlackArchiveMessage.__table__).prefix_with("OR IGNORE"), rows)
+
+    def import_zip(self, path: str) -> ImportResult:
+        """
+        エクスポートを取り込む（同じエクスポートを再度取り込んでも重複しない）
+        transaction_size 件ごとにコミットするため、中断した場合も取り込んだ分は残る
+        """
+        result = ImportResult()
+        started = time.perf_counter()
+        with zipfile.ZipFile(path) as archive, self.session_factory() as session:
+            folders, names = self._read_directory(archive, result)
+            if names:
+                session.execute(insert(SlackArchiveName).prefix_with("OR REPLACE"), names)
+
+            batch = []
+            uncommitted = 0
+            for info in archive.infolist():
+                folder, file_name = self._folder(info)
+                # チャンネルのフォルダ内の日付ごとのファイル（2024-01-31.json）だけを読む
+                if not folder or not DAY_FILE.match(file_name):
+                    continue
+                channel_id = folders.get(folder, folder)
+                with archive.open(info) as stream:
+                    for message in iter_json_array(stream):
+                        row = archive_row(channel_id, message)
+                        if row is None:
+                            result.skipped += 1
+                            continue
+                        batch.append(row)
+                        result.counts[channel_id] = result.counts.get(channel_id, 0) + 1
+                        if len(batch) >= self.batch_size:
+                            self._insert(session, batch)
+                            result.messages += len(batch)
+                            uncommitted += len(batch)
+                            batch = []
+                        if uncommitted >= self.transaction_size:
+                            session.commit()
+                            uncommitted = 0
+                            logging.info(f"エクスポートの取り込み中: {result.messages}件 ({result.files}ファイル)")
+                result.files += 1
+            if batch:
+                self._insert(session, batch)
+                result.messages += len(batch)
+            session.commit()
+        result.elapsed = time.perf_counter() - started
+        log_event(f"エクスポートを取り込みました: {result.messages}件 / {result.files}ファイル "
+                  f"({result.rate():.0f}件/秒)")
+        return result
+
+
+async def migrate_channels(engine: MigrationEngine, slack_channel_ids, discord_channel_id,
+                           on_progress=None, from_archive: bool = False) -> MigrationProgress:
     """
-    SlackチャンネルからDiscordチャンネルへの移行を模擬
+    複数のSlackチャンネルを1つのDiscordチャンネルへ移行する
+    from_archive: True の場合は取り込み済みのエクスポートから投稿する
     """
-    try:
-        log_event(f"移行開始: Slack {slack_channel_ids} → Discord {discord_channel_id}")
-        for slack_channel in slack_channel_ids:
-            log_event(f"移行中: Slack チャンネル {slack_channel} → Discord チャンネル {discord_channel_id}")
-        log_event("移行完了")
-    except Exception as e:
-        log_event(f"移行中エラー: {e}", level="ERROR")
-        raise e
\ No newline at end of file
+    return await engine.migrate({channel_id: str(discord_channel_id) for channel_id in slack_channel_ids},
+                                on_progress=on_progress, fetch=not from_archive)
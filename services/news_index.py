@@ -0,0 +1,247 @@
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import time
+import unicodedata
+from collections import OrderedDict, defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from sqlalchemy import delete, insert, select
+
+from config import NEWS_SEEN_MAX_AGE, NEWS_SEEN_MAX_SIZE, NEWS_DUPLICATE_THRESHOLD, NEWS_MINHASH_PERMUTATIONS, NEWS_MINHASH_BANDS
+from services.database_service import SeenArticle, SessionLocal, init_db
+
+# URLから取り除く計測用パラメータ
+TRACKING_PARAMS = {"fbclid", "gclid", "yclid", "ref", "ref_src", "cmpid", "ncid", "ocid"}
+SHINGLE_SIZE = 3
+# MinHash の置換に使う素数 (2^61 - 1)
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+
+def canonical_url(url: str) -> str:
+    """同じ記事のURLが同じ文字列になるように正規化する"""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMS
+    )
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit(("https", host, path, urlencode(query), ""))
+
+
+def url_hash(url: str) -> str:
+    return hashlib.sha1(canonical_url(url).encode("utf-8")).hexdigest()[:16]
+
+
+def article_key(article: Dict) -> str:
+    """記事の識別子（URLがない場合はタイトルから作る）"""
+    if article.get("url"):
+        return url_hash(article["url"])
+    return "title:" + hashlib.sha1((article.get("title") or "").encode("utf-8")).hexdigest()[:16]
+
+
+def is_real_article(article: Dict) -> bool:
+    """投稿済みとして記録する記事か（URLのない記事・代替表示の記事は記録しない）"""
+    return bool(article.get("url")) and not article.get("placeholder")
+
+
+def shingles(text: str) -> Set[str]:
+    """文字単位の3-gram（日本語・英語のどちらでも使えるよう空白や記号は除く）"""
+    text = unicodedata.normalize("NFKC", text).lower()
+    text = re.sub(r"[\W_]+", "", text)
+    if len(text) <= SHINGLE_SIZE:
+        return {text} if text else set()
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+class MinHasher:
+    """
+    シングル集合の MinHash 署名
+    署名が一致する割合が Jaccard 係数の推定値になる
+    """
+
+    def __init__(self, permutations: int = NEWS_MINHASH_PERMUTATIONS, seed: int = 1):
+        # 固定のシードから係数を作る（再起動後も保存済みの署名と比較できるように）
+        self.coefficients = []
+        for i in range(permutations):
+            digest = hashlib.sha1(f"{seed}:{i}".encode()).digest()
+            a = int.from_bytes(digest[:8], "big") % MERSENNE_PRIME or 1
+            b = int.from_bytes(digest[8:16], "big") % MERSENNE_PRIME
+            self.coefficients.append((a, b))
+
+    def signature(self, items: Iterable[str]) -> Optional[Tuple[int, ...]]:
+        """空の集合の場合は None（似ている記事の判定には使えない）"""
+        hashes = [int.from_bytes(hashlib.blake2b(item.encode("utf-8"), digest_size=4).digest(), "big")
+                  for item in items]
+        if not hashes:
+            return None
+        return tuple(
+            min((a * h + b) % MERSENNE_PRIME for h in hashes) & MAX_HASH
+            for a, b in self.coefficients
+        )
+
+    @staticmethod
+    def similarity(left: Tuple[int, ...], right: Tuple[int, ...]) -> float:
+        return sum(1 for x, y in zip(left, right) if x == y) / len(left)
+
+
+class SeenArticleIndex:
+    """
+    投稿済み記事の索引
+    正規化したURLのハッシュで完全一致を、タイトルと説明の MinHash（LSHで候補を絞る）で
+    別の媒体による同じ記事を検出する。SQLiteに保存し、古い記事から削除する
+    """
+
+    def __init__(self, max_age: float = NEWS_SEEN_MAX_AGE, max_size: int = NEWS_SEEN_MAX_SIZE,
+                 threshold: float = NEWS_DUPLICATE_THRESHOLD, bands: int = NEWS_MINHASH_BANDS):
+        self.max_age = max_age
+        self.max_size = max_size
+        self.threshold = threshold
+        self.hasher = MinHasher()
+        self.bands = bands
+        self.rows = len(self.hasher.coefficients) // bands
+        # url_hash -> (seen_at, 署名)。登録順（= 古い順）
+        self._entries: "OrderedDict[str, Tuple[float, Tuple[int, ...]]]" = OrderedDict()
+        # (バンド番号, バンドの値) -> url_hash の集合
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], Set[str]] = defaultdict(set)
+        self._loaded = False
+        self.duplicates = 0
+        self.near_duplicates = 0
+
+    def _band_keys(self, signature: Optional[Tuple[int, ...]]):
+        if signature is None:
+            return
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows]
+
+    def _article_signature(self, article: Dict) -> Optional[Tuple[int, ...]]:
+        text = f"{article.get('title') or ''} {article.get('description') or ''}"
+        return self.hasher.signature(shingles(text))
+
+    def _remember(self, key: str, seen_at: float, signature: Tuple[int, ...]):
+        self._entries[key] = (seen_at, signature)
+        for band_key in self._band_keys(signature):
+            self._buckets[band_key].add(key)
+
+    def _forget(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for band_key in self._band_keys(entry[1]):
+            bucket = self._buckets.get(band_key)
+            if bucket:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band_key]
+
+    def _evict(self):
+        """期限切れ・上限超過の記事をメモリから削除する（古い順に並んでいる）"""
+        expires = time.time() - self.max_age
+        while self._entries:
+            key, (seen_at, _) = next(iter(self._entries.items()))
+            if seen_at >= expires and len(self._entries) <= self.max_size:
+                break
+            self._forget(key)
+
+    # ---- 永続化 ----
+
+    def _load_rows(self, since: float):
+        init_db()
+        with SessionLocal() as session:
+            rows = session.execute(
+                select(SeenArticle).where(SeenArticle.seen_at >= since)
+                .order_by(SeenArticle.seen_at.desc()).limit(self.max_size)
+            ).scalars().all()
+            return [(row.url_hash, row.seen_at, json.loads(row.signature)) for row in reversed(rows)]
+
+    def _save_rows(self, rows: List[Dict]):
+        with SessionLocal() as session:
+            session.execute(insert(SeenArticle).prefix_with("OR REPLACE"), rows)
+            session.execute(delete(SeenArticle).where(SeenArticle.seen_at < time.time() - self.max_age))
+            session.commit()
+
+    async def load(self):
+        """保存済みの記事を読み込む（初回のみ）"""
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            rows = await asyncio.to_thread(self._load_rows, time.time() - self.max_age)
+            for key, seen_at, signature in rows:
+                self._remember(key, seen_at, tuple(signature) if signature else None)
+            logging.info(f"投稿済みニュースを読み込みました: {len(rows)}件")
+        except Exception as e:
+            logging.error(f"投稿済みニュースの読み込みエラー: {e}")
+
+    # ---- 判定 ----
+
+    def find_duplicate(self, article: Dict, signature: Tuple[int, ...] = None) -> Optional[str]:
+        """投稿済みの同じ記事（または非常に似た記事）の url_hash を返す"""
+        key = article_key(article)
+        if key in self._entries:
+            return key
+        if signature is None:
+            signature = self._article_signature(article)
+            if signature is None:
+                return None
+        candidates = set()
+        for band_key in self._band_keys(signature):
+            candidates |= self._buckets.get(band_key, set())
+        for candidate in candidates:
+            if MinHasher.similarity(signature, self._entries[candidate][1]) >= self.threshold:
+                return candidate
+        return None
+
+    async def filter_new(self, articles: List[Dict], record: bool = True) -> List[Dict]:
+        """
+        投稿済みの記事と、同じ一覧内の重複を取り除く
+        record=True の場合は残った記事（代替表示の記事を除く）を投稿済みとして保存する
+        """
+        await self.load()
+        self._evict()
+        # 同じ一覧内の重複も検出できるよう、一時的に登録しながら判定する
+        added = []
+        result = []
+        now = time.time()
+        for article in articles:
+            if not is_real_article(article):
+                # 代替表示の記事は判定せずにそのまま返す（投稿済みの一覧・類似判定の署名には入れない）
+                result.append(article)
+                continue
+            signature = self._article_signature(article)
+            key = article_key(article)
+            duplicate = self.find_duplicate(article, signature)
+            if duplicate:
+                if duplicate == key:
+                    self.duplicates += 1
+                else:
+                    self.near_duplicates += 1
+                continue
+            self._remember(key, now, signature)
+            added.append({"url_hash": key, "signature": json.dumps(signature), "title": article.get("title") or "",
+                          "seen_at": now})
+            result.append(article)
+
+        if not record:
+            for row in added:
+                self._forget(row["url_hash"])
+        elif added:
+            self._evict()
+            try:
+                await asyncio.to_thread(self._save_rows, added)
+            except Exception as e:
+                logging.error(f"投稿済みニュースの保存エラー: {e}")
+        return result
+
+    def __len__(self):
+        return len(self._entries)
+
+
+seen_articles = SeenArticleIndex()
@@ -1,75 +1,146 @@
 import asyncio
-import aiohttp
+import time
+from dataclasses import dataclass
 from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
 import discord
-from config import NEWS_API_KEY, NEWS_KEYWORDS, DISCORD_NEWS_CHANNEL_ID
+from services.http_client import http_pool
+from services.news_index import seen_articles
+from services.relay_queue import MAX_EMBEDS_PER_MESSAGE, MAX_EMBED_CHARS_PER_MESSAGE
+from utils.metrics import API_CALLS, API_ERRORS
+from config import NEWS_API_KEY, NEWS_KEYWORDS, NEWS_CACHE_TTL
 import logging
 
+
+@dataclass
+class CachedNews:
+    """NewsAPIの応答のキャッシュ（ETag / Last-Modified があれば条件付きリクエストに使う）"""
+    articles: List[Dict]
+    fetched_at: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
 class NewsService:
-    def __init__(self, bot):
-        self.bot = bot
+    """
+    NewsAPIからのニュース取得
+    取得結果は定期投稿と /news で共有し、TTLの間は再取得しない
+    """
+
+    def __init__(self, ttl: float = NEWS_CACHE_TTL):
         self.base_url = "https://newsapi.org/v2"
         self.headers = {"X-Api-Key": NEWS_API_KEY}
-        self.timeout = aiohttp.ClientTimeout(total=10)
+        self.ttl = ttl
+        self._cache: Dict[str, CachedNews] = {}
+        # 同時に呼ばれても取得は1回にする
+        self._lock = asyncio.Lock()
+        self.hits = 0
+        self.misses = 0
 
-    async def fetch_news(self, fallback=False):
-        """ニュース記事を取得"""
-        try:
-            # 日付設定
-            today = datetime.now().strftime("%Y-%m-%d")
-            week_ago = (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d")
-            
-            # APIエンドポイントとパラメータ設定
-            if fallback:
-                endpoint = f"{self.base_url}/everything"
-                params = {
-                    "q": NEWS_KEYWORDS,
-                    "from": week_ago,
-                    "to": today,
-                    "sortBy": "popularity",
-                    "pageSize": 1
-                }
+    @staticmethod
+    def _cache_key(endpoint: str, params: Dict) -> str:
+        return endpoint + "?" + "&".join(f"{key}={params[key]}" for key in sorted(params))
+
+    async def _request(self, endpoint: str, params: Dict, force: bool = False) -> Optional[List[Dict]]:
+        """
+        キャッシュ付きのリクエスト
+        期限切れの場合は条件付きリクエストで更新を確認し、304なら保持している記事を使う
+        取得に失敗した場合は期限切れのキャッシュを返す（キャッシュもなければ None）
+        """
+        key = self._cache_key(endpoint, params)
+        cached = self._cache.get(key)
+        if cached and not force and time.monotonic() - cached.fetched_at < self.ttl:
+            self.hits += 1
+            return cached.articles
+        self.misses += 1
+
+        headers = dict(self.headers)
+        if cached and cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached and cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+
+        method = endpoint.rsplit("/", 1)[-1]
+        API_CALLS.inc(service="newsapi", method=method)
+        async with http_pool.get(endpoint, service="news", headers=headers, params=params) as response:
+            if response.status == 304 and cached:
+                cached.fetched_at = time.monotonic()
+                return cached.articles
+            if response.status == 200:
+                data = await response.json()
+                self._cache[key] = CachedNews(
+                    articles=data.get("articles", []),
+                    fetched_at=time.monotonic(),
+                    etag=response.headers.get("ETag"),
+                    last_modified=response.headers.get("Last-Modified")
+                )
+                return self._cache[key].articles
+
+            API_ERRORS.inc(service="newsapi", method=method)
+            if response.status == 429:
+                logging.error("NewsAPI rate limit exceeded")
             else:
-                endpoint = f"{self.base_url}/top-headlines"
-                params = {
-                    "category": "technology",
-                    "country": "jp",
-                    "pageSize": 5
-                }
-
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
-                async with session.get(endpoint, headers=self.headers, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        articles = data.get("articles", [])
-                        
-                        if not articles and not fallback:
-                            return await self.fetch_news(fallback=True)
-                        
-                        if not articles:
-                            # デフォルトニュースの配列を返す
-                            return [{
-                                "title": "AIと機械学習の最新動向",
-                                "description": "最新のAI技術動向とその応用について解説します。",
-                                "url": "https://github.com/paraccoli",
-                                "urlToImage": "https://i.pinimg.com/736x/71/d7/f0/71d7f0358952998072b0d92de58c8257.jpg",
-                                "source": {"name": "研究室Bot News"},
-                                "publishedAt": datetime.now().isoformat()
-                            }]
-                        
-                        return articles
-
-                    elif response.status == 429:
-                        logging.error("NewsAPI rate limit exceeded")
-                        return self.get_default_articles()
-                    else:
-                        logging.error(f"NewsAPI Error: Status {response.status}")
-                        return [] if fallback else await self.fetch_news(fallback=True)
+                logging.error(f"NewsAPI Error: Status {response.status}")
+            return cached.articles if cached else None
 
+    async def fetch_news(self, fallback=False, force=False):
+        """ニュース記事を取得（キャッシュがあればAPIは呼ばない）"""
+        try:
+            async with self._lock:
+                return await self._fetch_news(fallback, force)
         except Exception as e:
             logging.error(f"ニュース取得エラー: {str(e)}")
             return self.get_default_articles()
 
+    async def _fetch_news(self, fallback, force):
+        # APIエンドポイントとパラメータ設定
+        if fallback:
+            # 日付設定（キャッシュキーが変わらないよう日付単位にする）
+            today = datetime.now().strftime("%Y-%m-%d")
+            week_ago = (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d")
+            endpoint = f"{self.base_url}/everything"
+            params = {
+                "q": " OR ".join(NEWS_KEYWORDS),
+                "from": week_ago,
+                "to": today,
+                "sortBy": "popularity",
+                "pageSize": 1
+            }
+        else:
+            endpoint = f"{self.base_url}/top-headlines"
+            params = {
+                "category": "technology",
+                "country": "jp",
+                "pageSize": 5
+            }
+
+        articles = await self._request(endpoint, params, force)
+        if articles is None:
+            return [] if fallback else await self._fetch_news(True, force)
+
+        if not articles and not fallback:
+            return await self._fetch_news(True, force)
+
+        if not articles:
+            # デフォルトニュースの配列を返す
+            return [{
+                "title": "AIと機械学習の最新動向",
+                "description": "最新のAI技術動向とその応用について解説します。",
+                "url": "https://github.com/paraccoli",
+                "urlToImage": "https://i.pinimg.com/736x/71/d7/f0/71d7f0358952998072b0d92de58c8257.jpg",
+                "source": {"name": "研究室Bot News"},
+                "publishedAt": datetime.now().isoformat(),
+                "placeholder": True
+            }]
+
+        return articles
+
+    async def prefetch(self):
+        """投稿時刻の前に記事を取得しておく"""
+        articles = await self.fetch_news(force=True)
+        logging.info(f"ニュースを事前取得しました: {len(articles)}件")
+        return articles
+
     def get_default_articles(self):
         """デフォルトニュース記事を返す"""
         return [{
@@ -78,55 +149,77 @@ class NewsService:
             "url": "https://github.com/paraccoli",
             "urlToImage": "https://i.pinimg.com/736x/71/d7/f0/71d7f0358952998072b0d92de58c8257.jpg",
             "source": {"name": "研究室Bot News"},
-            "publishedAt": datetime.now().isoformat()
+            "publishedAt": datetime.now().isoformat(),
+            "placeholder": True  # 記事がない場合の代替表示（投稿済みとして記録しない）
         }]
 
     def create_news_embed(self, article):
         """ニュース記事のEmbed作成"""
         try:
             published_at = datetime.fromisoformat(article.get("publishedAt", datetime.now().isoformat()).replace('Z', '+00:00'))
-            
+
             embed = discord.Embed(
-                title=article.get("title", "タイトルなし")[:256],
+                title=(article.get("title") or "タイトルなし")[:256],
                 url=article.get("url", ""),
-                description=article.get("description", "説明なし")[:2048],
+                description=(article.get("description") or "説明なし")[:2048],
                 color=discord.Color.blue(),
                 timestamp=published_at
             )
-            
+
             if article.get("urlToImage"):
                 embed.set_image(url=article["urlToImage"])
-            
+
             embed.add_field(
                 name="出典",
                 value=article.get("source", {}).get("name", "不明"),
                 inline=True
             )
-            
+
             embed.set_footer(text="Tech News Bot")
             return embed
-            
+
         except Exception as e:
             logging.error(f"Embed作成エラー: {str(e)}")
             return None
 
-    async def post_news(self):
-        """定期ニュース投稿用"""
-        channel = self.bot.get_channel(DISCORD_NEWS_CHANNEL_ID)
+    def create_news_embeds(self, articles) -> List[Tuple[Dict, discord.Embed]]:
+        """
+        1回で送信できる範囲（最大10件・合計6000文字）のEmbedを作成
+        Embedを作成できなかった記事は飛ばすため、(記事, Embed) の組で返す
+        """
+        pairs = []
+        total_chars = 0
+        for article in articles:
+            embed = self.create_news_embed(article)
+            if embed is None:
+                continue
+            if len(pairs) == MAX_EMBEDS_PER_MESSAGE or total_chars + len(embed) > MAX_EMBED_CHARS_PER_MESSAGE:
+                break
+            pairs.append((article, embed))
+            total_chars += len(embed)
+        return pairs
+
+    async def post_news(self, channel):
+        """定期ニュース投稿用（事前取得した記事のうち未投稿のものを1回の送信で投稿する）"""
         if not channel:
             return False
 
         try:
             articles = await self.fetch_news()
-            if not articles:
+            articles = await seen_articles.filter_new(articles or [], record=False)
+            pairs = self.create_news_embeds(articles)
+            if not pairs:
+                logging.info("新しいニュースがないため投稿しません")
                 return False
 
-            for article in articles:
-                if embed := self.create_news_embed(article):
-                    await channel.send(embed=embed)
-                    await asyncio.sleep(1)
+            await channel.send(content="🌟 今日のテックニュース", embeds=[embed for _, embed in pairs])
+            # 投稿した記事だけを投稿済みとして記録する
+            await seen_articles.filter_new([article for article, _ in pairs])
             return True
 
         except Exception as e:
             logging.error(f"ニュース投稿エラー: {str(e)}")
-            return False
\ No newline at end of file
+            return False
+
+
+news_service = NewsService()
@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import discord
+
+from config import RELAY_COALESCE_WINDOW, RELAY_QUEUE_MAX_SIZE
+from utils.metrics import RELAY_LATENCY
+
+relay_logger = logging.getLogger("relay")
+
+# Discordの1メッセージあたりの上限
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+
+
+@dataclass
+class RelayItem:
+    embed: discord.Embed
+    slack_channel: Optional[str] = None
+    slack_ts: Optional[str] = None
+    enqueued_at: float = field(default_factory=time.monotonic)
+    received_at: Optional[float] = None  # Slackイベントの受信時刻（time.monotonic）
+
+
+@dataclass
+class RelayStats:
+    sent_messages: int = 0
+    sent_embeds: int = 0
+    errors: int = 0
+    last_flush_latency: float = 0.0
+    max_flush_latency: float = 0.0
+
+
+class RelayQueue:
+    """
+    送信先チャンネルごとの送信キュー
+    短時間に届いたメッセージをまとめて、最大10件のEmbedを1回で送信する
+    まとめたDiscordメッセージは on_sent で含まれるすべてのSlackメッセージに対応付ける
+    （Discord側のリアクションは、まとめたうち最初のSlackメッセージに同期される）
+    """
+
+    def __init__(self, bot, on_sent: Optional[Callable[[discord.Message, List[RelayItem]], Awaitable[None]]] = None,
+                 window: float = RELAY_COALESCE_WINDOW, max_size: int = RELAY_QUEUE_MAX_SIZE):
+        self.bot = bot
+        self.on_sent = on_sent
+        self.window = window
+        self.max_size = max_size
+        self._queues: Dict[int, asyncio.Queue] = {}
+        self._workers: Dict[int, asyncio.Task] = {}
+        self.stats: Dict[int, RelayStats] = {}
+
+    def _get_queue(self, channel_id: int) -> asyncio.Queue:
+        queue = self._queues.get(channel_id)
+        if queue is None:
+            queue = asyncio.Queue(maxsize=self.max_size)
+            self._queues[channel_id] = queue
+            self.stats[channel_id] = RelayStats()
+            self._workers[channel_id] = asyncio.create_task(self._worker(channel_id, queue))
+        return queue
+
+    async def put(self, channel_id: int, embed: discord.Embed, slack_channel: str = None, slack_ts: str = None,
+                  received_at: float = None):
+        """
+        Embedを送信キューに追加する
+        キューが満杯の場合は空きができるまで待機する
+        """
+        queue = self._get_queue(channel_id)
+        if queue.full():
+            logging.warning(f"送信キューが満杯です (channel={channel_id}, size={queue.qsize()})")
+        await queue.put(RelayItem(embed, slack_channel, slack_ts, received_at=received_at))
+
+    def depth(self, channel_id: int = None) -> int:
+        """キューに残っている件数"""
+        if channel_id is not None:
+            queue = self._queues.get(channel_id)
+            return queue.qsize() if queue else 0
+        return sum(queue.qsize() for queue in self._queues.values())
+
+    async def _worker(self, channel_id: int, queue: asyncio.Queue):
+        carry = None
+        while True:
+            first = carry or await queue.get()
+            carry = None
+
+            # 後続のメッセージが届くのを少しだけ待つ
+            if queue.qsize() < MAX_EMBEDS_PER_MESSAGE - 1:
+                await asyncio.sleep(self.window)
+
+            batch = [first]
+            total_chars = len(first.embed)
+            while len(batch) < MAX_EMBEDS_PER_MESSAGE and not queue.empty():
+                item = queue.get_nowait()
+                if total_chars + len(item.embed) > MAX_EMBED_CHARS_PER_MESSAGE:
+                    carry = item
+                    break
+                batch.append(item)
+                total_chars += len(item.embed)
+
+            await self._flush(channel_id, batch)
+            for _ in batch:
+                queue.task_done()
+
+    async def _flush(self, channel_id: int, batch: List[RelayItem]):
+        stats = self.stats[channel_id]
+        try:
+            channel = self.bot.get_channel(channel_id)
+            if channel is None:
+                logging.error(f"Discordチャンネルが見つかりません: {channel_id}")
+                stats.errors += 1
+                return
+
+            sent = await channel.send(embeds=[item.embed for item in batch])
+
+            now = time.monotonic()
+            latency = now - batch[0].enqueued_at
+            for item in batch:
+                RELAY_LATENCY.observe(now - (item.received_at or item.enqueued_at), direction="slack_to_discord")
+            stats.sent_messages += 1
+            stats.sent_embeds += len(batch)
+            stats.last_flush_latency = latency
+            stats.max_flush_latency = max(stats.max_flush_latency, latency)
+            relay_logger.debug("Message sent to Discord successfully (%d embeds, %.2fs)", len(batch), latency)
+
+            if self.on_sent:
+                await self.on_sent(sent, batch)
+        except Exception as e:
+            stats.errors += 1
+            logging.error(f"Discordへの送信エラー: {e}")
+
+    async def close(self):
+        """残っているメッセージを送信してワーカーを停止する"""
+        for queue in self._queues.values():
+            await queue.join()
+        for task in self._workers.values():
+            task.cancel()
+        self._workers.clear()
+        self._queues.clear()
@@ -0,0 +1,245 @@
+import asyncio
+import bisect
+import heapq
+import json
+import logging
+import os
+import uuid
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import discord
+import pytz
+
+from config import SCHEDULE_COMPACT_THRESHOLD, SCHEDULE_REMINDER_HOUR
+
+JST = pytz.timezone('Asia/Tokyo')
+
+
+def normalize_date(day: str) -> str:
+    """日付を YYYY-MM-DD 形式にそろえる（旧形式の "2026-1-5" なども受け付ける。不正な日付は ValueError）"""
+    return datetime.strptime(day, "%Y-%m-%d").date().isoformat()
+
+
+class ScheduleJournal:
+    """
+    研究室スケジュールの保存先
+    変更は JSON Lines 形式のジャーナルに追記し、メモリ上には日付順のインデックスを持つ
+    ジャーナルの行数が一定以上になったら現在の内容だけに書き直す（コンパクション）
+    """
+
+    def __init__(self, journal_path: str, legacy_path: str = None):
+        self.journal_path = journal_path
+        self._events: Dict[str, List[Dict]] = {}
+        self._dates: List[str] = []  # YYYY-MM-DD 形式なので文字列順＝日付順
+        self._journal_lines = 0
+        self.listeners = []  # 予定追加時に呼ばれるコールバック
+
+        if os.path.exists(journal_path):
+            self._replay()
+        elif legacy_path and os.path.exists(legacy_path):
+            self._migrate(legacy_path)
+
+    def _apply(self, record: Dict):
+        # 日付の文字列順＝日付順となるよう、インデックスには正規化した日付だけを入れる
+        day = normalize_date(record["date"])
+        if record["op"] == "add":
+            if day not in self._events:
+                self._events[day] = []
+                bisect.insort(self._dates, day)
+            self._events[day].append(record["event"])
+        elif record["op"] == "delete":
+            if day in self._events:
+                del self._events[day]
+                self._dates.pop(bisect.bisect_left(self._dates, day))
+
+    def _replay(self):
+        with open(self.journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    self._apply(json.loads(line))
+                except (json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+                    # 書き込み途中で終了した行などは読み飛ばす
+                    logging.warning(f"スケジュールジャーナルの不正な行を無視しました: {e}")
+                self._journal_lines += 1
+        self._maybe_compact()
+
+    def _migrate(self, legacy_path: str):
+        """旧形式の schedules.json を取り込む"""
+        with open(legacy_path, 'r', encoding='utf-8') as f:
+            schedules = json.load(f)
+        for day, events in schedules.items():
+            try:
+                day = normalize_date(day)
+            except ValueError:
+                logging.warning(f"不正な日付の予定を移行しませんでした: {day}")
+                continue
+            for event in events:
+                event.setdefault("id", uuid.uuid4().hex)
+                self._apply({"op": "add", "date": day, "event": event})
+        self.compact()
+        os.replace(legacy_path, legacy_path + ".migrated")
+        logging.info(f"スケジュールを移行しました: {len(self._dates)}日分")
+
+    def _append(self, record: Dict):
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._journal_lines += 1
+        self._apply(record)
+        self._maybe_compact()
+
+    def _maybe_compact(self):
+        live = sum(len(events) for events in self._events.values())
+        if self._journal_lines > live * 2 + SCHEDULE_COMPACT_THRESHOLD:
+            self.compact()
+
+    def compact(self):
+        """ジャーナルを現在の予定だけに書き直す"""
+        tmp_path = self.journal_path + ".tmp"
+        lines = 0
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for day in self._dates:
+                for event in self._events[day]:
+                    f.write(json.dumps({"op": "add", "date": day, "event": event}, ensure_ascii=False) + "\n")
+                    lines += 1
+        os.replace(tmp_path, self.journal_path)
+        self._journal_lines = lines
+
+    def add(self, day: str, event: str, category: str, created_by: str) -> Dict:
+        """予定を追加する"""
+        day = normalize_date(day)
+        entry = {
+            "id": uuid.uuid4().hex,
+            "event": event,
+            "category": category,
+            "created_by": created_by,
+            "created_at": datetime.now().isoformat()
+        }
+        self._append({"op": "add", "date": day, "event": entry})
+        for listener in self.listeners:
+            listener(day, entry)
+        return entry
+
+    def delete(self, day: str) -> bool:
+        """指定日の予定を全て削除する"""
+        day = normalize_date(day)
+        if day not in self._events:
+            return False
+        self._append({"op": "delete", "date": day})
+        return True
+
+    def contains(self, day: str, event_id: str) -> bool:
+        return any(event.get("id") == event_id for event in self._events.get(day, ()))
+
+    def get(self, day: str) -> List[Dict]:
+        return list(self._events.get(day, ()))
+
+    def range(self, start: Optional[str] = None, end: Optional[str] = None) -> List[Tuple[str, List[Dict]]]:
+        """start 以上 end 以下の日付の予定を日付順に返す（省略時は制限なし）"""
+        lo = bisect.bisect_left(self._dates, start) if start else 0
+        hi = bisect.bisect_right(self._dates, end) if end else len(self._dates)
+        return [(day, self._events[day]) for day in self._dates[lo:hi]]
+
+    def upcoming(self, days: int = 7) -> List[Tuple[str, List[Dict]]]:
+        """今日から指定日数分の予定"""
+        today = datetime.now(JST).date()
+        return self.range(today.isoformat(), (today + timedelta(days=days - 1)).isoformat())
+
+    def __bool__(self):
+        return bool(self._dates)
+
+
+class ReminderDispatcher:
+    """
+    予定当日の指定時刻にDiscordへリマインドを投稿する
+    通知予定はヒープで管理し、次の通知時刻まで待機する（ファイルの再読み込みやポーリングは行わない）
+    """
+
+    def __init__(self, bot, journal: ScheduleJournal, channel_id: int, hour: int = SCHEDULE_REMINDER_HOUR):
+        self.bot = bot
+        self.journal = journal
+        self.channel_id = channel_id
+        self.hour = hour
+        self._heap: List[Tuple[float, int, str, str]] = []
+        self._seq = 0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        journal.listeners.append(self.schedule)
+
+    def _fire_time(self, day: str) -> float:
+        event_date = date.fromisoformat(day)
+        return JST.localize(datetime.combine(event_date, time(hour=self.hour))).timestamp()
+
+    def schedule(self, day: str, event: Dict):
+        """通知予定を追加する"""
+        try:
+            fire_at = self._fire_time(day)
+        except ValueError as e:
+            # 不正な日付が1件あっても他の予定の通知は続ける
+            logging.error(f"リマインド登録エラー ({day}): {e}")
+            return
+        if fire_at < datetime.now(JST).timestamp():
+            return
+        self._seq += 1
+        heapq.heappush(self._heap, (fire_at, self._seq, day, event["id"]))
+        self._wakeup.set()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """未来の予定を全て登録して通知を開始する"""
+        if self.running:
+            return
+        self._heap.clear()
+        today = datetime.now(JST).date().isoformat()
+        for day, events in self.journal.range(today):
+            for event in events:
+                if "id" in event:
+                    self.schedule(day, event)
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            now = datetime.now(JST).timestamp()
+            due: Dict[str, List[Dict]] = {}
+            while self._heap and self._heap[0][0] <= now:
+                _, _, day, event_id = heapq.heappop(self._heap)
+                # 削除済みの予定は通知しない
+                for event in self.journal.get(day):
+                    if event.get("id") == event_id:
+                        due.setdefault(day, []).append(event)
+
+            for day, events in due.items():
+                await self._post(day, events)
+
+            timeout = self._heap[0][0] - now if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _post(self, day: str, events: List[Dict]):
+        try:
+            channel = self.bot.get_channel(self.channel_id)
+            if not channel:
+                logging.error(f"リマインド用チャンネルが見つかりません: {self.channel_id}")
+                return
+            embed = discord.Embed(
+                title=f"⏰ 本日の予定 ({day})",
+                description="\n".join(f"• [{e['category']}] {e['event']}" for e in events),
+                color=discord.Color.orange()
+            )
+            await channel.send(embed=embed)
+            logging.info(f"予定のリマインドを送信しました: {day} ({len(events)}件)")
+        except Exception as e:
+            logging.error(f"リマインド送信エラー: {e}")
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
@@ -0,0 +1,15 @@
+from slack_sdk.web.async_client import AsyncWebClient
+
+from utils.metrics import API_CALLS, API_ERRORS
+
+
+class InstrumentedWebClient(AsyncWebClient):
+    """API呼び出し回数・エラー数をメトリクスに記録する Slack Web API クライアント"""
+
+    async def api_call(self, api_method: str, **kwargs):
+        API_CALLS.inc(service="slack", method=api_method)
+        try:
+            return await super().api_call(api_method, **kwargs)
+        except Exception:
+            API_ERRORS.inc(service="slack", method=api_method)
+            raise
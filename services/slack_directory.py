@@ -0,0 +1,183 @@
+import time
+import logging
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from config import SLACK_DIRECTORY_TTL, SLACK_DIRECTORY_MAX_SIZE
+from utils.emoji_mapper import emoji_index
+from utils.markdown_converter import Mention, render, slack_to_discord_parts
+
+
+class TTLCache:
+    """TTLとLRUによる追い出しを行う単純なキャッシュ"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[str]:
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: str):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key: str):
+        self._data.pop(key, None)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SlackDirectory:
+    """
+    Slackのユーザー名・チャンネル名のキャッシュ
+    起動時に users.list / conversations.list で一括取得し、
+    user_change / channel_rename イベントで更新する
+    カスタム絵文字も emoji.list / emoji_changed で同様に管理する
+    """
+
+    def __init__(self, slack_client, ttl: float = SLACK_DIRECTORY_TTL,
+                 max_size: int = SLACK_DIRECTORY_MAX_SIZE):
+        self.slack_client = slack_client
+        self.users = TTLCache(max_size, ttl)
+        self.channels = TTLCache(max_size, ttl)
+        self.bot_user_id: Optional[str] = None
+
+    @staticmethod
+    def _user_name(user: Dict) -> str:
+        profile = user.get("profile", {})
+        return user.get("real_name") or profile.get("real_name") or user.get("name", user.get("id", ""))
+
+    async def warm_up(self):
+        """ユーザーとチャンネルを一括で読み込む"""
+        try:
+            auth_response = await self.slack_client.auth_test()
+            self.bot_user_id = auth_response["user_id"]
+
+            cursor = None
+            while True:
+                response = await self.slack_client.users_list(cursor=cursor, limit=200)
+                for user in response.get("members", []):
+                    self.users.set(user["id"], self._user_name(user))
+                cursor = response.get("response_metadata", {}).get("next_cursor")
+                if not cursor:
+                    break
+
+            cursor = None
+            while True:
+                response = await self.slack_client.conversations_list(
+                    cursor=cursor,
+                    limit=200,
+                    types="public_channel,private_channel",
+                    exclude_archived=True
+                )
+                for channel in response.get("channels", []):
+                    self.channels.set(channel["id"], channel["name"])
+                cursor = response.get("response_metadata", {}).get("next_cursor")
+                if not cursor:
+                    break
+
+            logging.info(f"Slackディレクトリを読み込みました: ユーザー {len(self.users)}件, チャンネル {len(self.channels)}件")
+        except Exception as e:
+            logging.error(f"Slackディレクトリの読み込みエラー: {e}")
+
+        await self.load_custom_emoji()
+
+    async def load_custom_emoji(self):
+        """ワークスペースのカスタム絵文字を読み込む"""
+        try:
+            response = await self.slack_client.emoji_list()
+            emoji_index.set_slack_custom(response.get("emoji", {}))
+            logging.info(f"Slackのカスタム絵文字を読み込みました: {len(response.get('emoji', {}))}件")
+        except Exception as e:
+            logging.error(f"カスタム絵文字の読み込みエラー: {e}")
+
+    async def get_bot_user_id(self) -> str:
+        if self.bot_user_id is None:
+            auth_response = await self.slack_client.auth_test()
+            self.bot_user_id = auth_response["user_id"]
+        return self.bot_user_id
+
+    async def get_user_name(self, user_id: str) -> str:
+        name = self.users.get(user_id)
+        if name is None:
+            user_info = await self.slack_client.users_info(user=user_id)
+            name = self._user_name(user_info["user"])
+            self.users.set(user_id, name)
+        return name
+
+    async def get_channel_name(self, channel_id: str) -> str:
+        name = self.channels.get(channel_id)
+        if name is None:
+            channel_info = await self.slack_client.conversations_info(channel=channel_id)
+            name = channel_info["channel"]["name"]
+            self.channels.set(channel_id, name)
+        return name
+
+    async def to_discord_markdown(self, text: str) -> str:
+        """
+        Slackの本文をDiscord形式に変換する
+        キャッシュにないユーザー・チャンネルだけを先に取得してから名前に置き換える
+        """
+        parts = slack_to_discord_parts(text)
+        for mention in {part for part in parts if isinstance(part, Mention)}:
+            try:
+                if mention.kind == "user":
+                    await self.get_user_name(mention.id)
+                elif not mention.label:
+                    await self.get_channel_name(mention.id)
+            except Exception as e:
+                logging.error(f"メンションの解決エラー ({mention.id}): {e}")
+        return render(parts, self.users.get, self.channels.get)
+
+    def handle_event(self, event: Dict) -> bool:
+        """
+        ディレクトリに関係するイベントを反映する
+        処理した場合は True を返す
+        """
+        event_type = event.get("type")
+        if event_type in ("user_change", "team_join"):
+            user = event.get("user", {})
+            if user.get("id"):
+                self.users.set(user["id"], self._user_name(user))
+            return True
+        if event_type in ("channel_rename", "channel_created", "group_rename"):
+            channel = event.get("channel", {})
+            if channel.get("id") and channel.get("name"):
+                self.channels.set(channel["id"], channel["name"])
+            return True
+        if event_type in ("channel_deleted", "group_deleted"):
+            channel_id = event.get("channel")
+            if isinstance(channel_id, str):
+                self.channels.invalidate(channel_id)
+            return True
+        if event_type == "emoji_changed":
+            subtype = event.get("subtype")
+            if subtype == "add":
+                emoji_index.update_slack_custom(added={event["name"]: event.get("value", "")})
+            elif subtype == "remove":
+                emoji_index.update_slack_custom(removed=event.get("names", []))
+            elif subtype == "rename":
+                emoji_index.update_slack_custom(
+                    added={event["new_name"]: event.get("value", "")},
+                    removed=[event["old_name"]]
+                )
+            return True
+        return False
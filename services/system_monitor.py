@@ -0,0 +1,111 @@
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import psutil
+
+from config import SYSTEM_SAMPLE_INTERVAL, SYSTEM_HISTORY_SECONDS
+
+
+@dataclass
+class SystemSample:
+    """1回分の計測結果（レートは直前の計測との差分から計算）"""
+    timestamp: float
+    cpu_percent: float  # システム全体
+    process_cpu_percent: float  # Botプロセス
+    memory_percent: float
+    rss: int  # Botプロセスの使用メモリ (bytes)
+    rss_delta: int  # 直前の計測からの増減 (bytes)
+    disk_percent: float
+    cpu_freq: float  # MHz
+    net_sent: int  # 起動時からの累計 (bytes)
+    net_recv: int
+    net_sent_rate: float  # bytes/s
+    net_recv_rate: float
+
+
+@dataclass
+class Summary:
+    minimum: float
+    average: float
+    maximum: float
+
+
+class SystemMonitor:
+    """
+    一定間隔でシステム情報を計測し、リングバッファに保持する（計測はスケジューラーから呼び出す）
+    ステータス表示や /stats は計測済みの値を参照するだけで psutil を呼ばない
+    """
+
+    def __init__(self, interval: float = SYSTEM_SAMPLE_INTERVAL, history_seconds: float = SYSTEM_HISTORY_SECONDS):
+        self.interval = interval
+        self.samples = deque(maxlen=max(1, int(history_seconds // interval)))
+        # cpu_percent() は同じ Process オブジェクトで前回呼び出しからの値を返す
+        self._process = psutil.Process()
+        self._process.cpu_percent()
+        psutil.cpu_percent()
+
+    def sample(self) -> SystemSample:
+        """計測してバッファに追加する"""
+        now = time.time()
+        net = psutil.net_io_counters()
+        rss = self._process.memory_info().rss
+        freq = psutil.cpu_freq()
+        previous = self.samples[-1] if self.samples else None
+
+        if previous:
+            elapsed = max(now - previous.timestamp, 1e-6)
+            sent_rate = (net.bytes_sent - previous.net_sent) / elapsed
+            recv_rate = (net.bytes_recv - previous.net_recv) / elapsed
+            rss_delta = rss - previous.rss
+        else:
+            sent_rate = recv_rate = 0.0
+            rss_delta = 0
+
+        current = SystemSample(
+            timestamp=now,
+            cpu_percent=psutil.cpu_percent(),
+            process_cpu_percent=self._process.cpu_percent(),
+            memory_percent=psutil.virtual_memory().percent,
+            rss=rss,
+            rss_delta=rss_delta,
+            disk_percent=psutil.disk_usage('/').percent,
+            cpu_freq=freq.current if freq else 0.0,
+            net_sent=net.bytes_sent,
+            net_recv=net.bytes_recv,
+            net_sent_rate=max(sent_rate, 0.0),
+            net_recv_rate=max(recv_rate, 0.0)
+        )
+        self.samples.append(current)
+        return current
+
+    def latest(self) -> Optional[SystemSample]:
+        return self.samples[-1] if self.samples else None
+
+    def window(self, seconds: float) -> List[SystemSample]:
+        """直近 seconds 秒間の計測結果"""
+        since = time.time() - seconds
+        result = []
+        for sample in reversed(self.samples):
+            if sample.timestamp < since:
+                break
+            result.append(sample)
+        result.reverse()
+        return result
+
+    def summarize(self, field: str, seconds: float) -> Optional[Summary]:
+        """直近 seconds 秒間の最小・平均・最大"""
+        values = [getattr(sample, field) for sample in self.window(seconds)]
+        if not values:
+            return None
+        return Summary(min(values), sum(values) / len(values), max(values))
+
+    def summaries(self, seconds: float) -> Dict[str, Optional[Summary]]:
+        return {
+            field: self.summarize(field, seconds)
+            for field in ("cpu_percent", "process_cpu_percent", "rss", "net_sent_rate", "net_recv_rate")
+        }
+
+
+system_monitor = SystemMonitor()
@@ -0,0 +1,68 @@
+import json
+import logging
+import time
+from typing import Dict, Optional
+
+from config import TRAFFIC_RECORD_FILE
+
+# 記録するゲートウェイのイベント（Botの処理に関係するもの）
+RECORDED_GATEWAY_EVENTS = {
+    "MESSAGE_CREATE",
+    "MESSAGE_REACTION_ADD",
+    "MESSAGE_REACTION_REMOVE",
+    "GUILD_EMOJIS_UPDATE",
+}
+
+
+class TrafficRecorder:
+    """
+    受信したイベントを JSON Lines で記録する（benchmarks.relay_replay で再生する）
+    Slack は Socket Mode のエンベロープ、Discord はゲートウェイの DISPATCH イベントを記録する
+    path が None の場合は何もしない
+    """
+
+    def __init__(self, path: Optional[str] = None, flush_interval: float = 1.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.records = 0
+        self._file = None
+        self._last_flush = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    def record(self, source: str, event_type: str, payload: Dict, envelope_id: Optional[str] = None):
+        if not self.enabled:
+            return
+        try:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+            line = {"time": time.time(), "source": source, "type": event_type, "payload": payload}
+            if envelope_id:
+                line["envelope_id"] = envelope_id
+            self._file.write(json.dumps(line, ensure_ascii=False) + "\n")
+            self.records += 1
+            # 書き込みはバッファし、一定間隔でまとめてディスクに書き出す
+            now = time.monotonic()
+            if now - self._last_flush >= self.flush_interval:
+                self._file.flush()
+                self._last_flush = now
+        except Exception as e:
+            logging.error(f"イベントの記録エラー: {e}")
+
+    def record_gateway(self, message):
+        """ゲートウェイから受信した生のメッセージのうち、対象のイベントだけを記録する"""
+        if not self.enabled:
+            return
+        data = json.loads(message) if isinstance(message, (str, bytes)) else message
+        if data.get("op") == 0 and data.get("t") in RECORDED_GATEWAY_EVENTS:
+            self.record("discord", data["t"], data["d"])
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+traffic_recorder = TrafficRecorder(TRAFFIC_RECORD_FILE)
@@ -0,0 +1,27 @@
+import pytest
+
+from utils.markdown_converter import discord_to_slack, slack_to_discord
+
+# (Discord, Slack, Slack から戻した Discord)
+ROUND_TRIP_CASES = [
+    ("**太字**", "*太字*", "**太字**"),
+    ("*斜体*", "_斜体_", "_斜体_"),
+    ("***太字斜体***", "*_太字斜体_*", "**_太字斜体_**"),
+    ("~~取り消し~~", "~取り消し~", "~~取り消し~~"),
+    ("`a < b`", "`a &lt; b`", "`a < b`"),
+]
+
+
+@pytest.mark.parametrize("discord_text, slack_text, back_text", ROUND_TRIP_CASES)
+def test_round_trip(discord_text, slack_text, back_text):
+    assert discord_to_slack(discord_text) == slack_text
+    assert slack_to_discord(slack_text) == back_text
+
+
+def test_timestamp():
+    assert discord_to_slack("<t:0:R>").startswith("<!date^0^")
+
+
+def test_timestamp_out_of_range():
+    # 変換できない時刻は元の表記のまま残す
+    assert discord_to_slack("<t:999999999999999:R>") == "&lt;t:999999999999999:R&gt;"
@@ -0,0 +1,65 @@
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+
+class DedupWindow:
+    """
+    一定時間内に処理したキーを記録し、重複を検出する
+    挿入順（＝期限順）に並んだ OrderedDict の先頭から期限切れを削除するため、
+    削除コストは償却 O(1)。件数が max_size を超えた場合も古い順に削除する
+    """
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, float]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _expire(self, now: float):
+        entries = self._entries
+        while entries:
+            key, expires_at = next(iter(entries.items()))
+            if expires_at > now:
+                break
+            entries.popitem(last=False)
+
+    def seen(self, *keys: Optional[Hashable]) -> bool:
+        """
+        いずれかのキーが期間内に記録済みなら True を返す
+        未記録なら全てのキーを記録して False を返す（None は無視）
+        """
+        now = time.monotonic()
+        self._expire(now)
+
+        keys = [key for key in keys if key is not None]
+        if any(key in self._entries for key in keys):
+            self.hits += 1
+            return True
+
+        self.misses += 1
+        expires_at = now + self.ttl
+        for key in keys:
+            self._entries[key] = expires_at
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return False
+
+    def check(self, *keys: Optional[Hashable]) -> bool:
+        """
+        いずれかのキーが期間内に記録済みなら True を返す（記録はしない）
+        記録済みの場合はヒットとして数える。未記録の場合は後で seen() を呼ぶとミスとして数えられる
+        """
+        self._expire(time.monotonic())
+        if any(key is not None and key in self._entries for key in keys):
+            self.hits += 1
+            return True
+        return False
+
+    def __contains__(self, key: Hashable) -> bool:
+        self._expire(time.monotonic())
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
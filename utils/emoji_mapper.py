@@ -1,42 +1,178 @@
-from typing import Dict, Optional
-
-class EmojiMapper:
-    # SlackとDiscordの基本的な絵文字マッピング
-    EMOJI_MAP: Dict[str, str] = {
-        # 基本的な絵文字
-        ":smile:": "😊",
-        ":laughing:": "😄",
-        ":thumbsup:": "👍",
-        ":thumbsdown:": "👎",
-        ":heart:": "❤️",
-        ":warning:": "⚠️",
-        ":anger:": "💢",
-        ":star:": "⭐",
-        ":question:": "❓",
-        ":exclamation:": "❗",
-        ":ok:": "🆗",
-        ":pray:": "🙏",
-        ":clap:": "👏",
-        ":fire:": "🔥",
-        ":eyes:": "👀",
-        # 研究室向けカスタム絵文字
-        ":paper:": "📄",
-        ":book:": "📚",
-        ":computer:": "💻",
-        ":bulb:": "💡",
-        ":calendar:": "📅",
-        ":clock:": "⏰",
-    }
-
-    @classmethod
-    def slack_to_discord(cls, slack_emoji: str) -> Optional[str]:
-        """Slack形式の絵文字をDiscord形式に変換"""
-        return cls.EMOJI_MAP.get(slack_emoji)
-
-    @classmethod
-    def discord_to_slack(cls, discord_emoji: str) -> Optional[str]:
-        """Discord形式の絵文字をSlack形式に変換"""
-        for slack, discord in cls.EMOJI_MAP.items():
-            if discord == discord_emoji:
-                return slack
-        return None
\ No newline at end of file
+import re
+from typing import Dict, Iterable, Optional, Tuple
+
+import emoji
+
+# Slackのスキントーン指定（skin-tone-2〜6）とUnicodeの修飾子の対応
+SKIN_TONES: Dict[str, str] = {
+    "2": "\U0001F3FB",
+    "3": "\U0001F3FC",
+    "4": "\U0001F3FD",
+    "5": "\U0001F3FE",
+    "6": "\U0001F3FF",
+}
+SKIN_TONE_NUMBERS: Dict[str, str] = {modifier: number for number, modifier in SKIN_TONES.items()}
+VARIATION_SELECTOR = "\uFE0F"
+
+# 研究室向けの追加エントリ（標準の絵文字名にない場合のみ使う）
+EXTRA_EMOJI: Dict[str, str] = {
+    "paper": "📄",
+    "clock": "⏰",
+}
+
+# 本文中の :shortcode: と :shortcode::skin-tone-N:
+SHORTCODE_PATTERN = re.compile(r":([a-z0-9_+'\-]+):(?::skin-tone-([2-6]):)?")
+# Discordのカスタム絵文字 <:name:id> / <a:name:id>
+DISCORD_CUSTOM_PATTERN = re.compile(r"<a?:(\w+):(\d+)>")
+
+
+def _strip_name(name: str) -> str:
+    return name.strip(":").lower()
+
+
+def _normalize(unicode_emoji: str) -> Tuple[str, Optional[str]]:
+    """異体字セレクタとスキントーン修飾子を取り除き、(基本形, トーン番号) を返す"""
+    tone = None
+    chars = []
+    for char in unicode_emoji:
+        if char == VARIATION_SELECTOR:
+            continue
+        if char in SKIN_TONE_NUMBERS:
+            tone = tone or SKIN_TONE_NUMBERS[char]
+            continue
+        chars.append(char)
+    return "".join(chars), tone
+
+
+class EmojiIndex:
+    """
+    Slackの絵文字名とUnicode絵文字の双方向の対応表
+    起動時に全データから辞書を作っておき、変換は辞書の参照だけで行う
+    ワークスペースのカスタム絵文字は Slack / Discord それぞれ名前で対応付ける
+    """
+
+    def __init__(self, emoji_data: Optional[Dict[str, Dict]] = None, extra: Dict[str, str] = EXTRA_EMOJI):
+        # 絵文字名 -> Unicode
+        self._to_unicode: Dict[str, str] = {}
+        # Unicode（データ上の表記と正規化した表記の両方） -> Slackの絵文字名
+        self._to_name: Dict[str, str] = {}
+        # Slackのカスタム絵文字名（エイリアスは解決済みの名前）
+        self._slack_custom: Dict[str, str] = {}
+        # Discordのカスタム絵文字名 -> "<:name:id>"
+        self._discord_custom: Dict[str, str] = {}
+        self._build(emoji.EMOJI_DATA if emoji_data is None else emoji_data, extra)
+
+    def _build(self, emoji_data: Dict[str, Dict], extra: Dict[str, str]):
+        for unicode_emoji, data in emoji_data.items():
+            aliases = [_strip_name(alias) for alias in data.get("alias", [])]
+            names = aliases + [_strip_name(data["en"])]
+            for name in names:
+                # 完全修飾形（FE0F付き）を優先して登録する
+                current = self._to_unicode.get(name)
+                if current is None or len(unicode_emoji) > len(current):
+                    self._to_unicode[name] = unicode_emoji
+            # Slackの名前はエイリアス（:thumbsup: など）を優先する
+            base, tone = _normalize(unicode_emoji)
+            if tone is None:
+                self._to_name.setdefault(base, names[0])
+                self._to_name.setdefault(unicode_emoji, names[0])
+        for name, unicode_emoji in extra.items():
+            self._to_unicode.setdefault(name, unicode_emoji)
+            self._to_name.setdefault(_normalize(unicode_emoji)[0], name)
+            self._to_name.setdefault(unicode_emoji, name)
+        # スキントーン付きの絵文字は基本形の名前 + skin-tone-N で表す
+        for unicode_emoji in emoji_data:
+            base, tone = _normalize(unicode_emoji)
+            if tone and base in self._to_name:
+                self._to_name.setdefault(unicode_emoji, f"{self._to_name[base]}::skin-tone-{tone}")
+
+    def __len__(self):
+        return len(self._to_unicode)
+
+    # ---- カスタム絵文字 ----
+
+    def set_slack_custom(self, emoji_list: Dict[str, str]):
+        """emoji.list の結果（名前 -> 画像URL または "alias:名前"）を登録する"""
+        self._slack_custom = {}
+        self.update_slack_custom(emoji_list)
+
+    def update_slack_custom(self, added: Dict[str, str] = None, removed: Iterable[str] = ()):
+        """emoji_changed イベントの内容を反映する"""
+        for name in removed:
+            self._slack_custom.pop(name, None)
+        for name, value in (added or {}).items():
+            # エイリアスは参照先の名前で登録する（標準絵文字へのエイリアスはUnicodeに変換される）
+            self._slack_custom[name] = value[len("alias:"):] if value.startswith("alias:") else name
+
+    def set_discord_custom(self, emojis: Iterable):
+        """Discordサーバーのカスタム絵文字（discord.Emoji）を登録する"""
+        self._discord_custom = {e.name: str(e) for e in emojis}
+
+    # ---- リアクション ----
+
+    def slack_to_discord(self, slack_emoji: str) -> Optional[str]:
+        """
+        Slackの絵文字名（"thumbsup", ":+1::skin-tone-2:" など）をDiscordのリアクションに変換
+        変換できない場合は None
+        """
+        unicode_emoji = self._to_unicode.get(slack_emoji)
+        if unicode_emoji is not None:
+            return unicode_emoji
+        name, _, tone = _strip_name(slack_emoji).partition("::")
+        name = self._slack_custom.get(name, name)
+        unicode_emoji = self._to_unicode.get(name)
+        if unicode_emoji is None:
+            return self._discord_custom.get(name)
+        tone = tone.strip(":").replace("skin-tone-", "")
+        if tone in SKIN_TONES:
+            unicode_emoji = unicode_emoji.replace(VARIATION_SELECTOR, "") + SKIN_TONES[tone]
+        return unicode_emoji
+
+    def discord_to_slack(self, discord_emoji: str) -> Optional[str]:
+        """
+        Discordのリアクション（Unicode または "<:name:id>"）をSlackの絵文字名に変換
+        スキントーン付きの場合は "name::skin-tone-N" を返す
+        """
+        name = self._to_name.get(discord_emoji)
+        if name is not None:
+            return name
+        if discord_emoji.startswith("<"):
+            match = DISCORD_CUSTOM_PATTERN.fullmatch(discord_emoji)
+            if match and (match.group(1) in self._slack_custom or match.group(1) in self._to_unicode):
+                return match.group(1)
+            return None
+        # データにない表記（異体字セレクタの有無など）は正規化して探す
+        base, tone = _normalize(discord_emoji)
+        name = self._to_name.get(base)
+        if name is None:
+            return None
+        return f"{name}::skin-tone-{tone}" if tone else name
+
+    # ---- 本文中の変換 ----
+
+    def shortcode_to_discord(self, name: str, tone: Optional[str] = None) -> Optional[str]:
+        """本文中の :name: をDiscordの表記に変換（変換できない場合は None）"""
+        unicode_emoji = self._to_unicode.get(self._slack_custom.get(name, name))
+        if unicode_emoji is None:
+            return self._discord_custom.get(name)
+        if tone:
+            unicode_emoji = unicode_emoji.replace(VARIATION_SELECTOR, "") + SKIN_TONES[tone]
+        return unicode_emoji
+
+    def _replace_shortcode(self, match: re.Match) -> str:
+        return self.shortcode_to_discord(match.group(1), match.group(2)) or match.group(0)
+
+    def slack_text_to_discord(self, text: str) -> str:
+        """Slackの本文中の :shortcode: を1回の走査でUnicode絵文字に置き換える"""
+        if not text or ":" not in text:
+            return text
+        return SHORTCODE_PATTERN.sub(self._replace_shortcode, text)
+
+    def discord_text_to_slack(self, text: str) -> str:
+        """Discordの本文中のカスタム絵文字 <:name:id> を :name: に置き換える"""
+        if not text or "<" not in text:
+            return text
+        return DISCORD_CUSTOM_PATTERN.sub(lambda match: f":{match.group(1)}:", text)
+
+
+emoji_index = EmojiIndex()
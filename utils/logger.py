@@ -1,11 +1,147 @@
+import atexit
+import copy
+import gzip
+import itertools
+import json
 import logging
+import os
+import queue
+import shutil
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
-logging.basicConfig(
-    filename="logs.txt",
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
+from config import (
+    LOG_FILE,
+    LOG_FORMAT,
+    LOG_LEVEL,
+    LOG_FILE_LEVEL,
+    LOG_MAX_BYTES,
+    LOG_BACKUP_COUNT,
+    LOG_ROTATE_INTERVAL,
+    LOG_SAMPLED_LOGGERS,
+    LOG_DEBUG_SAMPLE_RATE,
+    LOG_LIBRARY_LEVEL
 )
 
+# ログファイルの文字コード（/log での読み込みにも使用）
+LOG_ENCODING = "utf-8"
+
+
+class CompressedRotatingFileHandler(RotatingFileHandler):
+    """
+    サイズまたは経過時間でローテーションし、古いログを gzip 圧縮して保存する
+    """
+
+    def __init__(self, filename, max_bytes, backup_count, interval, encoding=LOG_ENCODING):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding=encoding)
+        self.interval = interval
+        self.rollover_at = time.time() + interval
+        self.namer = lambda name: name + ".gz"
+        self.rotator = self._compress
+
+    @staticmethod
+    def _compress(source, dest):
+        with open(source, "rb") as f_in, gzip.open(dest, "wb") as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.remove(source)
+
+    def shouldRollover(self, record):
+        if time.time() >= self.rollover_at:
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        self.rollover_at = time.time() + self.interval
+
+
+class JsonFormatter(logging.Formatter):
+    """1レコードを1行のJSONとして出力する"""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class SnapshotQueueHandler(QueueHandler):
+    """
+    呼び出し時点のメッセージを確定させてからログレコードをキューに渡す
+    引数はあとで変更される可能性があるため、メッセージの % 展開はキューに積む前に行う
+    例外のトレースバックの整形と書き込みはバックグラウンドスレッドで行う
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class DebugSamplingFilter(logging.Filter):
+    """指定したロガーのDEBUGレコードを rate 件に1件だけ通す"""
+
+    def __init__(self, logger_names, rate):
+        super().__init__()
+        self.logger_names = set(logger_names)
+        self.rate = max(1, rate)
+        self._counter = itertools.count()
+
+    def filter(self, record):
+        if record.levelno != logging.DEBUG or record.name not in self.logger_names:
+            return True
+        return next(self._counter) % self.rate == 0
+
+
+_listener = None
+
+def setup_logging():
+    """
+    ログ出力を初期化する（複数回呼んでも1度だけ実行）。起動時にエントリポイントから呼び出す
+    呼び出し元はキューに積むだけで、ファイル・コンソールへの書き込みは別スレッドで行う
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    file_handler = CompressedRotatingFileHandler(LOG_FILE, LOG_MAX_BYTES, LOG_BACKUP_COUNT, LOG_ROTATE_INTERVAL)
+    file_handler.setLevel(LOG_FILE_LEVEL)
+    file_handler.setFormatter(JsonFormatter())
+
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = SnapshotQueueHandler(log_queue)
+    queue_handler.addFilter(DebugSamplingFilter(LOG_SAMPLED_LOGGERS, LOG_DEBUG_SAMPLE_RATE))
+
+    root = logging.getLogger()
+    root.setLevel(LOG_LEVEL)
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+
+    # ライブラリの詳細ログは出力しない
+    for name in ("discord", "slack_sdk", "aiohttp", "asyncio", "sqlalchemy"):
+        logging.getLogger(name).setLevel(LOG_LIBRARY_LEVEL)
+
+    _listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+def stop_logging():
+    """キューに残っているログを書き出してから停止する"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
 def log_event(event, level="INFO"):
     if level == "INFO":
         logging.info(event)
@@ -14,4 +150,34 @@ def log_event(event, level="INFO"):
     elif level == "ERROR":
         logging.error(event)
     elif level == "CRITICAL":
-        logging.critical(event)
\ No newline at end of file
+        logging.critical(event)
+
+def tail_log(lines=10, path=LOG_FILE, block_size=4096):
+    """
+    ログファイルの末尾から指定行数を読み込む
+    ファイル末尾から逆方向にブロック単位で読むため、ファイルサイズに関係なく一定時間で終わる
+    """
+    if not os.path.exists(path):
+        return []
+
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b""
+        # 最終行の改行を除いて lines 個の改行が見つかるまで読む
+        while position > 0 and data.count(b"\n") <= lines:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            data = f.read(read_size) + data
+
+    text = data.decode(LOG_ENCODING, errors="replace")
+    return text.splitlines()[-lines:]
+
+def format_log_line(line):
+    """JSON形式のログ行を読みやすい形式に変換する"""
+    try:
+        entry = json.loads(line)
+        return f"{entry['time']} - {entry['level']} - {entry['message']}"
+    except (ValueError, KeyError, TypeError):
+        return line
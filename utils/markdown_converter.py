@@ -0,0 +1,227 @@
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, List, Optional, Union
+
+from utils.emoji_mapper import emoji_index
+
+# ID -> 表示名（キャッシュにない場合は None）
+Resolver = Callable[[str], Optional[str]]
+
+
+@dataclass(frozen=True)
+class Mention:
+    """変換結果に含まれる未解決のメンション"""
+    kind: str  # "user" / "channel"
+    id: str
+    label: Optional[str] = None
+
+
+Part = Union[str, Mention]
+
+# Slack mrkdwn の字句。1つの正規表現で先頭から1回だけ走査する
+SLACK_TOKENS = re.compile(r"""
+    (?=[`<*~:&])  # 字句の先頭になりうる文字以外はすぐに読み飛ばす
+    (?:
+      (?P<code_block>```.*?```)
+    | (?P<code>`[^`\n]+`)
+    | <(?P<angle>[^<>\n]+)>
+    | (?<![\w*])\*(?P<bold>(?=\S)[^*\n]+?(?<=\S))\*(?![\w*])
+    | (?<![\w~])~(?P<strike>(?=\S)[^~\n]+?(?<=\S))~(?![\w~])
+    | :(?P<emoji>[a-z0-9_+'\-]+):(?::skin-tone-(?P<tone>[2-6]):)?
+    | &(?P<entity>amp|lt|gt);
+    )
+""", re.VERBOSE | re.DOTALL)
+
+# Discord markdown の字句
+DISCORD_TOKENS = re.compile(r"""
+    (?=[`<\[*_~\#>&])
+    (?:
+      (?P<code_block>```.*?```)
+    | (?P<code>`[^`\n]+`)
+    | <a?:(?P<emoji>\w+):\d+>
+    | <@!?(?P<user>\d+)>
+    | <@&(?P<role>\d+)>
+    | <\#(?P<channel>\d+)>
+    | <t:(?P<timestamp>-?\d+)(?::[tTdDfFR])?>
+    | <(?P<url>https?://[^\s<>]+)>
+    | \[(?P<label>[^\]\n]+)\]\((?P<link>https?://[^\s)]+)\)
+    | \*\*\*(?P<bold_italic>.+?)\*\*\*
+    | \*\*(?P<bold>.+?)\*\*
+    | __(?P<underline>.+?)__
+    | ~~(?P<strike>.+?)~~
+    | (?<![\w*])\*(?P<italic>(?=\S)[^*\n]+?(?<=\S))\*(?![\w*])
+    | ^(?P<heading>\#{1,3})[ ](?P<heading_text>[^\n]+)
+    | ^(?P<quote>>{1,3})[ ]
+    | (?P<escape>[&<>])
+    )
+""", re.VERBOSE | re.DOTALL | re.MULTILINE)
+
+SLACK_ENTITIES = {"amp": "&", "lt": "<", "gt": ">"}
+SLACK_ESCAPES = {"&": "&amp;", "<": "&lt;", ">": "&gt;"}
+# Slackの特殊メンション。Discordでは通知されないように表示だけにする
+SLACK_SPECIAL_MENTIONS = {"here": "@here", "channel": "@channel", "everyone": "@everyone"}
+
+
+def _unescape_slack(text: str) -> str:
+    if "&" not in text:
+        return text
+    return text.replace("&lt;", "<").replace("&gt;", ">").replace("&amp;", "&")
+
+
+def _escape_slack(text: str) -> str:
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+# ---- Slack -> Discord ----
+
+def _slack_angle(content: str, parts: List[Part]):
+    """<...> の中身（メンション・リンク・特殊メンション）を変換する"""
+    target, _, label = content.partition("|")
+    label = _unescape_slack(label) if label else None
+    if target.startswith("@"):
+        parts.append(Mention("user", target[1:], label))
+    elif target.startswith("#"):
+        parts.append(Mention("channel", target[1:], label))
+    elif target.startswith("!"):
+        command = target[1:].split("^", 1)[0]
+        parts.append(SLACK_SPECIAL_MENTIONS.get(command) or label or "")
+    else:
+        url = _unescape_slack(target)
+        text = url[len("mailto:"):] if url.startswith("mailto:") else url
+        if label and label != text:
+            parts.append(f"[{label.replace(']', '')}]({url})")
+        else:
+            parts.append(text)
+
+
+def _tokenize_slack(text: str, parts: List[Part]):
+    position = 0
+    for match in SLACK_TOKENS.finditer(text):
+        start, end = match.span()
+        if start > position:
+            parts.append(text[position:start])
+        position = end
+        kind = match.lastgroup
+        if kind in ("code_block", "code"):
+            parts.append(_unescape_slack(match.group(kind)))
+        elif kind == "angle":
+            _slack_angle(match.group("angle"), parts)
+        elif kind == "bold":
+            parts.append("**")
+            _tokenize_slack(match.group("bold"), parts)
+            parts.append("**")
+        elif kind == "strike":
+            parts.append("~~")
+            _tokenize_slack(match.group("strike"), parts)
+            parts.append("~~")
+        elif kind in ("emoji", "tone"):
+            parts.append(emoji_index.shortcode_to_discord(match.group("emoji"), match.group("tone"))
+                         or match.group(0))
+        else:
+            parts.append(SLACK_ENTITIES[match.group("entity")])
+    if position < len(text):
+        parts.append(text[position:])
+
+
+def slack_to_discord_parts(text: str) -> List[Part]:
+    """
+    Slackの本文を字句に分解し、Discord形式の文字列とメンションの列にする
+    メンションは render() で表示名に置き換える（事前に非同期で名前を取得できるように分けている）
+    """
+    parts: List[Part] = []
+    if text:
+        _tokenize_slack(text, parts)
+    return parts
+
+
+def render(parts: List[Part], resolve_user: Resolver = None, resolve_channel: Resolver = None) -> str:
+    """slack_to_discord_parts() の結果を文字列にする"""
+    output = []
+    for part in parts:
+        if isinstance(part, str):
+            output.append(part)
+        elif part.kind == "user":
+            name = (resolve_user and resolve_user(part.id)) or part.label or part.id
+            output.append(f"@{name}")
+        else:
+            name = part.label or (resolve_channel and resolve_channel(part.id)) or part.id
+            output.append(f"#{name}")
+    return "".join(output)
+
+
+def slack_to_discord(text: str, resolve_user: Resolver = None, resolve_channel: Resolver = None) -> str:
+    """Slack mrkdwn を Discord markdown に変換する"""
+    return render(slack_to_discord_parts(text), resolve_user, resolve_channel)
+
+
+# ---- Discord -> Slack ----
+
+def discord_to_slack(text: str, resolve_user: Resolver = None, resolve_channel: Resolver = None,
+                     resolve_role: Resolver = None) -> str:
+    """
+    Discord markdown を Slack mrkdwn に変換する
+    メンションはDiscord側のキャッシュ（resolve_*）で表示名にする
+    """
+    if not text:
+        return text
+    output: List[str] = []
+    _tokenize_discord(text, output, resolve_user, resolve_channel, resolve_role)
+    return "".join(output)
+
+
+def _tokenize_discord(text, output, resolve_user, resolve_channel, resolve_role):
+    position = 0
+    for match in DISCORD_TOKENS.finditer(text):
+        start, end = match.span()
+        if start > position:
+            output.append(text[position:start])
+        position = end
+        kind = match.lastgroup
+        if kind in ("code_block", "code"):
+            output.append(_escape_slack(match.group(kind)))
+        elif kind == "emoji":
+            output.append(f":{match.group('emoji')}:")
+        elif kind == "user":
+            user_id = match.group("user")
+            output.append(f"@{(resolve_user and resolve_user(user_id)) or user_id}")
+        elif kind == "role":
+            role_id = match.group("role")
+            output.append(f"@{(resolve_role and resolve_role(role_id)) or role_id}")
+        elif kind == "channel":
+            channel_id = match.group("channel")
+            output.append(f"#{(resolve_channel and resolve_channel(channel_id)) or channel_id}")
+        elif kind == "timestamp":
+            timestamp = int(match.group("timestamp"))
+            try:
+                fallback = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M")
+            except (ValueError, OverflowError, OSError):
+                # 範囲外の時刻は変換せず元の表記のまま残す
+                output.append(_escape_slack(match.group(0)))
+            else:
+                output.append(f"<!date^{timestamp}^{{date_short_pretty}} {{time}}|{fallback}>")
+        elif kind == "url":
+            output.append(f"<{match.group('url')}>")
+        elif kind == "link":
+            output.append(f"<{match.group('link')}|{_escape_slack(match.group('label')).replace('|', '¦')}>")
+        elif kind in ("bold", "strike", "italic", "underline"):
+            # Slackに下線はないので中身だけを残す
+            marker = {"bold": "*", "strike": "~", "italic": "_", "underline": ""}[kind]
+            output.append(marker)
+            _tokenize_discord(match.group(kind), output, resolve_user, resolve_channel, resolve_role)
+            output.append(marker)
+        elif kind == "bold_italic":
+            # Slackでは *_太字斜体_* と書く
+            output.append("*_")
+            _tokenize_discord(match.group(kind), output, resolve_user, resolve_channel, resolve_role)
+            output.append("_*")
+        elif kind == "heading_text":
+            output.append("*")
+            _tokenize_discord(match.group("heading_text"), output, resolve_user, resolve_channel, resolve_role)
+            output.append("*")
+        elif kind == "quote":
+            output.append("> ")
+        else:
+            output.append(SLACK_ESCAPES[match.group("escape")])
+    if position < len(text):
+        output.append(text[position:])
@@ -0,0 +1,236 @@
+import bisect
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from aiohttp import web
+
+# レイテンシ用の既定バケット（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric(ABC):
+    type_name = ""
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.type_name}"] + self._samples()
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        """出力する行（メトリクスの種類ごとに実装する）"""
+
+
+class _FunctionValues:
+    """値を保持する代わりに、登録した関数から収集時に取得できるようにする"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.functions: Dict[LabelValues, Callable[[], float]] = {}
+
+    def collect(self, values: Dict[LabelValues, float]) -> Dict[LabelValues, float]:
+        values = dict(values)
+        for key, function in self.functions.items():
+            try:
+                values[key] = function()
+            except Exception as e:
+                logging.error(f"メトリクス {self.name} の取得エラー: {e}")
+        return values
+
+
+class Counter(_Metric):
+    """増加のみする値。関数を登録すると収集時に値を取得する（キャッシュのヒット数など）"""
+    type_name = "counter"
+
+    def __init__(self, name, description, labels=()):
+        super().__init__(name, description, labels)
+        self._values: Dict[LabelValues, float] = {}
+        self._functions = _FunctionValues(name)
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set_function(self, function: Callable[[], float], **labels):
+        self._functions.functions[self._key(labels)] = function
+
+    def value(self, **labels) -> float:
+        key = self._key(labels)
+        if key in self._functions.functions:
+            return self._functions.functions[key]()
+        return self._values.get(key, 0)
+
+    def total(self) -> float:
+        return sum(self._functions.collect(self._values).values())
+
+    def _samples(self):
+        values = self._functions.collect(self._values)
+        return [f"{self.name}{_format_labels(self.label_names, key)} {value}" for key, value in values.items()]
+
+
+class Gauge(_Metric):
+    """任意に増減する値。関数を登録すると収集時に値を取得する"""
+    type_name = "gauge"
+
+    def __init__(self, name, description, labels=()):
+        super().__init__(name, description, labels)
+        self._values: Dict[LabelValues, float] = {}
+        self._functions = _FunctionValues(name)
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+    def set_function(self, function: Callable[[], float], **labels):
+        self._functions.functions[self._key(labels)] = function
+
+    def value(self, **labels) -> float:
+        key = self._key(labels)
+        if key in self._functions.functions:
+            return self._functions.functions[key]()
+        return self._values.get(key, 0)
+
+    def _samples(self):
+        values = self._functions.collect(self._values)
+        return [f"{self.name}{_format_labels(self.label_names, key)} {value}" for key, value in values.items()]
+
+
+class Histogram(_Metric):
+    """値の分布（バケットごとの件数・合計）"""
+    type_name = "histogram"
+
+    def __init__(self, name, description, labels=(), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets))
+        # ラベル -> [バケットごとの件数（最後は +Inf）, 合計, 件数]
+        self._values: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            data[0][index] += 1
+            data[1] += value
+            data[2] += 1
+
+    def count(self, **labels) -> int:
+        data = self._values.get(self._key(labels))
+        return data[2] if data else 0
+
+    def quantile(self, q: float, **labels) -> Optional[float]:
+        """バケットの上限値による分位点の近似"""
+        data = self._values.get(self._key(labels))
+        if not data or not data[2]:
+            return None
+        target = q * data[2]
+        cumulative = 0
+        for index, count in enumerate(data[0]):
+            cumulative += count
+            if cumulative >= target:
+                return self.buckets[index] if index < len(self.buckets) else float("inf")
+        return float("inf")
+
+    def _samples(self):
+        lines = []
+        for key, (counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(list(self.buckets) + ["+Inf"], counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.label_names, key, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """メトリクスの登録先。Prometheus のテキスト形式で出力できる"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric):
+        if metric.name in self._metrics:
+            return self._metrics[metric.name]
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, description, labels=()) -> Counter:
+        return self._register(Counter(name, description, labels))
+
+    def gauge(self, name, description, labels=()) -> Gauge:
+        return self._register(Gauge(name, description, labels))
+
+    def histogram(self, name, description, labels=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, description, labels, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+# Bot全体で使うメトリクス
+RELAY_LATENCY = registry.histogram(
+    "relay_latency_seconds", "メッセージ受信から転送先への投稿までの時間", ["direction"]
+)
+API_CALLS = registry.counter("api_calls_total", "外部APIの呼び出し回数", ["service", "method"])
+API_ERRORS = registry.counter("api_errors_total", "外部APIの呼び出しエラー数", ["service", "method"])
+QUEUE_DEPTH = registry.gauge("queue_depth", "キューに残っている件数", ["queue"])
+INGEST_WAIT = registry.histogram("ingest_wait_seconds", "イベントを受信してから処理を始めるまでの待ち時間", ["queue"])
+INGEST_EVENTS = registry.counter("ingest_events_total", "受信したイベントの件数", ["queue", "status"])
+CACHE_HITS = registry.counter("cache_hits_total", "キャッシュのヒット数", ["cache"])
+CACHE_MISSES = registry.counter("cache_misses_total", "キャッシュのミス数", ["cache"])
+JOB_DURATION = registry.histogram("job_duration_seconds", "定期ジョブの実行時間", ["job"])
+JOB_RUNS = registry.counter("job_runs_total", "定期ジョブの実行回数", ["job", "status"])
+
+
+def register_cache(name: str, cache):
+    """hits / misses 属性を持つキャッシュを登録する"""
+    CACHE_HITS.set_function(lambda: cache.hits, cache=name)
+    CACHE_MISSES.set_function(lambda: cache.misses, cache=name)
+
+
+def cache_hit_ratio(name: str) -> Optional[float]:
+    hits = CACHE_HITS.value(cache=name)
+    total = hits + CACHE_MISSES.value(cache=name)
+    return hits / total if total else None
+
+
+async def start_metrics_server(host: str, port: int):
+    """Prometheus 用の /metrics エンドポイントを起動する"""
+    async def handle_metrics(request):
+        return web.Response(text=registry.render(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    logging.info(f"メトリクスを公開しました: http://{host}:{port}/metrics")
+    return runner